@@ -0,0 +1,104 @@
+"""Recovery time of the server.py topic log against log size, with and without snapshots.
+
+    $ python benchmarks/bench_topic_log.py --records 10000 100000 500000
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import TopicLog, TopicStore  # noqa: E402
+
+
+# records개의 변경 기록을 만듦 (create 60%, update 30%, delete 10%)
+# fsync는 기록을 쓰는 시간을 줄이기 위해 마지막에 한 번만 함
+def write_log(directory, records, snapshot_every, rng):
+    log = TopicLog(directory, snapshotEvery=snapshot_every)
+    store = TopicStore(log=log, nextId=log.recover()[1])
+    store._commit = lambda seq: None
+    ids = []
+    for _ in range(records):
+        r = rng.random()
+        if r < 0.6 or not ids:
+            ids.append(store.create('title', 'body ' * 20))
+        elif r < 0.9:
+            store.update(rng.choice(ids), 'updated', 'body ' * 20)
+        else:
+            id = ids.pop(rng.randrange(len(ids)))
+            store.delete(id)
+        if log.needsSnapshot() and log.beginSnapshot():
+            store.compact()
+    log.sync(log._written)
+    log.close()
+    return len(store)
+
+
+def recover(directory):
+    log = TopicLog(directory)
+    start = time.perf_counter()
+    topics, _ = log.recover()
+    seconds = time.perf_counter() - start
+    log.close()
+    return seconds, len(topics), log.recovery
+
+
+# 여러 스레드가 동시에 create할 때 초당 기록 수와, fsync 한 번에 묶인 기록 수
+def write_throughput(directory, threads, per_thread):
+    log = TopicLog(directory, snapshotEvery=10 ** 9)
+    store = TopicStore(log=log, nextId=log.recover()[1])
+
+    def worker():
+        for _ in range(per_thread):
+            store.create('title', 'body')
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    seconds = time.perf_counter() - start
+    log.close()
+    total = threads * per_thread
+    return total / seconds, total / log.stats['fsyncs']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, nargs='+', default=[10000, 100000, 500000])
+    parser.add_argument('--snapshot-every', type=int, default=8000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--writes', type=int, default=200, help='Writes per thread.')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f'{"records":>9}{"mode":>16}{"log MiB":>10}{"replayed":>10}'
+          f'{"topics":>9}{"recovery ms":>13}')
+    for records in args.records:
+        for mode, every in (('log only', 10 ** 9), ('snapshot+tail', args.snapshot_every)):
+            directory = tempfile.mkdtemp(prefix='topics-')
+            try:
+                write_log(directory, records, every, random.Random(args.seed))
+                seconds, count, info = recover(directory)
+                print(f'{records:>9}{mode:>16}{info["logBytes"] / 2 ** 20:>10.1f}'
+                      f'{info["replayed"]:>10}{count:>9}{seconds * 1000:>13.1f}')
+            finally:
+                shutil.rmtree(directory)
+
+    directory = tempfile.mkdtemp(prefix='topics-')
+    try:
+        rate, batch = write_throughput(directory, args.threads, args.writes)
+    finally:
+        shutil.rmtree(directory)
+    print(f'\n{args.threads} threads: {rate:.0f} durable writes/s,'
+          f' {batch:.1f} records per fsync')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Per-operation and per-page cost of server.py as the number of topics grows.
+
+    $ python benchmarks/bench_topics.py --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server  # noqa: E402
+from server import TopicStore  # noqa: E402
+
+
+# 이전 server.py와 같은 방식 (리스트를 처음부터 훑어서 찾음), 비교용
+class ListStore:
+    def __init__(self, topics):
+        self.topics = [dict(t) for t in topics]
+        self.nextId = len(self.topics) + 1
+
+    def get(self, id):
+        for topic in self.topics:
+            if id == topic['id']:
+                return topic
+
+    def update(self, id, title, body):
+        for topic in self.topics:
+            if id == topic['id']:
+                topic['title'] = title
+                topic['body'] = body
+                break
+
+    def delete(self, id):
+        for topic in self.topics:
+            if id == topic['id']:
+                self.topics.remove(topic)
+                break
+
+    def create(self, title, body):
+        self.topics.append({'id': self.nextId, 'title': title, 'body': body})
+        self.nextId += 1
+
+
+def make_topics(n):
+    return [{'id': i, 'title': f'topic {i}', 'body': f'body {i}'} for i in range(1, n + 1)]
+
+
+# 연산 하나의 평균 시간(마이크로초)
+def measure(store, n, ops, rng):
+    ids = [rng.randint(1, n) for _ in range(ops)]
+    result = {}
+
+    start = time.perf_counter()
+    for id in ids:
+        store.get(id)
+    result['read'] = (time.perf_counter() - start) / ops * 1e6
+
+    start = time.perf_counter()
+    for id in ids:
+        store.update(id, 'title', 'body')
+    result['update'] = (time.perf_counter() - start) / ops * 1e6
+
+    start = time.perf_counter()
+    for _ in range(ops):
+        store.create('title', 'body')
+    result['create'] = (time.perf_counter() - start) / ops * 1e6
+
+    start = time.perf_counter()
+    for id in set(ids):
+        store.delete(id)
+    result['delete'] = (time.perf_counter() - start) / len(set(ids)) * 1e6
+    return result
+
+
+# /read/<id>/ 페이지 하나를 만드는 평균 시간(밀리초)
+# 첫 요청은 <li> 목록을 만들고, 이후 요청은 캐시된 목록을 사용
+def measure_pages(n, requests, rng):
+    server.topics = TopicStore(make_topics(n))
+    client = server.app.test_client()
+    start = time.perf_counter()
+    client.get('/read/1/')
+    first = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(f'/read/{rng.randint(1, n)}/')
+    return first, (time.perf_counter() - start) / requests * 1000
+
+
+# 여러 스레드가 동시에 글을 만들어도 id가 겹치거나 빠지지 않는지 확인
+def check_concurrent_create(threads, per_thread):
+    store = TopicStore()
+    ids = []
+
+    def worker():
+        local = [store.create('t', 'b') for _ in range(per_thread)]
+        ids.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    total = threads * per_thread
+    assert sorted(ids) == list(range(1, total + 1)), 'duplicate or missing ids'
+    assert len(store.snapshot()) == total
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--ops', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=50,
+                        help='Page requests per size (0 to skip).')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f'{"store":<12}{"topics":>8}' + ''.join(f'{op:>12}' for op in
+          ('read', 'update', 'create', 'delete')) + '   (us/op)')
+    for n in args.sizes:
+        topics = make_topics(n)
+        for name, cls in (('list (old)', ListStore), ('TopicStore', TopicStore)):
+            result = measure(cls(topics), n, args.ops, random.Random(args.seed))
+            print(f'{name:<12}{n:>8}' + ''.join(f'{result[op]:>12.2f}' for op in
+                  ('read', 'update', 'create', 'delete')))
+
+    if args.requests:
+        print(f'\n{"topics":>8}{"first page":>14}{"cached nav":>14}   (ms/request)')
+        for n in args.sizes:
+            first, cached = measure_pages(n, args.requests, random.Random(args.seed))
+            print(f'{n:>8}{first:>14.2f}{cached:>14.2f}')
+
+    total = check_concurrent_create(threads=8, per_thread=5000)
+    print(f'concurrent create: {total} topics from 8 threads, ids unique and contiguous')
+
+
+if __name__ == '__main__':
+    main()
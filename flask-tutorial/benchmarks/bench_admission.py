@@ -0,0 +1,161 @@
+"""blog.index latency during a burst of login POSTs, with and without admission control.
+
+Seeds a temporary database and starts the app in a subprocess per mode
+(ThreadPoolWSGIServer, flask serve's worker). For --seconds, --attackers
+threads send failing login POSTs as fast as they can while --readers
+threads request / and record latency.
+
+Modes:
+  off          no rate limits, no concurrency cap (only the hashing queue limit)
+  concurrency  CONCURRENCY_LIMITS only
+  full         RATE_LIMITS + CONCURRENCY_LIMITS (the defaults)
+
+    $ python benchmarks/bench_admission.py --attackers 32 --readers 4 --threads 16
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flaskr import create_app  # noqa: E402
+from flaskr.db import init_db, seed_db  # noqa: E402
+
+MODES = {
+    'off': {'RATE_LIMITS': {}, 'CONCURRENCY_LIMITS': {}},
+    'concurrency': {'RATE_LIMITS': {}},
+    'full': {},
+}
+
+
+# 자식 프로세스에서 실행: 한 가지 모드로 서버를 띄우고 포트 번호를 출력한 뒤 종료될 때까지 처리
+def serve(args):
+    app = create_app({
+        'DATABASE': args.database,
+        'INDEX_CACHE_SIZE': 0, # 캐시된 페이지가 아니라 DB 조회와 렌더링을 측정
+        'INSTRUMENT_QUERIES': False,
+        **MODES[args.serve],
+        **json.loads(args.config),
+    })
+    from flaskr.serve import ThreadPoolWSGIServer, make_handler
+    server = ThreadPoolWSGIServer(
+        '127.0.0.1', 0, app, handler=make_handler(5.0, False), threads=args.threads,
+    )
+    print(server.server_port, flush=True)
+    server.serve_forever()
+
+
+def request(port, method, path, body=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    headers = {'Content-Type': 'application/x-www-form-urlencoded'} if body else {}
+    start = time.perf_counter()
+    try:
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status, time.perf_counter() - start
+    except OSError:
+        return 'error', time.perf_counter() - start
+    finally:
+        conn.close()
+
+
+def run_load(port, args):
+    deadline = time.monotonic() + args.seconds
+    logins = Counter()
+    index = []
+    lock = threading.Lock()
+
+    def attacker(i):
+        n = 0
+        while time.monotonic() < deadline:
+            body = urlencode({'username': f'user{(i + n) % 50 + 1}', 'password': 'wrong'})
+            status, _ = request(port, 'POST', '/auth/login', body)
+            n += 1
+            with lock:
+                logins[status] += 1
+
+    def reader():
+        while time.monotonic() < deadline:
+            status, elapsed = request(port, 'GET', '/')
+            with lock:
+                index.append(elapsed if status == 200 else None)
+
+    threads = [threading.Thread(target=attacker, args=(i,)) for i in range(args.attackers)]
+    threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return logins, index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--attackers', type=int, default=32)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=16, help='Server threads.')
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--mode', action='append', dest='modes', choices=MODES)
+    parser.add_argument('--config', default='{}',
+                        help='JSON object merged into every mode, e.g. \'{"RATE_LIMIT_BACKEND": "sqlite"}\'.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--serve', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--database', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args)
+
+    fd, path = tempfile.mkstemp(suffix='.sqlite')
+    os.close(fd)
+    try:
+        app = create_app({'DATABASE': path})
+        with app.app_context():
+            init_db()
+            seed_db(50, args.posts, seed=args.seed)
+
+        print(f'{args.attackers} login attackers + {args.readers} index readers,'
+              f' {args.threads} server threads, {args.seconds:.0f}s per mode')
+        print(f'{"mode":>12}{"index/s":>9}{"p50 ms":>9}{"p99 ms":>9}{"failed":>8}   login responses')
+        for mode in args.modes or MODES:
+            proc = subprocess.Popen(
+                [sys.executable, __file__, '--serve', mode, '--database', path,
+                 '--threads', str(args.threads), '--config', args.config],
+                stdout=subprocess.PIPE, text=True, start_new_session=True,
+            )
+            try:
+                port = int(proc.stdout.readline())
+                request(port, 'GET', '/') # 템플릿 컴파일과 첫 연결은 측정에서 제외
+                logins, index = run_load(port, args)
+            finally:
+                os.killpg(proc.pid, signal.SIGTERM)
+                proc.wait()
+                # 해싱 프로세스 풀(PASSWORD_HASH_WORKERS)까지 함께 종료하도록 프로세스 그룹 전체에 보냄
+
+            latencies = sorted(t for t in index if t is not None)
+
+            def pct(p):
+                return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000 \
+                    if latencies else float('nan')
+            codes = ' '.join(f'{code}:{n}' for code, n in sorted(logins.items(), key=str))
+            print(f'{mode:>12}{len(latencies) / args.seconds:>9.0f}{pct(0.5):>9.1f}'
+                  f'{pct(0.99):>9.1f}{index.count(None):>8}   {codes}')
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""Load benchmark for the flaskr views.
+
+Seeds a temporary database, drives create_app() through the test client
+and reports p50/p95/p99 latency, throughput and SQL statements per
+request for each scenario.
+
+    $ python benchmarks/bench_app.py --users 1000 --posts 100000 -o after.json
+    $ python benchmarks/bench_app.py --compare before.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flaskr import create_app  # noqa: E402
+from flaskr.db import SEED_PASSWORD, get_db, get_pool, init_db, seed_db  # noqa: E402
+
+
+class QueryCounter:
+    # 풀이 만드는 모든 연결에 trace 콜백을 달아 실행된 SQL 문장 수를 셈
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, statement):
+        if not statement.startswith('--'): # 트리거 안에서 실행된 문장은 제외
+            with self._lock:
+                self.count += 1
+
+    def install(self, app):
+        for readonly in (False, True):
+            pool = get_pool(app, readonly=readonly)
+            pool.close()
+            pool.connect = self.traced(pool.connect)
+
+    def traced(self, connect):
+        def traced_connect():
+            conn = connect()
+            conn.set_trace_callback(self)
+            return conn
+        return traced_connect
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def measure(name, client, requests, counter, make_request):
+    latencies = []
+    queries = counter.count
+    start = time.perf_counter()
+    for i in range(requests):
+        t = time.perf_counter()
+        response = make_request(client, i)
+        latencies.append((time.perf_counter() - t) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{name}: HTTP {response.status_code}')
+    elapsed = time.perf_counter() - start
+    return {
+        'requests': requests,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'throughput_rps': requests / elapsed,
+        'queries_per_request': (counter.count - queries) / requests,
+    }
+
+
+def scenarios(own_posts, deep_cursor):
+    # (이름, 요청 함수) 목록. 요청 함수는 (client, i)를 받아 응답을 반환
+    # update/delete는 벤치마크 사용자가 쓴 글(own_posts)을 대상으로 함
+    # index_deep은 가장 오래된 글 근처의 페이지 (deep_cursor)를 요청
+    return [
+        ('index', lambda c, i: c.get('/')),
+        ('index_deep', lambda c, i: c.get('/', query_string={'before': deep_cursor})),
+        ('read', lambda c, i: c.get(f'/{own_posts[i % len(own_posts)]}/update')),
+        ('search', lambda c, i: c.get('/search', query_string={'q': 'flask sqlite'})),
+        ('create', lambda c, i: c.post('/create', data={'title': f'bench {i}', 'body': 'body'})),
+        ('update', lambda c, i: c.post(f'/{own_posts[i % len(own_posts)]}/update',
+                                       data={'title': f'updated {i}', 'body': 'body'})),
+        ('delete', lambda c, i: c.post(f'/{own_posts.pop()}/delete')),
+        ('login', lambda c, i: c.post('/auth/login',
+                                      data={'username': 'user1', 'password': SEED_PASSWORD})),
+        ('register', lambda c, i: c.post('/auth/register',
+                                         data={'username': f'bench{i}', 'password': 'x'})),
+    ]
+
+
+def run(args):
+    fd, path = tempfile.mkstemp(suffix='.sqlite')
+    os.close(fd)
+    config = {'TESTING': True, 'DATABASE': path, 'RATE_LIMITS': {}}
+    # 같은 클라이언트가 login/register를 반복하므로 요청 수 제한은 끔 (--config로 다시 켤 수 있음)
+    config.update(json.loads(args.config))
+    app = create_app(config)
+
+    with app.app_context():
+        init_db()
+        start = time.perf_counter()
+        seed_db(args.users, args.posts, seed=args.seed)
+        print(f'seeded {args.users} users / {args.posts} posts'
+              f' in {time.perf_counter() - start:.1f}s', file=sys.stderr)
+        own_posts = [row[0] for row in get_db().execute(
+            'SELECT id FROM post WHERE author_id = 1 ORDER BY id DESC LIMIT ?',
+            (args.requests,)
+        )]
+        oldest = get_db().execute(
+            'SELECT created, id FROM post ORDER BY created, id LIMIT 1 OFFSET 20'
+        ).fetchone()
+        deep_cursor = f'{oldest["created"].isoformat(" ")}|{oldest["id"]}' if oldest else None
+
+    counter = QueryCounter()
+    counter.install(app)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1 # 'user1'로 로그인한 상태
+
+    results = {}
+    for name, make_request in scenarios(own_posts, deep_cursor):
+        if args.only and name not in args.only:
+            continue
+        requests = args.requests
+        if name in ('login', 'register'):
+            requests = max(1, requests // 10) # 비밀번호 해싱이 느리므로 요청 수를 줄임
+        if name == 'delete':
+            requests = min(requests, len(own_posts))
+        results[name] = measure(name, client, requests, counter, make_request)
+        if name == 'login':
+            with client.session_transaction() as session:
+                session['user_id'] = 1
+
+    os.unlink(path)
+    return {
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        'results': results,
+    }
+
+
+def report(current, baseline=None):
+    header = f'{"scenario":<12}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"req/s":>10}{"queries":>9}'
+    print(header)
+    for name, r in current['results'].items():
+        line = (f'{name:<12}{r["p50_ms"]:>10.2f}{r["p95_ms"]:>10.2f}{r["p99_ms"]:>10.2f}'
+                f'{r["throughput_rps"]:>10.0f}{r["queries_per_request"]:>9.1f}')
+        base = baseline and baseline['results'].get(name)
+        if base:
+            change = (r['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100
+            line += f'   p95 {change:+.0f}%'
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--posts', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--only', nargs='*', help='run only these scenarios')
+    parser.add_argument('--config', default='{}', help='extra app config as JSON')
+    parser.add_argument('-o', '--output', help='save results as JSON')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    args = parser.parse_args()
+
+    current = run(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report(current, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
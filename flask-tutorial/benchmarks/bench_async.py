@@ -0,0 +1,184 @@
+"""Throughput and latency with many simultaneous clients, sync vs async views.
+
+Seeds a temporary database, starts the app in a subprocess per mode and
+opens --clients connections at once from an asyncio client, each sending
+--requests GET requests (one per connection, Connection: close).
+
+Modes:
+  sync        ThreadPoolWSGIServer (flask serve's worker) + sync views
+  async       ThreadPoolWSGIServer + ASYNC_VIEWS
+  asgi-sync   uvicorn + flaskr.asgi adapter + sync views    (needs uvicorn)
+  asgi-async  uvicorn + flaskr.asgi adapter + ASYNC_VIEWS   (needs uvicorn)
+
+    $ python benchmarks/bench_async.py --clients 1000 --path / --path '/search?q=lorem'
+"""
+import argparse
+import asyncio
+import importlib.util
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flaskr import create_app  # noqa: E402
+from flaskr.db import init_db, seed_db  # noqa: E402
+
+MODES = {
+    'sync': ('wsgi', False),
+    'async': ('wsgi', True),
+    'asgi-sync': ('asgi', False),
+    'asgi-async': ('asgi', True),
+}
+
+
+# 자식 프로세스에서 실행: 한 가지 모드로 서버를 띄우고 포트 번호를 출력한 뒤 종료될 때까지 처리
+def serve(args):
+    server_kind, async_views = MODES[args.serve]
+    app = create_app({
+        'DATABASE': args.database,
+        'ASYNC_VIEWS': async_views,
+        'INDEX_CACHE_SIZE': 0, # 캐시된 페이지가 아니라 DB 조회와 렌더링을 측정
+        'INSTRUMENT_QUERIES': False,
+        'DATABASE_READ_POOL_SIZE': args.threads,
+        'ASYNC_DB_THREADS': args.threads,
+        'ASGI_THREADS': args.threads,
+    })
+
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(args.backlog)
+    # 동시에 연결하는 클라이언트가 많으므로 대기열(backlog)이 작으면 연결이 거절되거나 SYN을 다시 보내느라 늦어짐
+    print(sock.getsockname()[1], flush=True)
+
+    if server_kind == 'wsgi':
+        from flaskr.serve import ThreadPoolWSGIServer, make_handler
+        server = ThreadPoolWSGIServer(
+            '127.0.0.1', 0, app, handler=make_handler(5.0, False),
+            fd=sock.fileno(), threads=args.threads,
+        )
+        server.serve_forever()
+    else:
+        import uvicorn
+        from flaskr.asgi import PooledWsgiToAsgi
+        config = uvicorn.Config(
+            PooledWsgiToAsgi(app, threads=args.threads),
+            log_level='warning', access_log=False, backlog=args.backlog,
+        )
+        uvicorn.Server(config).run(sockets=[sock])
+
+
+async def fetch(port, path, latencies, errors):
+    start = time.perf_counter()
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n\r\n'.encode())
+        await writer.drain()
+        data = await reader.read()
+        writer.close()
+        if not data.startswith((b'HTTP/1.1 200', b'HTTP/1.0 200')):
+            errors.append(data[:12])
+            return
+    except OSError as e:
+        errors.append(type(e).__name__)
+        return
+    latencies.append(time.perf_counter() - start)
+
+
+async def client(port, paths, clients, requests):
+    latencies = []
+    errors = []
+
+    async def run(i):
+        for n in range(requests):
+            await fetch(port, paths[(i + n) % len(paths)], latencies, errors)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(i) for i in range(clients)))
+    # 모든 클라이언트가 동시에 연결을 열고, 응답을 받으면 바로 다음 요청을 보냄
+    return time.perf_counter() - start, sorted(latencies), errors
+
+
+def wait_for_port(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=3, help='Requests per client.')
+    parser.add_argument('--threads', type=int, default=32, help='Server threads.')
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--path', action='append', dest='paths')
+    parser.add_argument('--mode', action='append', dest='modes', choices=MODES)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--serve', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--database', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args)
+
+    paths = args.paths or ['/']
+    modes = args.modes or [
+        mode for mode, (kind, _) in MODES.items()
+        if kind == 'wsgi' or importlib.util.find_spec('uvicorn')
+    ]
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(max(soft, args.clients * 2 + 64), hard), hard))
+    # 클라이언트 연결마다 파일 디스크립터가 하나씩 필요
+
+    fd, path = tempfile.mkstemp(suffix='.sqlite')
+    os.close(fd)
+    try:
+        app = create_app({'DATABASE': path})
+        with app.app_context():
+            init_db()
+            seed_db(50, args.posts, seed=args.seed)
+
+        print(f'{args.clients} clients x {args.requests} requests, {args.threads} server threads,'
+              f' paths {paths}')
+        print(f'{"mode":>11}{"req/s":>9}{"p50 ms":>9}{"p99 ms":>9}{"max ms":>9}{"errors":>8}')
+        for mode in modes:
+            proc = subprocess.Popen(
+                [sys.executable, __file__, '--serve', mode, '--database', path,
+                 '--threads', str(args.threads), '--backlog', str(args.backlog)],
+                stdout=subprocess.PIPE, text=True,
+            )
+            try:
+                port = int(proc.stdout.readline())
+                wait_for_port(port)
+                asyncio.run(client(port, paths, 1, 1)) # 템플릿 컴파일과 첫 연결은 측정에서 제외
+                elapsed, latencies, errors = asyncio.run(
+                    client(port, paths, args.clients, args.requests)
+                )
+            finally:
+                proc.terminate()
+                proc.wait()
+
+            def pct(p):
+                return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000 \
+                    if latencies else float('nan')
+            print(f'{mode:>11}{len(latencies) / elapsed:>9.0f}{pct(0.5):>9.1f}{pct(0.99):>9.1f}'
+                  f'{pct(1.0):>9.1f}{len(errors):>8}')
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Compare post writes/sec with group commit on and off.
+
+    $ python benchmarks/bench_group_commit.py --threads 16 --writes 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flaskr import create_app  # noqa: E402
+from flaskr.db import get_db, init_db  # noqa: E402
+
+
+def run(group_commit, threads, writes, synchronous):
+    fd, path = tempfile.mkstemp(suffix='.sqlite')
+    os.close(fd)
+    app = create_app({
+        'TESTING': True,
+        'DATABASE': path,
+        'GROUP_COMMIT': group_commit,
+        'SQLITE_SYNCHRONOUS': synchronous,
+        'DATABASE_POOL_SIZE': threads,
+        'INDEX_CACHE_SIZE': 0,
+    })
+    with app.app_context():
+        init_db()
+        db = get_db()
+        db.execute("INSERT INTO user (username, password) VALUES ('bench', '-')")
+        db.commit()
+
+    # 각 스레드는 로그인된 세션을 가진 자신만의 테스트 클라이언트로 /create에 POST
+    def worker():
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = 1
+        for i in range(writes):
+            client.post('/create', data={'title': f'post {i}', 'body': 'body'})
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        count = get_db().execute('SELECT COUNT(*) FROM post').fetchone()[0]
+    os.unlink(path)
+    assert count == threads * writes, count
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--writes', type=int, default=100, help='writes per thread')
+    parser.add_argument('--synchronous', default='FULL',
+                        help='SQLITE_SYNCHRONOUS value (FULL fsyncs every commit)')
+    args = parser.parse_args()
+
+    for group_commit in (False, True):
+        rate = run(group_commit, args.threads, args.writes, args.synchronous)
+        label = 'on ' if group_commit else 'off'
+        print(f'group commit {label}: {rate:8.1f} writes/sec')
+
+
+if __name__ == '__main__':
+    main()
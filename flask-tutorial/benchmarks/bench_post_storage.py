@@ -0,0 +1,101 @@
+"""Database size and listing latency with plain, compressed and excerpted post bodies.
+
+Builds one database per mode with the same generated posts (a share of
+them large), then times blog.index pages and single-post reads.
+
+    $ python benchmarks/bench_post_storage.py --posts 5000 --large-share 0.2 --large-kib 200
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flaskr import create_app  # noqa: E402
+from flaskr.db import SEED_WORDS, chunks, get_db, init_db, store_body  # noqa: E402
+
+MODES = {
+    'plain': {'POST_COMPRESS_MIN_SIZE': None, 'LIST_EXCERPTS': False},
+    'compressed': {'POST_COMPRESS_MIN_SIZE': 16384, 'LIST_EXCERPTS': False},
+    'excerpts': {'POST_COMPRESS_MIN_SIZE': 16384, 'LIST_EXCERPTS': True},
+}
+
+
+def generate_bodies(args):
+    rng = random.Random(args.seed)
+    for _ in range(args.posts):
+        size = args.large_kib * 1024 if rng.random() < args.large_share else 1024
+        words = []
+        length = 0
+        while length < size:
+            word = rng.choice(SEED_WORDS)
+            words.append(word)
+            length += len(word) + 1
+        yield ' '.join(words)
+
+
+def build(path, config, args):
+    app = create_app({'DATABASE': path, 'INDEX_CACHE_SIZE': 0, 'POST_CACHE_SIZE': 0, **config})
+    start = time.perf_counter()
+    with app.app_context():
+        init_db()
+        db = get_db()
+        db.execute("INSERT INTO user (username, password) VALUES ('bench', '-')")
+        for chunk in chunks(generate_bodies(args), 500):
+            db.executemany(
+                'INSERT INTO post (author_id, title, body, excerpt) VALUES (1, ?, ?, ?)',
+                [('Post', *store_body(body)) for body in chunk]
+            )
+        db.commit()
+        db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    return app, time.perf_counter() - start
+
+
+def median_ms(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--large-share', type=float, default=0.2,
+                        help='Fraction of posts with a large body.')
+    parser.add_argument('--large-kib', type=int, default=200)
+    parser.add_argument('--per-page', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f'{"mode":>11}{"DB MiB":>9}{"load s":>8}{"index ms":>10}{"post ms":>9}')
+    for mode, config in MODES.items():
+        fd, path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        try:
+            app, load = build(path, dict(config, POSTS_PER_PAGE=args.per_page), args)
+            client = app.test_client()
+            ids = list(range(1, args.posts + 1))
+            rng = random.Random(args.seed)
+
+            client.get('/') # 연결과 템플릿 준비는 측정에서 제외
+            index = median_ms(lambda: client.get('/'), args.repeat)
+            post = median_ms(lambda: client.get(f'/api/posts/{rng.choice(ids)}'), args.repeat)
+            # 단건 읽기(get_post)는 항상 본문 전체를 읽으므로, 압축된 본문은 여기서 풂
+
+            size = os.path.getsize(path) / 2**20
+            print(f'{mode:>11}{size:>9.1f}{load:>8.1f}{index:>10.2f}{post:>9.2f}')
+        finally:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    main()
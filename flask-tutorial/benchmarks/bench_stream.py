@@ -0,0 +1,110 @@
+"""Time to first byte and peak memory of blog.index, buffered vs streamed.
+
+Seeds a temporary database, then renders large index pages in a fresh
+process per mode so each mode's peak RSS is measured on its own.
+
+    $ python benchmarks/bench_stream.py --posts 20000 --per-page 1000 5000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flaskr import create_app  # noqa: E402
+from flaskr.db import init_db, seed_db  # noqa: E402
+
+MODES = {'buffered': False, 'stream': True}
+
+
+def peak_rss_kib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss # Linux에서는 KiB 단위
+
+
+# 자식 프로세스에서 실행: 한 가지 모드로 requests번 요청하고 결과를 JSON으로 출력
+def child(args):
+    app = create_app({
+        'DATABASE': args.database,
+        'STREAM_INDEX': MODES[args.child],
+        'POSTS_PER_PAGE': args.per_page,
+        'INDEX_CACHE_SIZE': 0, # 캐시된 페이지가 아니라 렌더링 비용을 측정
+    })
+    client = app.test_client()
+    app.config['POSTS_PER_PAGE'] = 1
+    client.get('/').close() # 템플릿 컴파일과 연결 생성은 측정에서 제외 (작은 페이지로)
+    app.config['POSTS_PER_PAGE'] = args.per_page
+    baseline = peak_rss_kib()
+
+    ttfb = []
+    total = []
+    chunks = 0
+    size = 0
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        response = client.get('/', buffered=False)
+        first = None
+        for chunk in response.response:
+            if first is None:
+                first = time.perf_counter()
+            chunks += 1
+            size += len(chunk)
+        response.close()
+        ttfb.append(first - start)
+        total.append(time.perf_counter() - start)
+
+    json.dump({
+        'ttfb_ms': sorted(ttfb)[len(ttfb) // 2] * 1000,
+        'total_ms': sorted(total)[len(total) // 2] * 1000,
+        'chunks': chunks / args.requests,
+        'kib': size / args.requests / 1024,
+        'rss_growth_kib': peak_rss_kib() - baseline,
+    }, sys.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--per-page', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--requests', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--database', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.per_page = args.per_page[0]
+        return child(args)
+
+    fd, path = tempfile.mkstemp(suffix='.sqlite')
+    os.close(fd)
+    try:
+        app = create_app({'DATABASE': path})
+        with app.app_context():
+            init_db()
+            seed_db(50, args.posts, seed=args.seed)
+
+        print(f'{"per page":>9}{"mode":>10}{"page KiB":>10}{"chunks":>8}'
+              f'{"TTFB ms":>10}{"total ms":>10}{"peak RSS +KiB":>15}')
+        for per_page in args.per_page:
+            for mode in MODES:
+                out = subprocess.run(
+                    [sys.executable, __file__, '--child', mode, '--database', path,
+                     '--per-page', str(per_page), '--requests', str(args.requests)],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                r = json.loads(out)
+                print(f'{per_page:>9}{mode:>10}{r["kib"]:>10.0f}{r["chunks"]:>8.0f}'
+                      f'{r["ttfb_ms"]:>10.1f}{r["total_ms"]:>10.1f}{r["rss_growth_kib"]:>15}')
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    main()
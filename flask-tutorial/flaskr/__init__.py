@@ -34,6 +34,147 @@ def create_app(test_config=None):
         # instance/ 디렉토리 안에 flaskr.sqlite 파일로 저장
         # Flask는 instance/ 폴더를 앱의 데이터 저장소로 간주
         # 데이터베이스 파일은 그 안에 위치
+        POSTS_PER_PAGE=10,
+        # POSTS_PER_PAGE: blog.index에서 한 페이지에 보여줄 게시글 수
+        SEARCH_MAX_PAGE=100,
+        # SEARCH_MAX_PAGE: 검색 결과(/search?page=)에서 볼 수 있는 마지막 페이지 번호
+        STREAM_INDEX=False,
+        # STREAM_INDEX: True이면 blog.index를 한 번에 렌더링하지 않고 만들어지는 대로 보냄 (스트리밍)
+        # 한 페이지에 게시글이 아주 많을 때 첫 바이트가 빨리 도착하고 메모리 사용량이 페이지 크기와 무관해짐
+        # 대신 페이지 캐시와 ETag(304 응답)는 사용하지 않음
+        STREAM_CHUNK_SIZE=16384,
+        # STREAM_CHUNK_SIZE: 스트리밍할 때 한 번에 보낼 크기(글자 수)
+        STREAM_FETCH_ROWS=50,
+        # STREAM_FETCH_ROWS: 스트리밍할 때 DB에서 한 번에 읽을 게시글 수 (0이면 한 페이지를 한 번에 읽음)
+        # 한 묶음을 읽을 때마다 연결을 풀에 돌려주므로, 응답을 보내는 동안 연결을 붙잡고 있지 않음
+        DATABASE_POOL_SIZE=5,
+        DATABASE_POOL_TIMEOUT=10.0,
+        DATABASE_POOL_RECYCLE=3600.0,
+        # DATABASE_POOL_SIZE: 프로세스당 재사용할 SQLite 연결 수 (0이면 요청마다 새 연결을 열고 닫음)
+        # DATABASE_POOL_TIMEOUT: 모든 연결이 사용 중일 때 기다리는 최대 시간(초)
+        # DATABASE_POOL_RECYCLE: 연결을 이 시간(초)보다 오래 사용했다면 닫고 새로 만듦
+        DATABASE_READ_POOL_SIZE=8,
+        # DATABASE_READ_POOL_SIZE: GET/HEAD 요청이 사용할 읽기 전용 연결의 수 (0이면 모든 요청이 쓰기 연결을 사용)
+        SQLITE_JOURNAL_MODE='WAL',
+        SQLITE_SYNCHRONOUS='NORMAL',
+        SQLITE_MMAP_SIZE=256 * 1024 * 1024,
+        SQLITE_CACHE_SIZE=-16000,
+        SQLITE_TEMP_STORE='MEMORY',
+        SQLITE_BUSY_TIMEOUT=5000,
+        # 연결을 열 때마다 적용할 SQLite PRAGMA 값 (None이면 SQLite 기본값 사용)
+        # WAL: 읽기가 쓰기를 기다리지 않음, NORMAL: 커밋마다 fsync 하지 않음
+        # MMAP_SIZE: 메모리 매핑 크기(바이트), CACHE_SIZE: 음수면 KiB 단위 페이지 캐시 크기
+        # TEMP_STORE: 임시 테이블을 메모리에 둠, BUSY_TIMEOUT: 잠금 대기 시간(밀리초)
+        # flask db-settings 명령으로 실제 적용된 값을 확인 가능
+        INDEX_CACHE_SIZE=256,
+        INDEX_CACHE_TTL=300.0,
+        # INDEX_CACHE_SIZE: 렌더링된 blog.index 페이지를 몇 개까지 메모리에 보관할지 (0이면 캐시하지 않음)
+        # INDEX_CACHE_TTL: 캐시된 페이지를 버리기까지의 시간(초)
+        #   다른 프로세스에서 바뀐 게시글은 DB의 변경 카운터로 바로 반영되므로, 카운터가 없는 DB를 위한 상한
+        USER_CACHE_SIZE=1024,
+        USER_CACHE_TTL=60.0,
+        # USER_CACHE_SIZE: load_logged_in_user가 메모리에 보관할 user 행의 수 (0이면 캐시하지 않음)
+        # USER_CACHE_TTL: 캐시된 user 행을 다시 DB에서 읽기까지의 시간(초)
+        POST_CACHE_SIZE=1024,
+        POST_CACHE_TTL=300.0,
+        # POST_CACHE_SIZE: get_post가 메모리에 보관할 게시글 행의 수 (0이면 캐시하지 않음)
+        # POST_CACHE_TTL: 캐시된 게시글 행을 버리기까지의 시간(초)
+        PASSWORD_HASH_METHOD='scrypt:32768:8:1',
+        PASSWORD_HASH_WORKERS=2,
+        PASSWORD_HASH_QUEUE=32,
+        # PASSWORD_HASH_METHOD: 비밀번호 해시 방식과 비용 (werkzeug의 generate_password_hash 형식)
+        #   바꾸면 기존 사용자의 해시는 다음 로그인 성공 시 새 방식으로 다시 저장됨
+        # PASSWORD_HASH_WORKERS: 해싱을 실행할 프로세스 수 (0이면 요청 스레드에서 바로 실행)
+        # PASSWORD_HASH_QUEUE: 대기할 수 있는 해시 작업 수, 넘치면 503으로 바로 거절
+        GROUP_COMMIT=False,
+        GROUP_COMMIT_WINDOW=0.002,
+        GROUP_COMMIT_BATCH=64,
+        GROUP_COMMIT_TIMEOUT=30.0,
+        # GROUP_COMMIT: True이면 게시글/사용자 쓰기를 하나의 쓰기 스레드가 모아서 한 트랜잭션으로 커밋
+        # GROUP_COMMIT_WINDOW: 첫 쓰기 이후 다른 쓰기를 더 모으기 위해 기다리는 시간(초)
+        # GROUP_COMMIT_BATCH: 한 번에 커밋할 최대 쓰기 수
+        # GROUP_COMMIT_TIMEOUT: 요청이 쓰기 결과를 기다리는 최대 시간(초). 넘으면 503으로 응답
+        INSTRUMENT_QUERIES=True,
+        SERVER_TIMING=False,
+        SLOW_QUERY_MS=100,
+        PROFILE_DIR=None,
+        PROFILE_SAMPLE_RATE=0.0,
+        PROFILE_TOKEN=None,
+        # INSTRUMENT_QUERIES: 요청마다 쿼리 수/시간/행 수를 기록 (느린 쿼리 로그와 Server-Timing 헤더에 사용)
+        # SERVER_TIMING: True이면 기록한 값을 Server-Timing 헤더로 응답 (디버그 모드에서는 항상)
+        #   쿼리 수와 처리 시간은 내부 정보이므로 기본값은 False
+        # SLOW_QUERY_MS: 이 시간(밀리초) 이상 걸린 쿼리는 엔드포인트 이름과 함께 경고 로그로 남김 (None이면 끔)
+        # PROFILE_DIR: cProfile 결과를 저장할 디렉터리 (None이면 프로파일링을 하지 않음)
+        #   flask profile-report 로 결과 확인
+        # PROFILE_SAMPLE_RATE: 무작위로 프로파일링할 요청의 비율 (0.0 ~ 1.0)
+        # PROFILE_TOKEN: ?_profile=<이 값> 으로 요청하면 그 요청을 프로파일링 (None이면 디버그 모드에서만 ?_profile=1)
+        API_MAX_LIMIT=100,
+        API_BATCH_LIMIT=500,
+        # API_MAX_LIMIT: /api/posts 한 페이지에 돌려줄 수 있는 최대 게시글 수 (?limit=)
+        # API_BATCH_LIMIT: /api/posts/batch 한 번에 보낼 수 있는 최대 작업 수
+        COMPRESS_MIMETYPES=['text/html', 'application/json'],
+        COMPRESS_MIN_SIZE=500,
+        COMPRESS_LEVEL=6,
+        # COMPRESS_MIMETYPES: gzip/deflate로 압축할 응답의 Content-Type (빈 리스트면 압축하지 않음)
+        # COMPRESS_MIN_SIZE: 이보다 작은 응답(바이트)은 압축하지 않음
+        # COMPRESS_LEVEL: 압축 수준 1(빠름) ~ 9(작음)
+        STATIC_BUILD_DIR=None,
+        STATIC_MAX_AGE=365 * 24 * 3600,
+        # STATIC_BUILD_DIR: flask build-static이 해시가 들어간 정적 파일을 쓰는 곳 (None이면 instance/static)
+        # STATIC_MAX_AGE: 해시가 들어간 정적 파일을 브라우저가 캐시할 시간(초)
+        POST_COMPRESS_MIN_SIZE=None,
+        POST_EXCERPT_LENGTH=300,
+        LIST_EXCERPTS=False,
+        # POST_COMPRESS_MIN_SIZE: 이 크기(바이트) 이상인 게시글 본문은 zlib으로 압축하여 저장 (None이면 압축하지 않음)
+        #   예: 16384. 이미 저장된 글에 적용하려면 flask migrate-post-storage
+        # POST_EXCERPT_LENGTH: 게시글을 저장할 때 함께 저장하는 요약(excerpt)의 최대 글자 수
+        # LIST_EXCERPTS: True이면 게시글 목록(blog.index, 사용자 페이지)에 본문 전체 대신 요약을 보여줌
+        #   본문 전체를 읽거나 압축을 풀지 않으므로 큰 글이 많을 때 목록이 빨라짐
+        JOBS_THREADS=2,
+        JOBS_QUEUE_SIZE=1000,
+        JOBS_DURABLE=False,
+        JOBS_MAX_ATTEMPTS=3,
+        JOBS_RETRY_BACKOFF=1.0,
+        JOBS_LEASE=300.0,
+        # JOBS_THREADS: 백그라운드 작업(jobs.py)을 실행할 프로세스당 스레드 수
+        #   0이면 응답을 보낸 뒤 요청 스레드에서 바로 실행 (JOBS_DURABLE이면 flask worker만 실행)
+        # JOBS_QUEUE_SIZE: 대기할 수 있는 작업 수. 넘치면 durable이 아닌 작업은 버림
+        # JOBS_DURABLE: True이면 작업을 job 테이블에 기록하여, 실행하지 못한 작업을 flask worker가 실행
+        # JOBS_MAX_ATTEMPTS: 실패한 작업을 포기하기 전까지의 최대 실행 횟수
+        # JOBS_RETRY_BACKOFF: 첫 재시도까지의 시간(초). 재시도할 때마다 두 배씩 늘어남
+        # JOBS_LEASE: durable 작업을 실행 중인 워커가 죽었다고 보고 다시 실행하기까지의 시간(초)
+        RATE_LIMITS={
+            'auth.login': {'ip': (20, 60), 'username': (5, 60)},
+            'auth.register': {'ip': (5, 60)},
+        },
+        RATE_LIMIT_BACKEND='memory',
+        RATE_LIMIT_MAX_KEYS=10000,
+        # RATE_LIMITS: 엔드포인트별 요청 수 제한. {키 종류: (N, S)}는 그 키(클라이언트 IP, 폼의 사용자 이름)마다
+        #   한 번에 N개까지, 이후 평균 S초에 N개까지 허용 (토큰 버킷). 넘치면 429와 Retry-After로 응답
+        #   예: 'api.batch': {'ip': (30, 60)}. 빈 딕셔너리면 제한하지 않음
+        #   'username'은 요청마다가 아니라 뷰가 실패를 기록할 때(limits.record_failure, 로그인 실패)만 셈
+        # RATE_LIMIT_BACKEND: 'memory'이면 워커 프로세스마다 따로 세고,
+        #   'sqlite'이면 DB의 rate_limit 테이블에 두어 모든 워커 프로세스가 함께 셈
+        # RATE_LIMIT_MAX_KEYS: 'memory'일 때 프로세스가 보관할 최대 버킷 수 (넘치면 오래 쓰지 않은 것부터 버림)
+        ROUTE_CLASSES={'auth.login': 'password', 'auth.register': 'password'},
+        CONCURRENCY_LIMITS={'password': 8},
+        ADMISSION_METHODS=['POST'],
+        ADMISSION_RETRY_AFTER=1,
+        # ROUTE_CLASSES: 엔드포인트를 부류로 묶음. CONCURRENCY_LIMITS: 부류별로 프로세스당 동시에 실행할 수 있는 요청 수
+        #   넘치면 기다리지 않고 503과 Retry-After(ADMISSION_RETRY_AFTER초)로 바로 거절
+        # ADMISSION_METHODS: 요청 수 제한과 동시 실행 제한을 적용할 HTTP 메서드
+        STATS_TOKEN=None,
+        # STATS_TOKEN: /stats를 볼 때 X-Stats-Token 헤더로 보내야 하는 값
+        #   None이면 같은 서버에서 직접 보낸 요청(127.0.0.1, ::1)만 /stats를 볼 수 있음
+        TOP_AUTHORS=5,
+        # TOP_AUTHORS: 사용자 페이지(/user/<username>)의 "Top authors" 목록에 보여줄 사용자 수
+        ASYNC_VIEWS=False,
+        ASYNC_DB_THREADS=8,
+        ASGI_THREADS=32,
+        # ASYNC_VIEWS: True이면 auth/blog 블루프린트 대신 async def 뷰(auth_async.py, blog_async.py)를 등록
+        #   pip install "flask[async]" 가 필요함. async 뷰도 요청 스레드 하나를 끝까지 차지하므로 동시 처리 수는 늘지 않음
+        # ASYNC_DB_THREADS: async 뷰의 SQLite 작업을 실행할 전용 스레드 수 (스레드마다 연결 하나를 재사용)
+        # ASGI_THREADS: ASGI 서버에서 요청을 동시에 처리할 스레드 수 (uvicorn flaskr.asgi:create_asgi_app --factory)
     )
 
     if test_config is None:
@@ -65,6 +206,20 @@ def create_app(test_config=None):
         pass
     # instance/ 폴더가 이미 존재하면 에러가 나기 때문에, try-except로 감싸서 에러를 무시
 
+    # 응답 압축(gzip/deflate)
+    # after_request 함수는 등록한 순서의 반대로 실행되므로, 가장 먼저 등록하여 본문이 모두 정해진 뒤 마지막에 압축
+    from . import compress
+    compress.init_app(app)
+
+    # 정적 파일의 해시 이름(url_for('static')), 미리 압축한 .gz 파일, flask build-static 명령어
+    from . import assets
+    assets.init_app(app)
+
+    # 요청별 쿼리 기록(Server-Timing 헤더, 느린 쿼리 로그)과 프로파일링을 연결
+    # 다른 모듈의 before_request 함수보다 먼저 등록하여 요청 전체 시간을 측정
+    from . import instrument
+    instrument.init_app(app)
+
     # "hello"라고 말하는 간단한 페이지
     # /hello 경로로 접근하면 Hello, World!를 반환하는 hello 함수를 정의
     @app.route('/hello')
@@ -77,11 +232,35 @@ def create_app(test_config=None):
     from . import db
     db.init_app(app)
 
+    # 렌더링된 페이지 캐시 등 프로세스 내부 캐시를 준비
+    from . import cache
+    cache.init_app(app)
+
+    # 비밀번호 해싱을 실행할 프로세스 풀을 준비
+    from . import hashing
+    hashing.init_app(app)
+
+    # GROUP_COMMIT이 켜져 있으면 그룹 커밋 쓰기 스레드를 준비
+    from . import writer
+    writer.init_app(app)
+
+    # 응답을 보낸 뒤에 실행할 백그라운드 작업
+    from . import jobs
+    jobs.init_app(app)
+
+    # 비용이 큰 엔드포인트(로그인, 가입)의 요청 수 제한과 동시 실행 제한
+    # auth 블루프린트보다 먼저 등록하여, 거절할 요청은 로그인 사용자 조회 전에 거절
+    from . import limits
+    limits.init_app(app)
+
     # from . import auth를 통해 auth.py 모듈(Blueprint)을 가져옴
     # app.register_blueprint() → 이 블루프린트를 실제 Flask 앱에 연결
     # auth.bp → auth.py 안에서 만든 Blueprint 객체
-    from . import auth
-    app.register_blueprint(auth.bp)
+    # ASYNC_VIEWS가 켜져 있으면 같은 이름('auth', 'blog')의 async 블루프린트를 대신 등록
+    from . import aio, auth, auth_async, blog_async
+    if app.config['ASYNC_VIEWS']:
+        aio.init_app(app)
+    app.register_blueprint(auth_async.bp if app.config['ASYNC_VIEWS'] else auth.bp)
 
     # from . import blog를 통해 현재 디렉토리에서 blog.py 모듈(Blueprint)을 가져옴
     # app.register_blueprint(blog.bp) → blog.bp 블루프린트를 실제 Flask 앱에 등록
@@ -96,9 +275,25 @@ def create_app(test_config=None):
     # 결과적으로 두 URL은 같은 뷰 함수를 참조함
     # 일반적으로는 @bp.route()만으로 충분하지만, 특정 엔드포인트 명칭을 앱 전체에서 통일하려면 add_url_rule()을 사용
     from . import blog
-    app.register_blueprint(blog.bp)
+    app.register_blueprint(blog_async.bp if app.config['ASYNC_VIEWS'] else blog.bp)
     app.add_url_rule('/', endpoint='index')
 
+    # /stats 경로에서 각 모듈이 등록한 통계(연결 풀 등)를 JSON으로 보여주는 블루프린트
+    from . import stats
+    app.register_blueprint(stats.bp)
+
+    # /user/<username> 경로의 사용자별 게시글 목록
+    from . import users
+    app.register_blueprint(users.bp)
+
+    # /api 경로의 JSON API 블루프린트
+    from . import api
+    app.register_blueprint(api.bp)
+
+    # flask serve: 여러 워커 프로세스로 앱을 실행하는 명령어
+    from . import serve
+    serve.init_app(app)
+
     # app을 반환
     # 모든 설정이 끝난 Flask 애플리케이션 인스턴스를 반환
     # 이 객체가 실행 주체가 됨
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from flaskr import stats
+from flaskr.db import connect
+from flaskr.writer import WriteResult, WriteTimeout
+
+# async 뷰(auth_async.py, blog_async.py)에서 사용하는 SQLite 접근 계층
+# sqlite3 모듈에는 async API가 없고, 쿼리를 실행하는 동안 호출한 스레드가 멈추므로
+# async 뷰에서 바로 실행하면 이벤트 루프 전체가 그 쿼리를 기다리게 됨
+# AsyncDatabase는 SQLite 작업만 실행하는 전용 스레드 풀을 두고, 뷰는 await로 결과를 기다림
+#
+#   db = get_async_db()
+#   post = await db.fetchone('SELECT * FROM post WHERE id = ?', (id,))
+#
+# 스레드마다 연결을 하나씩 열어두고 계속 재사용하므로 (threading.local),
+# 연결을 풀에서 빌리고 반납하는 비용 없이 페이지 캐시가 데워진 연결을 사용
+# 한 스레드의 연결은 그 스레드에서만 사용되므로 check_same_thread 검사도 그대로 둠
+
+
+class AsyncDatabase:
+    def __init__(self, connect, threads):
+        self.connect = connect # 새 연결을 만드는 함수
+        self.threads = threads
+        self._executor = None
+        self._pid = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'errors': 0, 'connections': 0, 'in_flight': 0}
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, threads=self.threads)
+
+    def _get_executor(self):
+        # 스레드 풀은 처음 사용할 때 만들고, fork된 워커 프로세스에서는 새로 만듦
+        # (부모 프로세스의 스레드는 자식에 복사되지 않음)
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    self.threads, thread_name_prefix='flaskr-async-db'
+                )
+                self._pid = os.getpid()
+                self._local = threading.local()
+            return self._executor
+
+    def _call(self, func, args):
+        # 스레드 풀의 스레드에서 실행
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = self.connect()
+            self._count('connections')
+        try:
+            return func(db, *args)
+        except BaseException:
+            if db.in_transaction:
+                db.rollback() # 실패한 작업의 트랜잭션이 다음 작업에 남지 않도록 되돌림
+            self._count('errors')
+            raise
+
+    async def run(self, func, *args):
+        # func(db, *args)를 전용 스레드에서 실행하고 그 결과를 반환
+        # 여러 쿼리를 한 번에 실행해야 할 때는 그 쿼리들을 실행하는 함수를 넘김
+        loop = asyncio.get_running_loop()
+        self._count('calls')
+        self._count('in_flight')
+        try:
+            return await loop.run_in_executor(self._get_executor(), self._call, func, args)
+        finally:
+            self._count('in_flight', -1)
+
+    async def fetchone(self, sql, params=()):
+        return await self.run(lambda db: db.execute(sql, params).fetchone())
+
+    async def fetchall(self, sql, params=()):
+        return await self.run(lambda db: db.execute(sql, params).fetchall())
+
+    async def write(self, sql, params=()):
+        def write(db):
+            cur = db.execute(sql, params)
+            db.commit()
+            return WriteResult(cur.lastrowid, cur.rowcount)
+        return await self.run(write)
+
+
+def get_async_db():
+    return current_app.extensions['flaskr.async_db']
+
+
+# writer.execute_write의 async 버전
+# GROUP_COMMIT이 켜져 있으면 그룹 커밋 스레드의 Future를 await하고, 꺼져 있으면 전용 스레드에서 실행하고 커밋
+async def execute_write(sql, params=()):
+    writer = current_app.extensions.get('flaskr.writer')
+    if writer is not None:
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(writer.submit(sql, params))), writer.timeout
+            )
+            # shield: 시간이 초과되어도 쓰기 스레드의 작업은 취소하지 않음 (이미 실행 중일 수 있으므로)
+        except asyncio.TimeoutError:
+            raise WriteTimeout('Timed out waiting for the group commit writer.') from None
+    return await get_async_db().write(sql, params)
+
+
+def init_app(app):
+    app.extensions['flaskr.async_db'] = db = AsyncDatabase(
+        lambda: connect(app), threads=app.config['ASYNC_DB_THREADS']
+    )
+    stats.register(app, 'async_db', db.stats)
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import sqlite3
+
+from flask import (
+    Blueprint, current_app, g, jsonify, request, stream_with_context
+)
+from werkzeug.exceptions import HTTPException, abort
+
+from flaskr.auth import login_required
+from flaskr.blog import get_post, get_posts_page
+from flaskr.cache import invalidate_index, invalidate_post
+from flaskr.db import get_db, store_body
+
+bp = Blueprint('api', __name__, url_prefix='/api')
+# 다른 프로그램이 사용할 JSON API
+# HTML 폼(blog.py)과 같은 DB 연결(get_db), 로그인 확인(login_required), 작성자 확인(get_post)을 그대로 사용
+# url_prefix='/api'이므로 실제 경로는 /api/posts 등
+
+
+# API에서 발생한 오류(abort(404) 등)는 HTML 오류 페이지 대신 JSON으로 응답
+@bp.errorhandler(HTTPException)
+def json_error(e):
+    return jsonify(error=e.description), e.code
+
+
+def post_json(post):
+    return {
+        'id': post['id'],
+        'title': post['title'],
+        'body': post['body'],
+        'created': post['created'].isoformat(' '),
+        'author_id': post['author_id'],
+        'author': post['username'],
+        'version': post['version'],
+    }
+
+
+# JSON을 한 번에 문자열로 만들지 않고, 항목 하나씩 만들어 바로 보냄
+# 큰 응답이라도 메모리에는 지금 보내는 항목만 남음
+# 예: stream_json('posts', rows, post_json, older='...') -> {"posts": [...], "older": "..."}
+def stream_json(key, items, convert, **extra):
+    def generate():
+        yield f'{{{json.dumps(key)}: ['
+        for i, item in enumerate(items):
+            yield (',' if i else '') + json.dumps(convert(item))
+        yield ']'
+        for name, value in extra.items():
+            yield f', {json.dumps(name)}: {json.dumps(value)}'
+        yield '}\n'
+
+    return current_app.response_class(
+        stream_with_context(generate()), mimetype='application/json'
+    )
+
+
+# GET /api/posts?before=<커서>&limit=50
+# blog.index와 같은 키셋 페이지네이션을 사용하고, 다음/이전 페이지 커서를 older/newer로 반환
+@bp.route('/posts')
+def list_posts():
+    limit = request.args.get('limit', current_app.config['POSTS_PER_PAGE'], type=int)
+    limit = min(max(limit, 1), current_app.config['API_MAX_LIMIT'])
+    posts, older, newer = get_posts_page(
+        before=request.args.get('before'), after=request.args.get('after'), limit=limit,
+        excerpts=False, # API는 LIST_EXCERPTS와 관계없이 항상 본문 전체를 반환
+    )
+
+    # 페이지에 있는 글의 (id, version)과 커서로 ETag를 만듦
+    # 글이 추가/삭제/수정되면 값이 바뀌므로, 같으면 본문을 만들지 않고 304로 응답
+    digest = hashlib.sha1()
+    for post in posts:
+        digest.update(f'{post["id"]}:{post["version"]},'.encode())
+    digest.update(f'{older}|{newer}'.encode())
+    etag = digest.hexdigest()
+    if request.if_none_match.contains_weak(etag):
+        return '', 304, {'ETag': f'"{etag}"'}
+
+    response = stream_json('posts', posts, post_json, older=older, newer=newer)
+    response.set_etag(etag)
+    return response
+
+
+# GET /api/posts/<id>
+# 게시글의 version이 ETag이므로, 수정되지 않았으면 304로 응답
+@bp.route('/posts/<int:id>')
+def read_post(id):
+    post = get_post(id, check_author=False)
+    response = jsonify(post_json(post))
+    response.set_etag(f'{post["id"]}-{post["version"]}')
+    return response.make_conditional(request)
+
+
+# POST /api/posts/batch
+# 여러 게시글을 한 번의 요청과 하나의 트랜잭션으로 생성/수정/삭제
+# 요청 본문: {"operations": [
+#     {"op": "create", "title": "...", "body": "..."},
+#     {"op": "update", "id": 1, "title": "...", "body": "..."},
+#     {"op": "delete", "id": 2}
+# ]}
+# 작업마다 SAVEPOINT를 두어, 실패한 작업(권한 없음, 없는 글 등)만 되돌리고 나머지는 함께 커밋
+# 응답의 results는 요청한 작업 순서대로 {"status": HTTP 상태 코드, "id": ...} 또는 {"status": ..., "error": ...}
+# 작업 하나의 값 때문에 생긴 오류(SQLite 정수 범위를 넘는 수, UTF-8로 바꿀 수 없는 문자열 등)도 그 작업만 400으로 실패
+@bp.route('/posts/batch', methods=('POST',))
+@login_required
+def batch():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('operations'), list):
+        abort(400, 'Expected a JSON object with an "operations" list.')
+    operations = data['operations']
+    if len(operations) > current_app.config['API_BATCH_LIMIT']:
+        abort(413, f'At most {current_app.config["API_BATCH_LIMIT"]} operations per batch.')
+
+    db = get_db(readonly=False)
+    results = []
+    changed = []
+    db.execute('BEGIN IMMEDIATE')
+    # 처음부터 쓰기 잠금을 잡아서, 중간에 다른 프로세스의 쓰기 때문에 SQLITE_BUSY로 실패하지 않도록 함
+    try:
+        for op in operations:
+            db.execute('SAVEPOINT item')
+            try:
+                result = apply_operation(db, op)
+            except HTTPException as e:
+                db.execute('ROLLBACK TO item')
+                result = {'status': e.code, 'error': e.description}
+            except sqlite3.IntegrityError as e:
+                db.execute('ROLLBACK TO item')
+                result = {'status': 409, 'error': str(e)}
+            except (sqlite3.DataError, sqlite3.InterfaceError, sqlite3.ProgrammingError,
+                    OverflowError, UnicodeError) as e:
+                # 값을 SQLite에 넘기지 못했거나 SQLite가 값을 거부한 경우
+                # DB 자체의 오류(OperationalError: 디스크 가득 참 등)는 배치 전체를 되돌리고 500으로 응답
+                db.execute('ROLLBACK TO item')
+                result = {'status': 400, 'error': str(e)}
+            else:
+                changed.append(result['id'])
+            db.execute('RELEASE item')
+            results.append(result)
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        # 트랜잭션 안에서 get_post()가 캐시에 넣은 행도 있으므로, 커밋하지 못한 경우에도 지움
+        for id in changed:
+            invalidate_post(id)
+        if changed:
+            invalidate_index()
+
+    return stream_json('results', results, lambda result: result)
+
+
+MAX_ID = 2 ** 63 - 1 # SQLite INTEGER의 최댓값. 이보다 큰 수는 바인딩할 때 OverflowError
+
+
+def apply_operation(db, op):
+    if not isinstance(op, dict):
+        abort(400, 'Each operation must be an object.')
+    kind = op.get('op')
+
+    if kind in ('create', 'update'):
+        title = op.get('title')
+        body = op.get('body', '')
+        if not isinstance(title, str) or not title:
+            abort(400, 'Title is required.')
+        if not isinstance(body, str):
+            abort(400, 'Body must be a string.')
+
+    if kind == 'create':
+        cur = db.execute(
+            'INSERT INTO post (title, body, excerpt, author_id) VALUES (?, ?, ?, ?)',
+            (title, *store_body(body), g.user['id'])
+        )
+        return {'status': 201, 'id': cur.lastrowid}
+
+    if kind in ('update', 'delete'):
+        id = op.get('id')
+        if isinstance(id, bool) or not isinstance(id, int) or not 1 <= id <= MAX_ID:
+            abort(400, 'An integer id is required.')
+            # JSON의 true/false는 파이썬에서 int의 하위 클래스인 bool이므로 따로 거부
+        get_post(id) # 글이 없으면 404, 작성자가 아니면 403 (HTML 폼과 같은 규칙)
+        if kind == 'update':
+            db.execute(
+                'UPDATE post SET title = ?, body = ?, excerpt = ? WHERE id = ?',
+                (title, *store_body(body), id)
+            )
+        else:
+            db.execute('DELETE FROM post WHERE id = ?', (id,))
+        return {'status': 200, 'id': id}
+
+    abort(400, 'Unknown op; expected create, update or delete.')
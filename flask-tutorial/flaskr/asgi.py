@@ -0,0 +1,160 @@
+import asyncio
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from flaskr import create_app
+
+# ASGI 서버(uvicorn, hypercorn 등)에서 flaskr을 실행하기 위한 진입점
+#
+#   $ pip install "flask[async]" uvicorn
+#   $ uvicorn flaskr.asgi:create_asgi_app --factory --workers 4
+#
+# Flask는 WSGI 앱이므로 PooledWsgiToAsgi로 감싸서 ASGI 앱으로 만듦
+# 이벤트 루프는 연결을 받고 요청 본문을 읽고 응답을 보내는 일만 맡고,
+# Flask 앱은 요청마다 ASGI_THREADS개의 스레드 풀 중 하나에서 처음부터 끝까지 실행됨
+#
+# 동시에 처리하는 요청 수는 ASYNC_VIEWS와 관계없이 (워커 수) x ASGI_THREADS를 넘지 않음
+# Flask는 async 뷰를 요청 스레드 안에서 asgiref의 async_to_sync(app.ensure_sync)로 실행하므로,
+# async 뷰가 DB나 해싱을 await로 기다리는 동안에도 그 요청 스레드는 계속 점유됨
+# async 뷰의 장점은 한 요청 안에서 여러 작업을 함께 기다릴 수 있다는 것뿐이고, 스레드 수를 줄여 주지는 않음
+#
+# asgiref의 WsgiToAsgi는 모든 요청을 하나의 스레드에서 차례로 실행하므로(thread_sensitive=True)
+# 여기서는 asgiref를 쓰지 않고, 요청 하나를 loop.run_in_executor로 스레드 풀에서 실행하는 작은 어댑터를 둠
+
+BODY_SPOOL_SIZE = 64 * 1024 # 이보다 큰 요청 본문은 메모리 대신 임시 파일에 모음
+
+
+class PooledWsgiToAsgi:
+    def __init__(self, wsgi_application, threads):
+        self.wsgi_application = wsgi_application
+        self.threads = threads
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        # uvicorn --workers 처럼 fork된 워커 프로세스에서는 스레드 풀을 새로 만듦
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(self.threads, thread_name_prefix='flaskr-asgi')
+            self._pid = os.getpid()
+        return self._executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            # 시작/종료 때 할 일이 없으므로 알림만 받고 바로 응답 (--lifespan off 없이도 실행되도록)
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            raise ValueError(f'Unsupported ASGI scope type {scope["type"]!r}.')
+
+        body = tempfile.SpooledTemporaryFile(max_size=BODY_SPOOL_SIZE)
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return # 본문을 다 받기 전에 클라이언트가 끊음
+                body.write(message.get('body', b''))
+                if not message.get('more_body', False):
+                    break
+            body.seek(0)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                self._get_executor(), run_wsgi, self.wsgi_application,
+                wsgi_environ(scope, body), send, loop,
+            )
+        finally:
+            body.close()
+
+
+def wsgi_environ(scope, body):
+    # ASGI의 scope를 PEP 3333의 environ으로 바꿈
+    # WSGI의 문자열 값은 바이트를 latin-1로 디코딩한 str이어야 함 (경로는 UTF-8 바이트를 latin-1로 다시 읽음)
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf8').decode('latin1'),
+        'PATH_INFO': path.encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+        environ['REMOTE_PORT'] = str(scope['client'][1])
+    for name, value in scope['headers']:
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        if name in environ:
+            # 같은 이름의 헤더가 여러 번 오면 하나로 합침 (Cookie는 ;로, 나머지는 ,로)
+            value = environ[name] + ('; ' if name == 'HTTP_COOKIE' else ',') + value
+        environ[name] = value
+    return environ
+
+
+def run_wsgi(application, environ, send, loop):
+    # 스레드 풀에서 실행: WSGI 앱을 호출하고, 응답을 이벤트 루프의 send()로 넘김
+    # 응답 조각마다 send()가 끝날 때까지 기다리므로, 느린 클라이언트에게 보낼 데이터가 메모리에 쌓이지 않음
+    started = None
+
+    def send_sync(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    def write(chunk):
+        nonlocal started
+        if started is not True:
+            send_sync(started)
+            started = True
+        if chunk:
+            send_sync({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+
+    def start_response(status, headers, exc_info=None):
+        nonlocal started
+        if exc_info is not None and started is True:
+            raise exc_info[1].with_traceback(exc_info[2])
+            # 응답 헤더를 이미 보낸 뒤에는 오류 응답으로 바꿀 수 없음 (PEP 3333)
+        started = {
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [
+                (name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers
+            ],
+        }
+        return write
+
+    iterable = application(environ, start_response)
+    try:
+        for chunk in iterable:
+            if chunk:
+                write(chunk) # 헤더는 본문의 첫 조각과 함께 보냄 (그 전까지는 start_response를 다시 호출할 수 있음)
+        write(b'')
+        send_sync({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+
+
+def create_asgi_app(test_config=None):
+    # ASGI 서버가 워커 프로세스마다 호출하는 앱 팩토리 (uvicorn --factory)
+    # 모듈을 import할 때 앱을 만들지 않으므로, import만 해도 config.py를 읽거나 DB 연결을 여는 일이 없음
+    app = create_app(test_config)
+    return PooledWsgiToAsgi(app, threads=app.config['ASGI_THREADS'])
@@ -0,0 +1,143 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+import click
+from flask import current_app, request, send_from_directory
+
+# 정적 파일(static/)을 배포용으로 빌드하고 제공하는 기능
+#
+# $ flask build-static 은 static/의 파일마다 내용의 해시를 이름에 넣은 복사본을 만들고
+# (style.css -> style.3f2a9c1b7d4e.css), 압축하면 작아지는 파일은 .gz 파일도 함께 만듦
+# 원래 이름과 해시가 들어간 이름의 대응은 manifest.json에 저장
+#
+# 빌드가 되어 있으면 url_for('static', filename='style.css')가 해시가 들어간 이름을 만들고,
+# 그 URL은 내용이 바뀌면 이름도 바뀌므로 브라우저가 1년 동안 다시 확인하지 않고 캐시해도 됨 (immutable)
+# 브라우저가 gzip을 받을 수 있으면 미리 압축해 둔 .gz 파일을 그대로 보냄 (요청마다 압축하지 않음)
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.html', '.txt', '.json')
+
+
+def build_dir(app):
+    return app.config['STATIC_BUILD_DIR'] or os.path.join(app.instance_path, 'static')
+
+
+def fingerprint(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def hashed_name(name, digest):
+    base, ext = os.path.splitext(name)
+    return f'{base}.{digest}{ext}'
+
+
+def build_static(app, clean=False):
+    # 빌드한 파일 수를 반환하고, manifest를 다시 읽어 앱에 반영
+    source = app.static_folder
+    target = build_dir(app)
+    if clean and os.path.isdir(target):
+        shutil.rmtree(target)
+        # 기본적으로는 이전 빌드의 파일을 지우지 않음
+        # 배포 중에 아직 이전 페이지를 보고 있는 브라우저가 이전 이름의 파일을 요청할 수 있기 때문
+    os.makedirs(target, exist_ok=True)
+
+    manifest = {}
+    for root, dirs, files in os.walk(source):
+        for filename in sorted(files):
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, source).replace(os.sep, '/')
+            hashed = hashed_name(name, fingerprint(path))
+            manifest[name] = hashed
+
+            out = os.path.join(target, hashed)
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            shutil.copyfile(path, out)
+            if filename.endswith(COMPRESSIBLE):
+                with open(path, 'rb') as f:
+                    data = f.read()
+                compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                # mtime=0: 빌드할 때마다 같은 파일이 나오도록 gzip 헤더에 시각을 넣지 않음
+                if len(compressed) < len(data):
+                    with open(out + '.gz', 'wb') as f:
+                        f.write(compressed)
+
+    tmp = os.path.join(target, 'manifest.json.tmp')
+    with open(tmp, 'w', encoding='utf8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(target, 'manifest.json'))
+    load_manifest(app)
+    return len(manifest)
+
+
+def load_manifest(app):
+    path = os.path.join(build_dir(app), 'manifest.json')
+    try:
+        with open(path, encoding='utf8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        manifest = {}
+    app.extensions['flaskr.assets'] = {
+        'manifest': manifest,
+        'hashed': set(manifest.values()),
+    }
+
+
+# url_for('static', filename=...)을 호출할 때 filename을 해시가 들어간 이름으로 바꿈
+# 빌드하지 않은 파일(manifest에 없는 파일)은 그대로 둠
+def hashed_static_url(endpoint, values):
+    if endpoint != 'static' or 'filename' not in values:
+        return
+    manifest = current_app.extensions['flaskr.assets']['manifest']
+    values['filename'] = manifest.get(values['filename'], values['filename'])
+
+
+# /static/<filename> 요청을 처리하는 뷰 (Flask 기본 static 뷰를 대신함)
+# 해시가 들어간 이름이면 빌드 디렉토리에서 immutable 캐시 헤더와 함께 보내고,
+# 그 외의 이름은 지금까지처럼 static/ 폴더에서 보냄
+def serve_static(filename):
+    app = current_app
+    if filename not in app.extensions['flaskr.assets']['hashed']:
+        return app.send_static_file(filename)
+
+    directory = build_dir(app)
+    name = filename
+    encoding = None
+    if request.accept_encodings['gzip'] \
+            and os.path.isfile(os.path.join(directory, filename + '.gz')):
+        name = filename + '.gz'
+        encoding = 'gzip'
+
+    mimetype = None
+    if encoding:
+        mimetype = mimetypes.guess_type(filename)[0]
+        # .gz 파일을 보내더라도 Content-Type은 원래 파일(text/css 등)의 것이어야 함
+    response = send_from_directory(
+        directory, name, mimetype=mimetype, max_age=app.config['STATIC_MAX_AGE']
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    # immutable: 유효 기간 동안에는 새로고침을 해도 서버에 다시 확인하지 않음
+    return response
+
+
+@click.command('build-static')
+@click.option('--clean', is_flag=True, help='Remove previous builds first.')
+def build_static_command(clean):
+    """Fingerprint static files and write precompressed .gz variants."""
+    count = build_static(current_app, clean=clean)
+    click.echo(f'Built {count} static files into {build_dir(current_app)}.')
+# 사용 예: $ flask build-static (배포할 때마다 실행한 뒤 워커를 다시 시작)
+
+
+def init_app(app):
+    load_manifest(app)
+    app.url_defaults(hashed_static_url)
+    app.view_functions['static'] = serve_static
+    app.cli.add_command(build_static_command)
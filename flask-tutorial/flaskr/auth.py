@@ -1,11 +1,15 @@
 import functools
+import inspect
+import sqlite3
 
 from flask import (
-    Blueprint, flash, g, redirect, render_template, request, session, url_for
+    Blueprint, abort, flash, g, redirect, render_template, request, session, url_for
 )
-from werkzeug.security import check_password_hash, generate_password_hash
-
+from flaskr.cache import get_user_cache, invalidate_user
 from flaskr.db import get_db
+from flaskr.hashing import get_hasher
+from flaskr.limits import record_failure
+from flaskr.writer import execute_write
 
 bp = Blueprint('auth', __name__, url_prefix='/auth')
 # 'auth'라는 이름의 블루프린트를 생성
@@ -28,7 +32,6 @@ def register(): # register 뷰 함수 정의
         # request.form은 HTML 폼에서 보내진 데이터를 key-value 쌍으로 다루는 객체
         # 예를 들어 <input name="username">이면 request.form["username"]으로 가져올 수 있음
 
-        db = get_db() # 데이터베이스 연결 객체 가져옴
         error = None # 초기 에러 변수는 None으로 설정
 
         # username과 password가 비어 있지 않은지 유효성 검사(validation)
@@ -40,19 +43,20 @@ def register(): # register 뷰 함수 정의
 
         if error is None: # 에러가 없을 경우
             try: # 유효성 검사를 통과한 경우에만 사용자 정보를 DB에 저장하여 실제 등록 절차를 완료
-                db.execute( # db.execute는 사용자 입력을 위한 ? 플레이스홀더가 포함된 SQL 쿼리를 받고, 이 플레이스홀더를 대체할 값들의 튜플을 받음
+                execute_write( # execute_write는 사용자 입력을 위한 ? 플레이스홀더가 포함된 SQL 쿼리를 받고, 이 플레이스홀더를 대체할 값들의 튜플을 받음
                     # 데이터베이스 라이브러리는 이 값들을 이스케이프 처리하므로, SQL 인젝션 공격에 취약하지 않게 됨
                     "INSERT INTO user (username, password) VALUES (?, ?)", # 사용자 정보를 user 테이블에 삽입
                     # 쿼리를 직접 문자열로 조합하지 않고 플레이스홀더(?)를 사용함으로써, SQL 주입 공격을 막고 보안을 강화
-                    (username, generate_password_hash(password)), 
+                    (username, get_hasher().hash(password)),
+                    # 해싱은 요청 스레드가 아니라 hashing.py의 프로세스 풀에서 실행
                     # 평문 비밀번호는 보안상 매우 위험하므로 해싱이 필수
                     # 비밀번호는 해시함수로 암호화
                     # 해시된 값만 DB에 저장
                     # INSERT 같은 데이터 조작 SQL은 커밋을 해야 DB에 실제 반영
-                    # 이 쿼리는 데이터를 수정하므로, 변경 사항을 저장하기 위해 이후에 db.commit()이 호출되어야 함
+                    # execute_write()는 쿼리를 실행하고 커밋까지 마친 뒤 반환
+                    # (GROUP_COMMIT이 켜져 있으면 다른 요청들의 쓰기와 함께 한 번에 커밋)
                 )
-                db.commit() # 데이터베이스에 커밋하여 저장
-            except db.IntegrityError: # 만약 이미 존재하는 사용자일 경우 예외 발생
+            except sqlite3.IntegrityError: # 만약 이미 존재하는 사용자일 경우 예외 발생
                 # 데이터베이스의 user 테이블이 username에 대해 고유 제약 조건(UNIQUE)을 가지고 있을 때, 
                 # 중복된 이름으로 INSERT를 시도하면 이 오류가 발생
                 error = f"User {username} is already registered."
@@ -96,11 +100,20 @@ def login(): # login 뷰 함수 정의
 
         if user is None:
             error = 'Incorrect username.'
-        elif not check_password_hash(user['password'], password):
+        elif not get_hasher().check(user['password'], password):
             # check_password_hash()는 제출된 비밀번호를 저장된 해시와 동일한 방식으로 해싱하고, 이를 안전하게 비교
+            # get_hasher().check()는 이 작업을 프로세스 풀에서 실행
             # 만약 일치한다면, 비밀번호는 유효
             # not이므로 일치하지 않으면 에러 메시지를 설정
             error = 'Incorrect password.'
+        elif get_hasher().needs_rehash(user['password']):
+            # 저장된 해시가 현재 설정(PASSWORD_HASH_METHOD)과 다른 방식/비용으로 만들어졌다면
+            # 평문 비밀번호를 알고 있는 지금 새 설정으로 다시 해싱하여 저장
+            execute_write(
+                'UPDATE user SET password = ? WHERE id = ?',
+                (get_hasher().hash(password), user['id'])
+            )
+            invalidate_user(user['id']) # 캐시된 이전 user 행을 지움
 
         if error is None: # 에러가 없다면 (= 로그인 성공 시)
             # session은 요청 사이에 데이터를 저장하는 딕셔너리
@@ -118,6 +131,9 @@ def login(): # login 뷰 함수 정의
 
             return redirect(url_for('index')) # 이후 url_for('index')로 리디렉션 (index 뷰로 이동)
 
+        record_failure()
+        # 실패한 로그인만 사용자 이름의 요청 수 제한(limits.py)에 더함
+        # 성공한 로그인이나 요청 자체는 세지 않으므로, 남의 사용자 이름으로 요청을 보내기만 해서는 그 계정을 막을 수 없음
         flash(error)
 
     return render_template('auth/login.html')
@@ -128,6 +144,12 @@ def login(): # login 뷰 함수 정의
 # 즉, 이 데코레이터 아래 정의된 함수는 모든 요청마다, 그리고 뷰 함수가 실행되기 전에 호출
 @bp.before_app_request
 def load_logged_in_user(): # 이 함수는 사용자 정보를 로드하여 g 객체에 저장
+    if request.endpoint in SKIP_USER_ENDPOINTS:
+        g.user = None
+        return
+        # 정적 파일(/static/style.css)이나 /hello처럼 g.user를 전혀 사용하지 않는 요청은
+        # 사용자 조회 쿼리를 실행하지 않고 바로 넘어감
+
     user_id = session.get('user_id')
     # 세션에서 user_id 키의 값을 가져옴
 
@@ -137,12 +159,25 @@ def load_logged_in_user(): # 이 함수는 사용자 정보를 로드하여 g 
         # g.user는 None 상태로 유지
         # 이로써 나중에 어떤 뷰에서든 g.user가 None이면 로그인하지 않았다는 걸 쉽게 알 수 있음
     else: # 세션에 유효한 user_id가 있다면
-        g.user = get_db().execute( # get_db() 함수로 데이터베이스 연결을 가져옴
-            'SELECT * FROM user WHERE id = ?', (user_id,) # 사용자 테이블에서 해당 id의 사용자를 조회
-        ).fetchone() # fetchone()으로 결과 하나를 가져옴
+        cache = get_user_cache()
+        user = cache.get(user_id)
+        # 모든 요청마다 같은 사용자를 다시 조회하지 않도록, 먼저 캐시에서 찾아봄
+        if user is None: # 캐시에 없거나 TTL이 지난 경우에만 DB를 조회
+            user = get_db().execute( # get_db() 함수로 데이터베이스 연결을 가져옴
+                'SELECT * FROM user WHERE id = ?', (user_id,) # 사용자 테이블에서 해당 id의 사용자를 조회
+            ).fetchone() # fetchone()으로 결과 하나를 가져옴
+            if user is not None:
+                cache.set(user_id, user)
+                # sqlite3.Row는 값을 복사해서 가지고 있으므로, 연결을 풀에 반납한 뒤에도 그대로 사용 가능
+        g.user = user
         # 그 정보를 Flask의 전역 객체인 g.user에 저장
         # g 객체는 Flask의 각 요청마다 새로 생성되며, 해당 요청 동안만 유지
 
+
+# g.user를 읽지 않는 엔드포인트 (정적 파일, 상태 확인용 페이지 등)
+# load_logged_in_user는 이 엔드포인트에 대해 사용자 조회를 건너뜀
+SKIP_USER_ENDPOINTS = {'static', 'hello', 'stats.index'}
+
 # 데코레이터 @bp.route는 URL /logout을 logout 뷰 함수와 연결
 # Blueprint 객체인 bp를 사용하므로 실제 경로는 /auth/logout 임
 @bp.route('/logout') # /logout이라는 URL 경로로 요청이 들어올 경우 실행할 뷰 함수를 등록
@@ -174,6 +209,9 @@ def login_required(view): #login_required라는 데코레이터를 정의
         # 따라서 **kwargs로 모든 경우를 유연하게 처리
         # **kwargs에는 Flask가 뷰 함수에 전달해주는 URL 경로 변수 (route parameter) 가 들어감
         if g.user is None:
+            if request.blueprint == 'api':
+                abort(401)
+                # JSON API(api.py)를 사용하는 프로그램은 로그인 페이지로 리디렉션해도 의미가 없으므로 401로 응답
             return redirect(url_for('auth.login'))
             # 로그인이 안 된 경우, auth.login이라는 라우트 이름으로 리디렉션
 
@@ -181,6 +219,16 @@ def login_required(view): #login_required라는 데코레이터를 정의
         # 로그인이 되어 있다면, 원래의 뷰 함수 view를 그대로 실행
         # **kwargs는 URL에서 전달된 변수들
 
+    if inspect.iscoroutinefunction(view):
+        # async def 뷰(blog_async.py)는 async 함수로 감싸야 Flask가 코루틴으로 인식하여 await로 실행
+        @functools.wraps(view)
+        async def wrapped_async_view(**kwargs):
+            if g.user is None:
+                return wrapped_view(**kwargs) # 로그인이 안 된 경우의 응답(리디렉션/401)은 같음
+            return await view(**kwargs)
+
+        return wrapped_async_view
+
     return wrapped_view
     # 최종적으로, 원래 뷰 대신 wrapped_view를 반환
     # 즉, 이제 데코레이터가 적용된 뷰는 login_required 조건을 갖게 됨
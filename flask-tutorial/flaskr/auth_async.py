@@ -0,0 +1,100 @@
+import sqlite3
+
+from flask import (
+    Blueprint, flash, g, redirect, render_template, request, session, url_for
+)
+
+from flaskr import auth
+from flaskr.aio import execute_write, get_async_db
+from flaskr.cache import get_user_cache, invalidate_user
+from flaskr.hashing import get_hasher
+from flaskr.limits import record_failure
+
+bp = Blueprint('auth', __name__, url_prefix='/auth')
+# auth.py의 async 버전 (ASYNC_VIEWS=True일 때 auth.py 대신 등록)
+# 블루프린트 이름과 URL이 auth.py와 같으므로 url_for('auth.login'), 템플릿 등은 그대로 사용
+# 비밀번호 해싱은 hash_async/check_async, DB 작업은 aio.py의 전용 스레드에서 실행하고 await로 기다림
+# 기다리는 동안 이벤트 루프는 다른 요청을 처리할 수 있음
+
+
+@bp.route('/register', methods=('GET', 'POST'))
+async def register():
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+        error = None
+
+        if not username:
+            error = 'Username is required.'
+        elif not password:
+            error = 'Password is required.'
+
+        if error is None:
+            try:
+                await execute_write(
+                    'INSERT INTO user (username, password) VALUES (?, ?)',
+                    (username, await get_hasher().hash_async(password)),
+                )
+            except sqlite3.IntegrityError:
+                error = f"User {username} is already registered."
+            else:
+                return redirect(url_for('auth.login'))
+
+        flash(error)
+
+    return render_template('auth/register.html')
+
+
+@bp.route('/login', methods=('GET', 'POST'))
+async def login():
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+        error = None
+
+        user = await get_async_db().fetchone(
+            'SELECT * FROM user WHERE username = ?', (username,)
+        )
+
+        hasher = get_hasher()
+        if user is None:
+            error = 'Incorrect username.'
+        elif not await hasher.check_async(user['password'], password):
+            error = 'Incorrect password.'
+        elif hasher.needs_rehash(user['password']):
+            await execute_write(
+                'UPDATE user SET password = ? WHERE id = ?',
+                (await hasher.hash_async(password), user['id'])
+            )
+            invalidate_user(user['id'])
+
+        if error is None:
+            session.clear()
+            session['user_id'] = user['id']
+            return redirect(url_for('index'))
+
+        record_failure()
+        flash(error)
+
+    return render_template('auth/login.html')
+
+
+# auth.load_logged_in_user와 같이 g.user를 설정 (캐시에 없을 때만 DB에서 읽음)
+@bp.before_app_request
+async def load_logged_in_user():
+    user_id = session.get('user_id')
+    if user_id is None or request.endpoint in auth.SKIP_USER_ENDPOINTS:
+        g.user = None
+        return
+
+    cache = get_user_cache()
+    user = cache.get(user_id)
+    if user is None:
+        user = await get_async_db().fetchone('SELECT * FROM user WHERE id = ?', (user_id,))
+        if user is not None:
+            cache.set(user_id, user)
+    g.user = user
+
+
+bp.add_url_rule('/logout', view_func=auth.logout)
+# 로그아웃은 세션만 지우고 기다리는 작업이 없으므로 auth.py의 뷰를 그대로 사용
@@ -1,11 +1,21 @@
+import hashlib
+from datetime import datetime
+
 from flask import (
-    Blueprint, flash, g, redirect, render_template, request, url_for
+    Blueprint, current_app, flash, g, make_response, redirect,
+    render_template, request, session, stream_template, url_for
 )
+from markupsafe import Markup, escape
 from werkzeug.exceptions import abort
 # abort(404)처럼 HTTP 오류 응답을 강제로 발생시키는 데 사용
 
 from flaskr.auth import login_required
-from flaskr.db import get_db
+from flaskr.cache import (
+    get_index_cache, get_post_cache, get_post_generation, invalidate_index, invalidate_post
+)
+from flaskr.db import close_db, get_db, store_body
+from flaskr.jobs import defer, task
+from flaskr.writer import execute_write
 
 bp = Blueprint('blog', __name__)
 # 'blog'라는 이름의 블루프린트를 생성
@@ -20,17 +30,319 @@ bp = Blueprint('blog', __name__)
 @bp.route('/')
 def index(): # 위에서 연결한 라우트('/')에 해당하는 뷰 함수
                 # 브라우저에서 루트 URL(/)에 접속하면 이 index() 함수가 실행
-    db = get_db()
-    posts = db.execute( # 변수는 이후 템플릿에 넘겨줘서, HTML에서 게시글 목록을 출력할 때 사용
-        'SELECT p.id, title, body, created, author_id, username'
-        ' FROM post p JOIN user u ON p.author_id = u.id'
-        ' ORDER BY created DESC' # 결과를 작성일자(created) 기준으로 내림차순 정렬
-                                # 가장 최근 글이 맨 위에 표시
-    ).fetchall() # SQL 쿼리를 실행한 결과를 전부 가져옴
-    # fetchall()은 리스트 형태로 결과를 반환하며, 각 항목은 하나의 게시글을 나타냄
-    return render_template('blog/index.html', posts=posts)
+    before = request.args.get('before')
+    after = request.args.get('after')
+    # 전체 게시글을 fetchall()로 한 번에 가져오지 않고, 한 페이지 분량만 가져옴
+    # ?before=<커서> 는 그 커서보다 오래된 글, ?after=<커서> 는 그 커서보다 새로운 글을 의미
+
+    if session.get('_flashes'):
+        # flash 메시지는 방문자마다 다르고 한 번만 보여야 하므로 캐시하지 않고 바로 렌더링
+        # (스트리밍 중에 꺼낸 flash 메시지는 세션에 저장되지 않으므로 스트리밍 모드에서도 이렇게 처리)
+        return render_index(before, after)
+
+    if current_app.config['STREAM_INDEX']:
+        return stream_index(before, after)
+        # 스트리밍 모드에서는 페이지 전체를 만들지 않으므로 페이지 캐시와 ETag를 사용하지 않음
+
+    # 렌더링된 페이지를 (페이지 커서, 로그인한 사용자 id) 별로 캐시
+    # 사용자마다 Edit 링크와 상단 메뉴가 다르므로 사용자 id도 키에 포함
+    # 키의 첫 값은 DB의 게시글 변경 카운터이므로, 다른 워커 프로세스에서 바뀐 글도 반영됨
+    cache = get_index_cache()
+    generation = get_post_generation(get_db())
+    key = cache.key(generation, before, after, g.user['id'] if g.user else None)
+    entry = cache.get(key)
+    if entry is None:
+        entry = index_entry(render_index(before, after))
+        cache.set(key, entry)
+    return index_response(entry)
+
+
+def index_entry(html):
+    body = html.encode()
+    return (body, hashlib.sha1(body).hexdigest())
+    # ETag는 페이지 내용의 해시값이므로, 내용이 같으면 어떤 워커 프로세스에서 만들어도 같은 값
+
+
+def index_response(entry):
+    response = make_response(entry[0])
+    response.set_etag(entry[1])
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    # 브라우저는 페이지를 저장해두되 매번 If-None-Match로 서버에 확인 요청을 보냄
+    # 사용자별 페이지이므로 공용 캐시(프록시)에는 저장하지 않도록 private으로 지정
+    return response.make_conditional(request)
+    # 요청의 If-None-Match가 ETag와 같으면 본문 없이 304 Not Modified로 응답
+
+
+def render_index(before, after):
+    posts, older, newer = get_posts_page(before=before, after=after)
+    return render_template('blog/index.html', posts=PostPage(posts, older, newer))
     # 'blog/index.html'이라는 템플릿 파일을 불러오고, posts 데이터를 넘겨줌
     # 템플릿에서는 이 posts를 반복문 등으로 활용하여 화면에 게시글 목록을 출력
+    # posts.older, posts.newer는 이전/다음 페이지 링크에 사용할 커서 (없으면 None)
+
+
+# 한 페이지 분량의 게시글 목록과 이전/다음 페이지 커서
+class PostPage(list):
+    def __init__(self, posts, older=None, newer=None):
+        super().__init__(posts)
+        self.older = older
+        self.newer = newer
+
+
+# 게시글을 STREAM_FETCH_ROWS개씩 DB에서 읽어 템플릿에 넘겨주는 목록 (스트리밍 모드)
+# fetchall()로 페이지 전체를 리스트로 만들지 않으므로, 메모리에는 지금 렌더링 중인 묶음만 남음
+# 묶음을 읽을 때마다 연결을 풀에 돌려주므로, 느린 클라이언트가 응답을 받는 동안 연결을 붙잡고 있지 않음
+# 다음 묶음은 마지막으로 읽은 행의 커서부터 다시 쿼리함 (키셋 페이지네이션과 같은 방식)
+# older/newer 커서는 행을 읽으면서 정해지므로, 템플릿의 페이지 링크는 게시글 목록 뒤에서 읽어야 함
+class PostStream:
+    def __init__(self, limit, before=None, fetch_rows=None):
+        self.limit = limit
+        self.before = before
+        self.fetch_rows = fetch_rows or limit + 1
+        self.older = None
+        self.newer = None
+        self.started = False # 템플릿이 게시글 목록을 읽기 시작했는지 (헤더 렌더링이 끝났는지)
+
+    def __iter__(self):
+        self.started = True
+        cursor = self.before
+        count = 0
+        while True:
+            size = min(self.fetch_rows, self.limit + 1 - count)
+            # limit + 1번째 행까지 읽어서 더 오래된 글이 남아 있는지 확인
+            posts = get_db().execute(
+                *posts_page_query(cursor, None, size - 1)
+            ).fetchall()
+            # posts_page_query는 limit + 1개의 행을 가져오므로 size - 1을 넘김
+            close_db()
+            # 행을 모두 읽었으므로 이 묶음을 렌더링하고 보내는 동안에는 연결을 풀에 돌려줌
+            # 그 대신 묶음 사이에 다른 요청이 쓴 글이 있으면 한 페이지 안에 섞여 보일 수 있음
+            for post in posts:
+                if count == self.limit:
+                    self.older = make_cursor(last)
+                    return
+                if count == 0 and self.before is not None:
+                    self.newer = make_cursor(post)
+                last = post
+                count += 1
+                yield post
+            if len(posts) < size:
+                return # 더 오래된 글이 없음
+            cursor = make_cursor(last)
+
+
+# 스트리밍 모드의 blog.index
+# stream_template()은 템플릿을 렌더링하면서 만들어지는 조각들을 바로 응답으로 보냄
+# 헤더(nav, 제목)는 게시글을 읽기 전에 바로 보내고, 게시글은 STREAM_CHUNK_SIZE 정도씩 모아서 보냄
+def stream_index(before, after):
+    if after is not None:
+        # 새로운 글 방향은 한 페이지를 거꾸로 읽은 뒤 뒤집어야 하므로 한 페이지를 먼저 가져옴
+        posts = PostPage(*get_posts_page(after=after))
+    else:
+        if before is not None:
+            parse_cursor(before) # 잘못된 커서는 응답을 시작하기 전에 400으로 거절
+        posts = PostStream(
+            current_app.config['POSTS_PER_PAGE'], before,
+            current_app.config['STREAM_FETCH_ROWS'],
+        )
+    close_db()
+    # 로그인한 사용자를 읽을 때 빌린 연결도 응답을 보내기 전에 돌려줌 (PostStream은 필요할 때 다시 빌림)
+
+    chunks = stream_template('blog/index.html', posts=posts)
+    # stream_template()은 요청 컨텍스트를 유지한 채 렌더링하므로, 응답을 보내는 동안에도 g.user와 get_db()를 사용 가능
+    response = current_app.response_class(
+        buffer_chunks(chunks, posts, current_app.config['STREAM_CHUNK_SIZE']),
+        mimetype='text/html',
+    )
+    response.headers['X-Accel-Buffering'] = 'no'
+    # nginx 같은 프록시가 응답을 모았다가 한 번에 보내지 않도록 함
+    return response
+
+
+# Jinja는 템플릿의 아주 작은 조각(태그 사이의 문자열)마다 값을 만들어내므로,
+# 조각마다 보내면 전송 횟수가 너무 많아짐. size 글자 이상 모이면 한 번에 보냄
+# 단, 게시글 목록을 읽기 시작하는 순간 그때까지의 헤더 부분은 바로 보내서 첫 바이트가 빨리 도착하도록 함
+def buffer_chunks(chunks, posts, size):
+    buffer = []
+    length = 0
+    header_sent = False
+    for chunk in chunks:
+        if not header_sent and getattr(posts, 'started', True):
+            header_sent = True
+            if buffer:
+                yield ''.join(buffer)
+                buffer = []
+                length = 0
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+# 키셋(keyset) 페이지네이션에서 사용하는 커서
+# OFFSET 방식은 앞의 행들을 모두 건너뛰어야 하므로 뒤 페이지로 갈수록 느려지지만,
+# (created, id) 값을 기준으로 "이 글보다 오래된 글"을 인덱스에서 바로 찾으면 페이지 깊이와 무관하게 비용이 일정
+# created만으로는 같은 시각에 작성된 글을 구분할 수 없으므로 id를 함께 사용
+def make_cursor(post):
+    return f"{post['created'].isoformat(' ')}|{post['id']}"
+    # 예: '2025-07-07 10:00:00|42'
+    # created는 timestamp 변환기에 의해 datetime 객체이므로, DB에 저장된 문자열 형식으로 되돌림
+
+
+def parse_cursor(value):
+    try:
+        created, id = value.rsplit('|', 1)
+        created = datetime.fromisoformat(created)
+        id = int(id)
+    except ValueError:
+        abort(400, 'Invalid page cursor.')
+        # 잘못된 커서가 주어지면 400 Bad Request
+    if created.tzinfo is not None or not 0 <= id < 2 ** 63:
+        abort(400, 'Invalid page cursor.')
+    return created.isoformat(' '), id
+    # created는 DB에 문자열('2025-07-07 10:00:00')로 저장되어 있고 문자열로 비교하므로,
+    # 받은 문자열을 그대로 쓰지 않고 같은 형식으로 다시 만듦
+    # fromisoformat()은 '2025-07-07T10:00:00'도 받아들이는데, 그대로 비교하면 'T' > ' ' 이므로
+    # 그날의 더 새로운 글까지 "더 오래된 글"에 들어감
+
+
+# before/after 커서를 기준으로 한 페이지 분량의 게시글을 가져옴
+# (posts, older, newer)를 반환하며, older/newer는 이전/다음 페이지가 있을 때만 커서 문자열
+# 한 행을 더(limit + 1) 가져와서 다음 페이지가 존재하는지 추가 쿼리 없이 판단
+# author_id를 주면 그 사용자가 쓴 글만 가져옴 (users.py의 사용자별 목록)
+# excerpts가 True이면 body에 본문 전체 대신 요약(excerpt)을 담음 (None이면 LIST_EXCERPTS 설정을 따름)
+def get_posts_page(before=None, after=None, limit=None, author_id=None, excerpts=None):
+    if limit is None:
+        limit = current_app.config['POSTS_PER_PAGE']
+    posts = get_db().execute(
+        *posts_page_query(before, after, limit, author_id, excerpts)
+    ).fetchall()
+    return finish_page(posts, before, after, limit)
+
+
+# 목록 쿼리에서 읽을 본문 열
+# 요약을 읽으면 큰 본문을 페이지 캐시로 읽어 들이거나 압축을 풀지 않아도 됨
+def body_column(excerpts=None):
+    if excerpts is None:
+        excerpts = current_app.config['LIST_EXCERPTS']
+    return 'excerpt AS body' if excerpts else 'body'
+
+
+# get_posts_page에서 실행할 (SQL, 파라미터)
+def posts_page_query(before, after, limit, author_id=None, excerpts=None):
+    query = (
+        f'SELECT p.id, title, {body_column(excerpts)}, created, author_id, username, version'
+        ' FROM post p JOIN user u ON p.author_id = u.id'
+    )
+    where = []
+    params = []
+    if author_id is not None:
+        where.append('p.author_id = ?')
+        params.append(author_id)
+    if after is not None:
+        # 더 새로운 글 방향으로는 오름차순으로 가져온 뒤 뒤집어서 최신 글이 위에 오도록 함
+        where.append('(p.created, p.id) > (?, ?)')
+        params.extend(parse_cursor(after))
+        order = 'ASC'
+    else:
+        if before is not None:
+            where.append('(p.created, p.id) < (?, ?)')
+            params.extend(parse_cursor(before))
+        order = 'DESC'
+    if where:
+        query += ' WHERE ' + ' AND '.join(where)
+    query += f' ORDER BY p.created {order}, p.id {order} LIMIT ?'
+    params.append(limit + 1)
+    # schema.sql의 post_created_id 인덱스 (author_id가 있으면 user_stats.sql의 post_author_created 인덱스)
+    # 덕분에 정렬 없이 인덱스 순서대로 LIMIT 만큼만 읽음
+    return query, tuple(params)
+
+
+# 가져온 limit + 1개의 행으로 (posts, older, newer)를 만듦
+def finish_page(posts, before, after, limit):
+    has_more = len(posts) > limit
+    posts = posts[:limit]
+
+    if after is not None:
+        posts.reverse()
+        newer = make_cursor(posts[0]) if has_more else None
+        older = make_cursor(posts[-1]) if posts else None
+    else:
+        newer = make_cursor(posts[0]) if posts and before is not None else None
+        older = make_cursor(posts[-1]) if has_more else None
+
+    return posts, older, newer
+
+# /search?q=검색어&page=2 형식의 요청을 처리하는 검색 뷰
+# post_fts 전문 검색 인덱스(search.sql)를 사용하므로 post 테이블 전체를 읽지 않음
+@bp.route('/search')
+def search():
+    q = request.args.get('q', '').strip()
+    page = search_page()
+    limit = current_app.config['POSTS_PER_PAGE']
+
+    results = []
+    has_next = False
+    if q:
+        results = get_db().execute(*search_query(q, limit, page)).fetchall()
+        has_next = len(results) > limit and page < current_app.config['SEARCH_MAX_PAGE']
+        results = results[:limit]
+        # 검색 결과는 관련도 순이므로 (created, id) 키셋 대신 페이지 번호를 사용
+
+    return render_template(
+        'blog/search.html', q=q, results=results, page=page, has_next=has_next
+    )
+
+
+# ?page= 값을 1 ~ SEARCH_MAX_PAGE 범위로 제한
+# OFFSET이 클수록 SQLite는 앞의 결과를 모두 계산하고 버려야 하고,
+# 아주 큰 값은 SQLite 정수 범위를 넘어 OverflowError(500)가 나므로 마지막 페이지를 정해둠
+def search_page():
+    page = request.args.get('page', 1, type=int)
+    # type=int: 숫자가 아니면 기본값 1을 사용
+    return min(max(page, 1), current_app.config['SEARCH_MAX_PAGE'])
+
+
+# search에서 실행할 (SQL, 파라미터). 다음 페이지가 있는지 알기 위해 limit + 1개를 가져옴
+def search_query(q, limit, page):
+    return (
+        'SELECT p.id, p.title, created, author_id, username,'
+        # highlight()/snippet()은 일치한 단어 앞뒤에 표시 문자를 넣어줌
+        # HTML 태그를 바로 넣으면 본문의 HTML과 구분할 수 없으므로, 제어 문자로 표시한 뒤 템플릿에서 <mark>로 바꿈
+        " highlight(post_fts, 0, char(2), char(3)) AS title_match,"
+        " snippet(post_fts, 1, char(2), char(3), '…', 32) AS body_match"
+        ' FROM post_fts'
+        ' JOIN post p ON p.id = post_fts.rowid'
+        ' JOIN user u ON p.author_id = u.id'
+        ' WHERE post_fts MATCH ?'
+        ' ORDER BY bm25(post_fts, 10.0, 1.0)'
+        # bm25 점수는 관련성이 높을수록 작은 값이므로 오름차순 정렬
+        # 제목에서 일치한 경우가 본문보다 10배 중요하도록 가중치를 줌
+        ' LIMIT ? OFFSET ?',
+        (fts_query(q), limit + 1, (page - 1) * limit)
+    )
+
+
+# 사용자가 입력한 문자열을 FTS5 쿼리로 변환
+# 큰따옴표("), AND, OR, * 같은 FTS5 문법이 그대로 들어가면 구문 오류가 나므로,
+# 각 단어를 큰따옴표로 감싸서 일반 단어로만 취급 (모든 단어를 포함하는 글을 찾음)
+def fts_query(q):
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in q.split())
+
+
+# highlight()/snippet()이 넣은 표시 문자를 <mark> 태그로 바꾸는 템플릿 필터
+# 먼저 escape()로 본문의 HTML을 이스케이프한 뒤 태그를 넣으므로, 게시글 내용으로 인한 XSS는 발생하지 않음
+@bp.app_template_filter('search_highlight')
+def search_highlight(text):
+    return Markup(
+        str(escape(text)).replace('\x02', '<mark>').replace('\x03', '</mark>')
+    )
+
 
 # bp는 Blueprint 객체이며, / URL 경로로 접근하면 아래 함수를 실행
 # /create 경로를 처리하는 라우팅 함수
@@ -50,16 +362,19 @@ def create():
         if error is not None: # 에러가 있을 경우
             flash(error)
         else:
-            db = get_db() # 데이터베이스 연결 객체 가져옴
-            db.execute( # db.execute는 사용자 입력을 위한 ? 플레이스홀더가 포함된 SQL 쿼리를 받고, 이 플레이스홀더를 대체할 값들의 튜플을 받음
+            result = execute_write( # execute_write는 사용자 입력을 위한 ? 플레이스홀더가 포함된 SQL 쿼리를 받고, 이 플레이스홀더를 대체할 값들의 튜플을 받음
                         # 데이터베이스 라이브러리는 이 값들을 이스케이프 처리하므로, SQL 인젝션 공격에 취약하지 않게 됨
-                'INSERT INTO post (title, body, author_id)' # 게시글 정보를 post 테이블에 삽입
-                ' VALUES (?, ?, ?)', # 쿼리를 직접 문자열로 조합하지 않고 플레이스홀더(?)를 사용함으로써, SQL 주입 공격을 막고 보안을 강화
-                (title, body, g.user['id'])
+                'INSERT INTO post (title, body, excerpt, author_id)' # 게시글 정보를 post 테이블에 삽입
+                ' VALUES (?, ?, ?, ?)', # 쿼리를 직접 문자열로 조합하지 않고 플레이스홀더(?)를 사용함으로써, SQL 주입 공격을 막고 보안을 강화
+                (title, *store_body(body), g.user['id'])
+                # store_body()는 (저장할 본문, 요약)을 반환. 큰 본문은 압축되어 저장됨
                 # INSERT 같은 데이터 조작 SQL은 커밋을 해야 DB에 실제 반영
-                # 이 쿼리는 데이터를 수정하므로, 변경 사항을 저장하기 위해 이후에 db.commit()이 호출되어야 함
+                # execute_write()는 쿼리를 실행하고 커밋까지 마친 뒤 반환
+                # (GROUP_COMMIT이 켜져 있으면 다른 요청들의 쓰기와 함께 한 번에 커밋)
             )
-            db.commit() # 데이터베이스에 커밋하여 저장
+            invalidate_post(result.lastrowid) # 같은 id로 캐시된 행이 남아 있지 않도록 지움
+            invalidate_index() # 캐시된 게시글 목록 페이지를 무효화
+            after_post_write(result.lastrowid) # 응답을 보낸 뒤 백그라운드에서 할 일
             return redirect(url_for('blog.index')) # 글 작성이 완료되면 blog.index 뷰로 리디렉션
 
     return render_template('blog/create.html')
@@ -72,19 +387,12 @@ def create():
 # 예: 게시글 보기(view) 페이지에서는 누구든지 볼 수 있지만, 수정/삭제는 작성자만 가능해야 함
 # 이 옵션은 get_post() 함수를 여러 용도로 재사용 가능하게 만들어 줌
 def get_post(id, check_author=True):
-    post = get_db().execute( # get_db()를 호출하고 그 결과에서 execute()를 호출하여 쿼리를 실행
-        'SELECT p.id, title, body, created, author_id, username'
-        ' FROM post p JOIN user u ON p.author_id = u.id'
-        ' WHERE p.id = ?',
-        (id,)
-        # (id,): 1개의 요소만 있는 튜플(tuple)
-        # Python에서 튜플을 만들 때는 쉼표가 중요
-        # 괄호는 시각적 구분을 위한 것이고, 쉼표가 있어야 진짜 튜플
-        # ? 자리에 들어갈 값은 튜플 또는 리스트 형태로 전달되어야 함
-        # 튜플로 전달하지 않으면 execute() 함수가 에러를 발생시킴
-        # id 하나만 전달하는 경우에도 반드시 튜플 형태로 (id,)라고 써야 함
-    ).fetchone()
+    return check_post(id, load_post(id), check_author)
+
 
+# 게시글이 없으면 404, 작성자 확인이 필요한데 작성자가 아니면 403
+# (blog_async.get_post도 같은 규칙을 사용)
+def check_post(id, post, check_author):
     if post is None: # 게시글이 존재하지 않는 경우
         abort(404, f"Post id {id} doesn't exist.")
         # abort()는 HTTP 상태 코드를 반환하는 특별한 예외를 발생시킴
@@ -102,6 +410,46 @@ def get_post(id, check_author=True):
     return post
 
 
+# 게시글 행을 캐시에서 꺼내거나, 없으면 DB에서 읽어 캐시에 저장
+# 캐시에 있더라도 다른 워커 프로세스에서 수정/삭제되었을 수 있으므로,
+# 기본 키로 version 하나만 읽어 캐시된 행의 version과 비교 (user 테이블과의 JOIN은 하지 않음)
+def load_post(id):
+    cached = get_post_cache().get(id)
+    return remember_post(id, cached, fetch_post(get_db(), id, cached))
+
+
+# fetch_post의 결과를 캐시에 반영
+def remember_post(id, cached, post):
+    if post is not cached:
+        cache = get_post_cache()
+        if cached is not None:
+            cache.discard(id) # 수정되었거나 삭제된 게시글
+        if post is not None:
+            cache.set(id, post)
+    return post
+
+
+# DB에서 게시글 행을 읽음. cached가 주어지고 version이 같으면 cached를 그대로 반환
+def fetch_post(db, id, cached=None):
+    if cached is not None:
+        row = db.execute('SELECT version FROM post WHERE id = ?', (id,)).fetchone()
+        if row is not None and row['version'] == cached['version']:
+            return cached
+
+    return db.execute( # get_db()를 호출하고 그 결과에서 execute()를 호출하여 쿼리를 실행
+        'SELECT p.id, title, body, created, author_id, username, version'
+        ' FROM post p JOIN user u ON p.author_id = u.id'
+        ' WHERE p.id = ?',
+        (id,)
+        # (id,): 1개의 요소만 있는 튜플(tuple)
+        # Python에서 튜플을 만들 때는 쉼표가 중요
+        # 괄호는 시각적 구분을 위한 것이고, 쉼표가 있어야 진짜 튜플
+        # ? 자리에 들어갈 값은 튜플 또는 리스트 형태로 전달되어야 함
+        # 튜플로 전달하지 않으면 execute() 함수가 에러를 발생시킴
+        # id 하나만 전달하는 경우에도 반드시 튜플 형태로 (id,)라고 써야 함
+    ).fetchone()
+
+
 # 이 라우트는 /1/update, /42/update처럼 게시글 ID를 포함한 URL을 처리
 # URL 경로의 <int:id>는 Flask가 URL에서 ID를 추출할 수 있게 해줌
 # 실제 URL은 /1/update와 같을 것
@@ -123,15 +471,15 @@ def update(id): # 게시글 ID를 인자로 받아 처리
         if error is not None: # 오류가 있으면 flash()로 사용자에게 메시지를 보여줌
             flash(error)
         else:
-            db = get_db()
-            db.execute( # 게시글을 수정하는 SQL UPDATE 쿼리를 실행
-                'UPDATE post SET title = ?, body = ?'
+            execute_write( # 게시글을 수정하는 SQL UPDATE 쿼리를 실행하고 커밋
+                'UPDATE post SET title = ?, body = ?, excerpt = ?'
                 ' WHERE id = ?',
-                (title, body, id)
+                (title, *store_body(body), id)
                 # 데이터 조작 SQL은 커밋을 해야 DB에 실제 반영
-                # 이 쿼리는 데이터를 수정하므로, 변경 사항을 저장하기 위해 이후에 db.commit()이 호출되어야 함
             )
-            db.commit() # 데이터베이스에 커밋하여 저장
+            invalidate_post(id) # 캐시된 수정 전 게시글을 지움
+            invalidate_index() # 캐시된 게시글 목록 페이지를 무효화
+            after_post_write(id)
             return redirect(url_for('blog.index')) # 수정이 완료되면 블로그 메인 페이지로 리디렉션
 
     return render_template('blog/update.html', post=post)
@@ -151,13 +499,26 @@ def update(id): # 게시글 ID를 인자로 받아 처리
 def delete(id):
     get_post(id) # 삭제 전, 게시글이 존재하는지 확인하기 위해 get_post() 함수를 호출
                 # 게시글이 없으면 404 오류를 발생
-    db = get_db()
-    db.execute('DELETE FROM post WHERE id = ?', (id,)) # 게시글을 삭제하는 SQL DELETE 쿼리를 실행
+    execute_write('DELETE FROM post WHERE id = ?', (id,)) # 게시글을 삭제하는 SQL DELETE 쿼리를 실행
                 # 데이터 조작 SQL은 커밋을 해야 DB에 실제 반영
-                # 이 쿼리는 데이터를 수정하므로, 변경 사항을 저장하기 위해 이후에 db.commit()이 호출되어야 함
-    db.commit()
-    # 데이터베이스에 커밋하여 저장
-    # DB에 변경사항(삭제)을 확정(commit)
-    # 이걸 하지 않으면 삭제가 실제로 적용되지 않음
+                # execute_write()는 쿼리를 실행한 뒤 DB에 변경사항(삭제)을 확정(commit)
+                # 커밋하지 않으면 삭제가 실제로 적용되지 않음
+    invalidate_post(id) # 캐시된 게시글을 지움
+    invalidate_index() # 캐시된 게시글 목록 페이지를 무효화
     return redirect(url_for('blog.index'))
-    # 삭제가 완료되면 블로그 글 목록 페이지(blog.index)로 이동
\ No newline at end of file
+    # 삭제가 완료되면 블로그 글 목록 페이지(blog.index)로 이동
+
+
+# 게시글을 쓰거나 고친 뒤, 응답을 보내고 나서 백그라운드 작업(jobs.py)으로 할 일
+# 요청은 커밋과 캐시 무효화까지만 하고 바로 응답하므로, 아래 작업의 시간은 쓰기 요청의 응답 시간에 더해지지 않음
+# FTS5 인덱스의 세그먼트는 SQLite가 쓰기 중에 스스로 병합하므로(automerge) 따로 병합하는 작업은 두지 않음
+def after_post_write(id):
+    defer('blog.warm_post', id)
+
+
+@task('blog.warm_post', durable=False)
+def warm_post(id):
+    # 방금 쓴 게시글을 이 프로세스의 캐시에 다시 넣어서, 다음 get_post가 DB에서 JOIN 쿼리를 하지 않도록 함
+    # 캐시는 프로세스마다 따로 있으므로 JOBS_DURABLE이어도 job 테이블에 기록하지 않음
+    # (flask worker가 실행하면 요청을 받지 않는 worker 프로세스의 캐시만 채움)
+    load_post(id)
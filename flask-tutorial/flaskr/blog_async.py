@@ -0,0 +1,127 @@
+from flask import (
+    Blueprint, current_app, flash, g, redirect, render_template, request, session, url_for
+)
+
+from flaskr import blog
+from flaskr.aio import execute_write, get_async_db
+from flaskr.auth import login_required
+from flaskr.cache import (
+    get_index_cache, get_post_cache, get_post_generation, invalidate_index, invalidate_post
+)
+from flaskr.db import store_body
+
+bp = Blueprint('blog', __name__)
+# blog.py의 async 버전 (ASYNC_VIEWS=True일 때 blog.py 대신 등록)
+# 블루프린트 이름과 URL이 blog.py와 같으므로 url_for('blog.index'), 템플릿 등은 그대로 사용
+# 쿼리(SQL)와 페이지 커서, 캐시, 권한 확인은 blog.py의 함수를 그대로 쓰고,
+# 쿼리를 실행하는 부분만 aio.py의 전용 스레드에서 실행하고 await로 기다림
+# STREAM_INDEX는 지원하지 않음 (스트리밍 응답은 요청 스레드에서 DB 커서를 읽어야 하므로, 항상 페이지 전체를 렌더링)
+
+bp.add_app_template_filter(blog.search_highlight, 'search_highlight')
+
+
+@bp.route('/')
+async def index():
+    before = request.args.get('before')
+    after = request.args.get('after')
+
+    if session.get('_flashes'):
+        return await render_index(before, after)
+
+    cache = get_index_cache()
+    generation = await get_async_db().run(get_post_generation)
+    key = cache.key(generation, before, after, g.user['id'] if g.user else None)
+    entry = cache.get(key)
+    if entry is None:
+        entry = blog.index_entry(await render_index(before, after))
+        cache.set(key, entry)
+    return blog.index_response(entry)
+
+
+async def render_index(before, after):
+    limit = current_app.config['POSTS_PER_PAGE']
+    posts = await get_async_db().fetchall(*blog.posts_page_query(before, after, limit))
+    posts, older, newer = blog.finish_page(posts, before, after, limit)
+    return render_template('blog/index.html', posts=blog.PostPage(posts, older, newer))
+
+
+@bp.route('/search')
+async def search():
+    q = request.args.get('q', '').strip()
+    page = blog.search_page()
+    limit = current_app.config['POSTS_PER_PAGE']
+
+    results = []
+    has_next = False
+    if q:
+        results = await get_async_db().fetchall(*blog.search_query(q, limit, page))
+        has_next = len(results) > limit and page < current_app.config['SEARCH_MAX_PAGE']
+        results = results[:limit]
+
+    return render_template(
+        'blog/search.html', q=q, results=results, page=page, has_next=has_next
+    )
+
+
+# blog.get_post의 async 버전. 캐시 확인과 404/403 규칙은 같음
+async def get_post(id, check_author=True):
+    cached = get_post_cache().get(id)
+    post = await get_async_db().run(blog.fetch_post, id, cached)
+    # version 확인과 (필요하면) 전체 행 읽기를 한 번에 전용 스레드에서 실행
+    return blog.check_post(id, blog.remember_post(id, cached, post), check_author)
+
+
+@bp.route('/create', methods=('GET', 'POST'))
+@login_required
+async def create():
+    if request.method == 'POST':
+        title = request.form['title']
+        body = request.form['body']
+
+        if not title:
+            flash('Title is required.')
+        else:
+            result = await execute_write(
+                'INSERT INTO post (title, body, excerpt, author_id) VALUES (?, ?, ?, ?)',
+                (title, *store_body(body), g.user['id'])
+            )
+            invalidate_post(result.lastrowid)
+            invalidate_index()
+            blog.after_post_write(result.lastrowid)
+            return redirect(url_for('blog.index'))
+
+    return render_template('blog/create.html')
+
+
+@bp.route('/<int:id>/update', methods=('GET', 'POST'))
+@login_required
+async def update(id):
+    post = await get_post(id)
+
+    if request.method == 'POST':
+        title = request.form['title']
+        body = request.form['body']
+
+        if not title:
+            flash('Title is required.')
+        else:
+            await execute_write(
+                'UPDATE post SET title = ?, body = ?, excerpt = ? WHERE id = ?',
+                (title, *store_body(body), id)
+            )
+            invalidate_post(id)
+            invalidate_index()
+            blog.after_post_write(id)
+            return redirect(url_for('blog.index'))
+
+    return render_template('blog/update.html', post=post)
+
+
+@bp.route('/<int:id>/delete', methods=('POST',))
+@login_required
+async def delete(id):
+    await get_post(id)
+    await execute_write('DELETE FROM post WHERE id = ?', (id,))
+    invalidate_post(id)
+    invalidate_index()
+    return redirect(url_for('blog.index'))
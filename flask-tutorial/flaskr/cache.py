@@ -0,0 +1,168 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+from flaskr import stats
+
+
+# 프로세스 안에서 사용하는 LRU(Least Recently Used) 캐시
+# 가득 차면 가장 오랫동안 사용되지 않은 항목부터 버림
+# OrderedDict는 항목의 순서를 기억하므로, 사용할 때마다 맨 뒤로 옮기면 맨 앞이 가장 오래된 항목이 됨
+# 여러 스레드가 동시에 접근할 수 있으므로 모든 연산을 Lock으로 보호
+class LRUCache:
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize # 최대 항목 수 (0이면 캐시를 사용하지 않음)
+        self.ttl = ttl # 항목의 유효 시간(초), None이면 만료되지 않음
+        self._data = OrderedDict() # key -> (저장 시각, 값)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and self.ttl is not None \
+                    and time.monotonic() - item[0] > self.ttl:
+                del self._data[key] # 유효 시간이 지난 항목은 없는 것으로 취급
+                item = None
+            if item is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key) # 최근에 사용한 항목을 맨 뒤로 옮김
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False) # 가장 오래된 항목을 버림
+
+    def pop(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return None if item is None else item[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+            }
+
+
+# 렌더링된 페이지를 저장하는 캐시
+# 게시글이 바뀔 때마다 항목을 하나하나 찾아 지우는 대신 version을 1 올림
+# 키에 version이 들어가므로, 이전 version의 항목은 더 이상 조회되지 않고 LRU에 의해 자연스럽게 밀려남
+# version은 이 프로세스 안에서만 올라가므로, 키에는 DB의 변경 카운터(get_post_generation)도 함께 넣음
+# 다른 프로세스에서 바뀐 게시글은 카운터가 달라져서 반영되고, 카운터가 없는 DB에서도 ttl초 뒤에는 다시 렌더링
+class PageCache:
+    def __init__(self, maxsize, ttl=None):
+        self.version = 0
+        self.entries = LRUCache(maxsize, ttl)
+        self._lock = threading.Lock()
+
+    def key(self, generation, *parts):
+        return (generation, self.version, *parts)
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value):
+        self.entries.set(key, value)
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+
+    def stats(self):
+        return dict(self.entries.stats(), version=self.version)
+
+
+# DB의 게시글 변경 카운터 (post_changes.sql). 게시글이 바뀐 트랜잭션에서 트리거가 올림
+# post_changes.sql을 실행하기 전의 DB에서는 None
+def get_post_generation(db):
+    try:
+        row = db.execute("SELECT value FROM change_counter WHERE name = 'post'").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return None if row is None else row[0]
+
+
+def get_index_cache():
+    return current_app.extensions['flaskr.index_cache']
+
+
+# 게시글을 생성/수정/삭제한 뒤 호출하여 blog.index의 캐시된 페이지를 무효화
+def invalidate_index():
+    get_index_cache().invalidate()
+
+
+def get_user_cache():
+    return current_app.extensions['flaskr.user_cache']
+
+
+# 사용자 정보(비밀번호 해시 등)가 바뀐 뒤 호출하여, 캐시된 이전 user 행을 지움
+def invalidate_user(user_id):
+    get_user_cache().pop(user_id)
+
+
+# 게시글 행을 저장하는 캐시
+# 같은 프로세스에서 수정/삭제한 게시글은 invalidate_post()로 바로 지우지만,
+# 다른 워커 프로세스에서 수정한 게시글은 알 수 없으므로 꺼낼 때마다 DB의 version과 비교 (blog.get_post)
+# stale: 캐시에 있었지만 version이 달라서(또는 삭제되어서) 버린 횟수
+class PostCache(LRUCache):
+    def __init__(self, maxsize, ttl=None):
+        super().__init__(maxsize, ttl)
+        self.stale = 0
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self.stale += 1
+
+    def stats(self):
+        result = super().stats()
+        with self._lock:
+            result['stale'] = self.stale
+        return result
+
+
+def get_post_cache():
+    return current_app.extensions['flaskr.post_cache']
+
+
+# 게시글을 수정/삭제한 뒤 호출하여, 캐시된 이전 post 행을 지움
+def invalidate_post(post_id):
+    get_post_cache().pop(post_id)
+
+
+def init_app(app):
+    app.extensions['flaskr.index_cache'] = cache = PageCache(
+        app.config['INDEX_CACHE_SIZE'], ttl=app.config['INDEX_CACHE_TTL']
+    )
+    stats.register(app, 'index_cache', cache.stats)
+
+    app.extensions['flaskr.user_cache'] = users = LRUCache(
+        app.config['USER_CACHE_SIZE'], ttl=app.config['USER_CACHE_TTL']
+    )
+    stats.register(app, 'user_cache', users.stats)
+    # 다른 워커 프로세스에서 바뀐 사용자 정보는 invalidate_user()로 지울 수 없으므로,
+    # TTL이 지나면 다시 DB에서 읽도록 하여 오래된 정보가 남아 있는 시간을 제한
+
+    app.extensions['flaskr.post_cache'] = posts = PostCache(
+        app.config['POST_CACHE_SIZE'], ttl=app.config['POST_CACHE_TTL']
+    )
+    stats.register(app, 'post_cache', posts.stats)
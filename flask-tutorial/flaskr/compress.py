@@ -0,0 +1,70 @@
+import zlib
+
+from flask import current_app, request
+
+
+# HTML, JSON 응답을 gzip 또는 deflate로 압축하는 after_request 함수
+# 브라우저가 Accept-Encoding 헤더로 알려준 방식 중 가장 선호하는 것을 고르고,
+# 작은 응답은 압축해도 크기가 거의 줄지 않으므로 COMPRESS_MIN_SIZE 바이트 이상일 때만 압축
+# 스트리밍 응답(STREAM_INDEX)은 조각마다 압축하여 바로 보냄
+def compress_response(response):
+    config = current_app.config
+    if response.mimetype not in config['COMPRESS_MIMETYPES']:
+        return response
+    response.vary.add('Accept-Encoding')
+    # 같은 URL이라도 Accept-Encoding에 따라 응답이 달라진다는 것을 캐시(브라우저, 프록시)에 알림
+
+    if response.status_code < 200 or response.status_code in (204, 206, 304) \
+            or response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+    # 본문이 없는 응답, 부분 응답(Range), 파일을 그대로 보내는 응답, 이미 압축된 응답은 건드리지 않음
+
+    encoding = request.accept_encodings.best_match(('gzip', 'deflate'))
+    if encoding is None:
+        return response
+
+    level = config['COMPRESS_LEVEL']
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding, level)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config['COMPRESS_MIN_SIZE']:
+            return response
+        compressor = make_compressor(encoding, level)
+        response.set_data(compressor.compress(data) + compressor.flush())
+        # set_data()는 Content-Length도 압축된 크기로 바꿈
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+        # 압축된 본문은 원래 본문과 바이트가 다르므로 강한(strong) ETag를 그대로 쓸 수 없음
+        # 약한(weak) ETag로 바꾸면 If-None-Match 비교(304 응답)는 그대로 동작
+    return response
+
+
+def make_compressor(encoding, level):
+    wbits = 16 + zlib.MAX_WBITS if encoding == 'gzip' else zlib.MAX_WBITS
+    # wbits: 16을 더하면 gzip 형식, 그대로면 zlib 형식 (HTTP의 deflate는 zlib 형식을 의미)
+    return zlib.compressobj(level, zlib.DEFLATED, wbits)
+
+
+def compress_stream(chunks, encoding, level):
+    compressor = make_compressor(encoding, level)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            # Z_SYNC_FLUSH: 지금까지 받은 데이터를 모두 내보내서, 브라우저가 이 조각을 바로 풀어서 표시할 수 있게 함
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def init_app(app):
+    app.after_request(compress_response)
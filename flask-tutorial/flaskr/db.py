@@ -1,8 +1,22 @@
+import csv
+import itertools
+import json
+import os
+import queue
+import random
 import sqlite3
-from datetime import datetime
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from urllib.parse import quote
 
 import click
-from flask import current_app, g
+from flask import current_app, g, has_request_context, request
+from werkzeug.security import generate_password_hash
+
+from flaskr.instrument import InstrumentedConnection, QueryStats
 # current_app은 현재 실행 중인 Flask 앱 인스턴스를 가리킴
 # Flask의 앱 팩토리 패턴을 쓸 때는 앱 객체가 전역에 존재하지 않음
 # get_db는 애플리케이션이 생성되어 요청을 처리하고 있을 때 호출되므로 current_app을 사용
@@ -11,34 +25,246 @@ from flask import current_app, g
 # 이 안에 DB 연결을 저장해두면 같은 요청 내에서는 효율적으로 재사용 가능
 
 
-def get_db():
-    if 'db' not in g:
-        # sqlite3.connect()는 config['DATABASE']에 지정된 경로에 연결을 시도
-        # 파일이 없으면, init-db 명령 등을 통해 나중에 데이터베이스를 초기화하면 파일이 생성됨
-        g.db = sqlite3.connect(
-            current_app.config['DATABASE'],
-            detect_types=sqlite3.PARSE_DECLTYPES
-            # sqlite3.register_converter(
-            #    "timestamp", lambda v: datetime.fromisoformat(v.decode())
-            # ) 를 작동하기 위한 옵션
+# 요청마다 sqlite3.connect()로 새 연결을 열고 닫으면 파일 열기, 스키마 파싱, 빈 페이지 캐시로 인한 비용이 매번 발생
+# ConnectionPool은 한 번 연 연결을 닫지 않고 보관해두었다가 다음 요청에 다시 빌려줌
+# 최근에 반납된 연결을 먼저 꺼내도록 LIFO 큐를 사용하여, 페이지 캐시가 데워진(warm) 연결을 우선 재사용
+class PoolTimeout(Exception):
+    pass
+    # 풀의 모든 연결이 사용 중이고 timeout 동안 반납되지 않았을 때 발생
+
+
+class ConnectionPool:
+    def __init__(self, connect, size, timeout=10.0, recycle=3600.0):
+        self.connect = connect # 새 연결을 만드는 함수
+        self.size = size # 동시에 빌려줄 수 있는 최대 연결 수
+        self.timeout = timeout # 연결을 기다리는 최대 시간(초)
+        self.recycle = recycle # 연결을 이 시간(초)보다 오래 사용했다면 닫고 새로 만듦
+        self.pid = os.getpid()
+        # fork된 자식 프로세스는 부모의 연결을 공유하면 안 되므로, 어느 프로세스의 풀인지 기록
+
+        self._idle = queue.LifoQueue() # 반납된 (연결, 생성 시각) 목록
+        self._slots = threading.BoundedSemaphore(size)
+        # 세마포어로 동시에 빌려준 연결 수를 size 이하로 제한
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0, # 보관 중인 연결을 재사용한 횟수
+            'waits': 0, # 빈 연결이 없어 기다려야 했던 횟수
+            'timeouts': 0, # 기다리다 PoolTimeout이 발생한 횟수
+            'created': 0, # 새로 만든 연결 수
+            'recycled': 0, # 오래되었거나 상태 검사에 실패해서 닫은 연결 수
+            'in_use': 0, # 현재 빌려준 연결 수
+        }
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, size=self.size, idle=self._idle.qsize())
+
+    def _new(self):
+        self._count('created')
+        return self.connect(), time.monotonic()
+
+    def _healthy(self, conn, created_at):
+        # 너무 오래된 연결이거나 SELECT 1조차 실패하는 연결은 버림
+        if time.monotonic() - created_at > self.recycle:
+            return False
+        try:
+            conn.execute('SELECT 1')
+        except sqlite3.Error:
+            return False
+        return True
+
+    def acquire(self):
+        if not self._slots.acquire(blocking=False):
+            # 모든 연결이 사용 중이면 다른 요청이 반납할 때까지 기다림
+            self._count('waits')
+            if not self._slots.acquire(timeout=self.timeout):
+                self._count('timeouts')
+                raise PoolTimeout('Timed out waiting for a database connection.')
+
+        try:
+            try:
+                conn, created_at = self._idle.get_nowait()
+            except queue.Empty:
+                conn, created_at = self._new()
+            else:
+                if self._healthy(conn, created_at):
+                    self._count('hits')
+                else:
+                    self._count('recycled')
+                    conn.close()
+                    conn, created_at = self._new()
+        except BaseException:
+            self._slots.release()
+            raise
+
+        conn.pool = self
+        conn.pool_created_at = created_at
+        self._count('in_use')
+        return conn
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+                # 커밋되지 않은 변경은 다음 요청으로 넘어가지 않도록 되돌림
+            self._idle.put((conn, conn.pool_created_at))
+        except sqlite3.Error:
+            self._count('recycled')
+            conn.close()
+        finally:
+            self._count('in_use', -1)
+            self._slots.release()
+
+    def close(self):
+        # 보관 중인 연결을 모두 닫음
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+
+
+# 풀에서 사용하는 sqlite3.Connection은 다른 스레드로 넘겨질 수 있으므로 check_same_thread=False로 생성
+# InstrumentedConnection을 상속하여 요청마다 실행된 쿼리의 수, 시간, 행 수를 기록 (instrument.py)
+class PooledConnection(InstrumentedConnection):
+    pool = None # 이 연결을 빌려준 풀 (풀을 사용하지 않는 연결이면 None)
+    pool_created_at = None
+
+
+def connect(app, readonly=False, **kwargs):
+    # 새 SQLite 연결을 만드는 함수. 풀과 CLI 명령 등이 모두 이 함수를 통해 연결을 만듦
+    # readonly=True이면 mode=ro URI로 열어서 SQLite 수준에서 쓰기를 막음
+    database = app.config['DATABASE']
+    if readonly:
+        database = f'file:{quote(os.path.abspath(database))}?mode=ro'
+        kwargs['uri'] = True
+    db = sqlite3.connect(
+        database,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        # sqlite3.register_converter(
+        #    "timestamp", lambda v: datetime.fromisoformat(v.decode())
+        # ) 를 작동하기 위한 옵션
+        factory=PooledConnection,
+        **kwargs
+    )
+    db.row_factory = sqlite3.Row
+    db.create_function('body_text', 1, body_text, deterministic=True)
+    # 압축 저장된 게시글 본문을 SQL 안에서 풀어야 하는 곳(검색 인덱스 트리거 등)에서 사용하는 함수
+    # sqlite3.Row는 연결에게 행(row)을 딕셔너리처럼 동작하게 반환하라고 지시
+    # 기본적으로 SQLite는 결과를 튜플로 반환
+    # row_factory를 sqlite3.Row로 설정하면, row['username']처럼
+    # 컬럼명을 키로 사용해서 데이터에 접근 가능
+    try:
+        apply_pragmas(db, app.config, readonly)
+    except BaseException:
+        db.close()
+        raise
+    return db
+
+
+# PRAGMA 이름과 그 값을 담고 있는 설정 키
+# 연결을 새로 열 때마다 이 순서대로 적용
+PRAGMAS = (
+    ('busy_timeout', 'SQLITE_BUSY_TIMEOUT'),
+    # 다른 연결이 잠금을 잡고 있을 때 바로 "database is locked" 오류를 내지 않고 기다릴 시간(밀리초)
+    ('journal_mode', 'SQLITE_JOURNAL_MODE'),
+    # WAL 모드에서는 읽기 연결이 쓰기 연결을 기다리지 않음 (쓰기는 여전히 한 번에 하나)
+    ('synchronous', 'SQLITE_SYNCHRONOUS'),
+    # WAL과 함께 NORMAL을 쓰면 커밋마다 fsync 하지 않고 체크포인트 시에만 fsync
+    ('mmap_size', 'SQLITE_MMAP_SIZE'),
+    # 0보다 크면 그 크기(바이트)만큼 DB 파일을 메모리 매핑하여, 페이지를 복사하지 않고 바로 읽음
+    ('cache_size', 'SQLITE_CACHE_SIZE'),
+    # 양수는 페이지 수, 음수는 KiB 단위 크기 (예: -16000은 약 16MB)
+    ('temp_store', 'SQLITE_TEMP_STORE'),
+    # 정렬 등에 쓰이는 임시 테이블/인덱스를 MEMORY에 둘지 FILE에 둘지
+)
+
+
+def apply_pragmas(db, config, readonly=False):
+    for pragma, key in PRAGMAS:
+        value = config.get(key)
+        if value is None:
+            continue # 설정값이 None이면 SQLite 기본값을 그대로 사용
+        if readonly and pragma == 'journal_mode':
+            continue # 저널 모드는 DB 파일에 기록되므로 쓰기 연결에서 설정하고, 읽기 전용 연결은 그대로 따름
+        if not str(value).lstrip('-').isalnum():
+            raise ValueError(f'Invalid value for {key}: {value!r}')
+            # PRAGMA 값은 ? 플레이스홀더로 전달할 수 없으므로, 문자열에 직접 넣기 전에 검사
+        db.execute(f'PRAGMA {pragma} = {value}')
+    if readonly:
+        db.execute('PRAGMA query_only = 1')
+        # query_only: 이 연결에서 INSERT/UPDATE/DELETE/CREATE 등을 실행하면 오류
+
+
+# 앱마다, 그리고 프로세스마다 쓰기용 풀과 읽기 전용 풀을 하나씩 app.extensions에 보관
+# 워커 프로세스가 fork되면 pid가 달라지므로 자식 프로세스에서는 새 풀을 만듦
+def get_pool(app=None, readonly=False):
+    if app is None:
+        app = current_app._get_current_object()
+
+    key = 'flaskr.db.read_pool' if readonly else 'flaskr.db.pool'
+    pool = app.extensions.get(key)
+    if pool is None or pool.pid != os.getpid():
+        pool = ConnectionPool(
+            lambda: connect(app, readonly=readonly, check_same_thread=False),
+            size=app.config['DATABASE_READ_POOL_SIZE' if readonly else 'DATABASE_POOL_SIZE'],
+            timeout=app.config['DATABASE_POOL_TIMEOUT'],
+            recycle=app.config['DATABASE_POOL_RECYCLE'],
         )
-        g.db.row_factory = sqlite3.Row
-        # sqlite3.Row는 연결에게 행(row)을 딕셔너리처럼 동작하게 반환하라고 지시
-        # 기본적으로 SQLite는 결과를 튜플로 반환
-        # row_factory를 sqlite3.Row로 설정하면, row['username']처럼
-        # 컬럼명을 키로 사용해서 데이터에 접근 가능
+        app.extensions[key] = pool
+    return pool
+
+
+# GET/HEAD 요청은 데이터를 바꾸지 않으므로 읽기 전용 연결을, 그 외(POST 등)와 CLI 명령은 쓰기 연결을 사용
+# WAL 모드에서는 읽기 연결이 쓰기 잠금을 기다리지 않으므로, 많은 읽기 요청이 동시에 진행될 수 있음
+# readonly를 직접 지정하면 요청 방식과 관계없이 그 종류의 연결을 반환
+def get_db(readonly=None):
+    config = current_app.config
+    if readonly is None:
+        readonly = has_request_context() and request.method in ('GET', 'HEAD')
+    if not config['DATABASE_READ_POOL_SIZE']:
+        readonly = False # 읽기 전용 풀을 끄면 모든 요청이 쓰기 연결을 사용
 
-    return g.db
+    key = 'read_db' if readonly else 'db'
+    if key not in g:
+        # config['DATABASE']에 지정된 경로의 연결을 풀에서 빌려옴
+        # 파일이 없으면, init-db 명령 등을 통해 나중에 데이터베이스를 초기화하면 파일이 생성됨
+        if readonly:
+            db = get_pool(readonly=True).acquire()
+        elif config['DATABASE_POOL_SIZE']:
+            db = get_pool().acquire()
+        else:
+            db = connect(current_app)
+            # DATABASE_POOL_SIZE가 0이면 풀을 사용하지 않고 요청마다 새 연결을 엶
+        if config['INSTRUMENT_QUERIES'] and has_request_context():
+            if 'query_stats' not in g:
+                g.query_stats = QueryStats()
+            db.query_stats = g.query_stats
+            # 이 요청 동안 실행되는 쿼리를 기록하여 Server-Timing 헤더와 느린 쿼리 로그에 사용
+            # CLI 명령(대량 가져오기 등)처럼 요청 밖에서 사용할 때는 기록하지 않음
+        setattr(g, key, db)
+
+    return g.get(key)
 
-# close_db는 g.db가 설정되었는지를 확인함으로써 연결이 생성되었는지를 검사
+# close_db는 g.db(와 g.read_db)가 설정되었는지를 확인함으로써 연결이 생성되었는지를 검사
 def close_db(e=None):
-    db = g.pop('db', None)
+    for key in ('db', 'read_db'):
+        db = g.pop(key, None)
 
-    # 연결이 존재하면, 그것을 닫음
-    # 이후에는 애플리케이션 팩토리에서 애플리케이션에게 close_db 함수에 대해 알려주어, 
-    # 각 요청 후 이 함수가 호출되도록 할 것
-    if db is not None:
-        db.close()
+        # 연결이 존재하면, 풀에 반납하거나 (풀을 사용하지 않는 경우) 닫음
+        # 이후에는 애플리케이션 팩토리에서 애플리케이션에게 close_db 함수에 대해 알려주어, 
+        # 각 요청 후 이 함수가 호출되도록 할 것
+        if db is not None:
+            db.query_stats = None # 다음 요청의 기록과 섞이지 않도록 분리
+            if db.pool is not None:
+                db.pool.release(db)
+            else:
+                db.close()
 
 # init_db() 함수는 get_db()를 사용하여 DB 연결을 가져옴
 def init_db():
@@ -71,6 +297,34 @@ def init_db():
     # executescript()는 여러 개의 SQL 문장이 포함된 하나의 문자열을 받아, 이를 순차적으로 실행
     # 만약 executescript() 대신 execute()를 썼다면, SQL 한 문장만 실행 가능
 
+    # schema.sql이 만든 테이블 위에 부가 기능(전문 검색 등)의 테이블과 트리거를 추가
+    for name in FEATURE_SCRIPTS:
+        run_script(db, name)
+    run_script(db, search_script(current_app.config['POST_COMPRESS_MIN_SIZE'] is not None))
+
+
+# 부가 기능의 스키마 파일 목록
+# 이 파일들은 모두 CREATE ... IF NOT EXISTS 로 작성되어 있어서,
+# init-db 뿐 아니라 이미 데이터가 있는 DB에 대해 다시 실행해도 안전함
+# 검색 인덱스의 스크립트는 본문 압축 여부에 따라 다르므로 search_script()로 고름
+FEATURE_SCRIPTS = ['post_version.sql', 'user_stats.sql', 'jobs.sql', 'limits.sql', 'post_changes.sql']
+
+
+def search_script(compressed):
+    # 압축된 본문이 있을 수 있으면 body_text()로 압축을 푸는 트리거(search_compressed.sql),
+    # 없으면 앱의 SQL 함수를 쓰지 않는 트리거(search.sql)
+    # POST_COMPRESS_MIN_SIZE를 None과 숫자 사이에서 바꾼 뒤에는 flask migrate-post-storage로 본문과 트리거를 함께 바꿈
+    return 'search_compressed.sql' if compressed else 'search.sql'
+
+
+def has_compressed_bodies(db):
+    return db.execute("SELECT 1 FROM post WHERE typeof(body) = 'blob' LIMIT 1").fetchone() is not None
+
+
+def run_script(db, name):
+    with current_app.open_resource(name) as f:
+        db.executescript(f.read().decode('utf8'))
+
 # Flask는 내부적으로 Click이라는 Python 라이브러리를 사용해 커맨드라인 명령어(CLI)를 정의
 # 개발자가 명령어를 통해 데이터베이스 초기화, 샘플 데이터 삽입, 관리자 계정 생성 등의 작업을 터미널에서 자동으로 실행할 수 있도록 함
 # @click.command('init-db'): Flask CLI에서 사용할 수 있는 init-db라는 커맨드라인 명령어를 정의
@@ -83,6 +337,514 @@ def init_db_command():
     # 완료 후 'Initialized the database.'라는 메시지를 출력
 # 사용 예: $ flask init-db
 
+# 기존 DB에 전문 검색 인덱스를 만들거나, 현재 post 테이블 내용으로 인덱스를 다시 만드는 명령어
+# 트리거는 이후의 변경만 반영하므로, 트리거가 생기기 전에 작성된 글은 이 명령으로 한 번에 색인
+@click.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Create the post search index if needed and rebuild it from all posts."""
+    db = get_db()
+    compressed = current_app.config['POST_COMPRESS_MIN_SIZE'] is not None or has_compressed_bodies(db)
+    run_script(db, search_script(compressed))
+    # 설정과 관계없이 이미 압축되어 저장된 본문이 있으면 압축을 푸는 트리거를 사용
+    db.execute("INSERT INTO post_fts (post_fts) VALUES ('rebuild')")
+    # 'rebuild'는 외부 콘텐츠 테이블(post) 전체를 읽어 인덱스를 처음부터 다시 만드는 FTS5 특수 명령
+    db.execute("INSERT INTO post_fts (post_fts) VALUES ('optimize')")
+    # 'optimize'는 인덱스 세그먼트를 하나로 병합하여 검색 속도를 높임
+    db.commit()
+    count = db.execute('SELECT COUNT(*) FROM post').fetchone()[0]
+    click.echo(f'Rebuilt the search index for {count} posts.')
+# 사용 예: $ flask rebuild-search-index
+
+# 기존 DB에 사용자별 통계 테이블(user_stats)을 만들거나, post 테이블 전체로 다시 계산하는 명령어
+# 트리거가 생기기 전에 작성된 글이나, 트리거를 끄고 넣은 글(import-posts 등)의 수를 한 번에 반영
+@click.command('rebuild-user-stats')
+def rebuild_user_stats_command():
+    """Create the per-user post counters if needed and recompute them from all posts."""
+    db = get_db()
+    run_script(db, 'user_stats.sql')
+    rebuild_user_stats(db)
+    db.commit()
+    count = db.execute('SELECT COUNT(*) FROM user_stats').fetchone()[0]
+    click.echo(f'Rebuilt post counters for {count} users.')
+# 사용 예: $ flask rebuild-user-stats
+
+
+def rebuild_user_stats(db):
+    # 행마다 트리거로 더하는 대신, GROUP BY 한 번으로 모든 사용자의 값을 계산
+    # post_author_created 인덱스 순서대로 읽으므로 정렬이 필요 없음
+    db.execute('DELETE FROM user_stats')
+    db.execute(
+        'INSERT INTO user_stats (user_id, post_count, last_post)'
+        ' SELECT author_id, COUNT(*), max(created) FROM post GROUP BY author_id'
+    )
+
+
+# post.version 열과 post_version 트리거가 생기기 전에 만든 DB에 둘을 추가 (이미 있으면 아무것도 하지 않음)
+# 기존 글의 version은 0에서 시작. ADD COLUMN은 기본값이 있는 열을 테이블을 다시 쓰지 않고 추가하므로 바로 끝남
+def migrate_post_version(db):
+    columns = {row['name'] for row in db.execute('PRAGMA table_info(post)')}
+    added = 'version' not in columns
+    if added:
+        db.execute('ALTER TABLE post ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+    run_script_statements(db, 'post_version.sql')
+    return added
+
+
+@click.command('migrate-post-version')
+def migrate_post_version_command():
+    """Add the post version column and trigger to a database created before they existed."""
+    db = get_db()
+    added = migrate_post_version(db)
+    db.commit()
+    click.echo('Added the post version column.' if added else 'The post version column already exists.')
+# 사용 예: $ flask migrate-post-version (여러 번 실행해도 안전함)
+
+
+# 게시글 본문을 저장할 때 사용하는 (본문, 요약) 값
+# POST_COMPRESS_MIN_SIZE 바이트 이상인 본문은 CompressedText로 감싸서, INSERT/UPDATE할 때 압축되어 저장됨
+# 요약(excerpt)은 목록 페이지(LIST_EXCERPTS)가 본문 전체 대신 읽는 앞부분
+# 예: execute_write('INSERT INTO post (title, body, excerpt, author_id) VALUES (?, ?, ?, ?)',
+#                   (title, *store_body(body), author_id))
+def store_body(body):
+    config = current_app.config
+    excerpt = make_excerpt(body, config['POST_EXCERPT_LENGTH'])
+    threshold = config['POST_COMPRESS_MIN_SIZE']
+    if threshold is not None and len(body.encode()) >= threshold:
+        body = CompressedText(body)
+    return body, excerpt
+
+
+def make_excerpt(text, length):
+    if len(text) <= length:
+        return text
+    cut = text[:length]
+    if ' ' in cut:
+        cut = cut[:cut.rindex(' ')] # 단어 중간에서 자르지 않음
+    return cut.rstrip() + '…'
+
+
+# 기존 DB의 post 테이블을 압축 저장 형식(body COMPRESSED_TEXT, excerpt 열)으로 바꾸고,
+# 모든 본문을 현재 설정(min_size)에 맞게 다시 저장 (큰 본문은 압축, 작은 본문은 압축을 풂)
+# 압축된 본문은 검색 인덱스가 post 테이블을 바로 읽을 수 없으므로 검색 인덱스도 search_script()의 스크립트로 다시 만듦
+# 전체가 하나의 트랜잭션이므로 중간에 실패하면 원래 상태로 돌아감
+def migrate_post_storage(db, min_size, chunk_size=1000, progress=None):
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        db.execute('DROP TABLE IF EXISTS post_fts')
+        db.execute('DROP VIEW IF EXISTS post_fts_content')
+        deferred = [
+            sql for sql in defer_indexes(db, 'post', commit=False)
+            if 'post_fts' not in sql # 검색 인덱스 트리거는 min_size에 맞는 새 정의로 다시 만듦
+        ]
+
+        columns = {row['name']: row['type'] for row in db.execute('PRAGMA table_info(post)')}
+        if columns['body'] != BODY_TYPE or 'excerpt' not in columns:
+            # SQLite는 열의 타입을 바꿀 수 없으므로 schema.sql의 정의로 새 테이블을 만들어 옮김
+            db.execute('ALTER TABLE post RENAME TO post_old')
+            db.execute(schema_statement('CREATE TABLE post '))
+            names = ', '.join(
+                row['name'] for row in db.execute('PRAGMA table_info(post)') if row['name'] in columns
+            )
+            # 두 테이블에 모두 있는 열만 옮김 (오래된 DB에는 excerpt, version 등이 없으므로 새 테이블의 기본값을 사용)
+            db.execute(f'INSERT INTO post ({names}) SELECT {names} FROM post_old')
+            db.execute('DROP TABLE post_old')
+
+        compressed = 0
+        ids = [row[0] for row in db.execute('SELECT id FROM post')]
+        for chunk in chunks(ids, chunk_size):
+            rows = db.execute(
+                f'SELECT id, body FROM post WHERE id IN ({",".join("?" * len(chunk))})', chunk
+            ).fetchall()
+            values = []
+            for row in rows:
+                body = row['body'] # 변환기가 압축 여부와 관계없이 str로 돌려줌
+                excerpt = make_excerpt(body, current_app.config['POST_EXCERPT_LENGTH'])
+                if min_size is not None and len(body.encode()) >= min_size:
+                    body = CompressedText(body)
+                    compressed += 1
+                values.append((body, excerpt, row['id']))
+            db.executemany('UPDATE post SET body = ?, excerpt = ? WHERE id = ?', values)
+            # post_version 트리거는 지금 삭제된 상태이므로 version은 바뀌지 않음 (본문의 내용은 같음)
+            if progress is not None:
+                progress.step(len(rows))
+
+        for sql in deferred:
+            db.execute(sql)
+        run_script_statements(db, 'post_version.sql') # 새 테이블에서 처음 생긴 version 열이면 트리거도 없음
+        run_script_statements(db, search_script(min_size is not None))
+        db.execute("INSERT INTO post_fts (post_fts) VALUES ('rebuild')")
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    return len(ids), compressed
+
+
+# schema.sql에서 prefix로 시작하는 SQL 문 하나를 꺼냄 (migrate_post_storage에서 테이블 정의를 재사용)
+def schema_statement(prefix):
+    with current_app.open_resource('schema.sql') as f:
+        for statement in sql_statements(f.read().decode('utf8')):
+            if statement.startswith(prefix):
+                return statement
+    raise LookupError(prefix)
+
+
+def sql_statements(script):
+    # 주석(/* */)을 지우고 ;로 끝나는 문장 단위로 나눔 (트리거 안의 ;는 END;까지 이어 붙임)
+    statement = ''
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            statement = statement.strip()
+            while statement.startswith('/*'):
+                statement = statement[statement.index('*/') + 2:].strip()
+            yield statement
+            statement = ''
+
+
+def run_script_statements(db, name):
+    # run_script와 같지만 executescript() 대신 문장마다 execute()를 사용하여, 진행 중인 트랜잭션 안에서 실행
+    # (executescript()는 실행 전에 트랜잭션을 커밋함)
+    with current_app.open_resource(name) as f:
+        for statement in sql_statements(f.read().decode('utf8')):
+            if statement:
+                db.execute(statement)
+
+
+@click.command('migrate-post-storage')
+@click.option('--min-size', type=int, default=None,
+              help='Compress bodies of at least this many bytes'
+                   ' (default: POST_COMPRESS_MIN_SIZE; 0 disables compression).')
+@click.option('--vacuum/--no-vacuum', default=True, show_default=True,
+              help='Rewrite the database file afterwards to return freed pages to the OS.')
+def migrate_post_storage_command(min_size, vacuum):
+    """Store large post bodies compressed, fill excerpts and rebuild the search index."""
+    if min_size is None:
+        min_size = current_app.config['POST_COMPRESS_MIN_SIZE']
+    elif min_size == 0:
+        min_size = None
+    db = get_db()
+    path = current_app.config['DATABASE']
+    size_before = os.path.getsize(path)
+    count, compressed = migrate_post_storage(db, min_size, progress=Progress(100000))
+    if vacuum:
+        db.execute('VACUUM')
+        db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        # 압축으로 비워진 페이지는 VACUUM을 해야 파일 크기가 줄어듦 (DB 파일 전체를 다시 쓰므로 시간이 걸림)
+        # WAL 모드에서는 VACUUM 결과가 먼저 -wal 파일에 기록되므로, 체크포인트를 해야 DB 파일에 반영됨
+    click.echo(
+        f'Rewrote {count:,} posts, {compressed:,} compressed.'
+        f' Database file: {size_before / 2**20:,.1f} MiB -> {os.path.getsize(path) / 2**20:,.1f} MiB.'
+    )
+# 사용 예: $ flask migrate-post-storage (앱을 멈춘 상태에서 실행. 설정을 바꾼 뒤 다시 실행해도 됨)
+
+# 실제로 적용된 PRAGMA 값을 확인하는 명령어
+# 설정 파일의 값이 아니라, 새 연결에서 SQLite가 보고하는 값을 출력
+@click.command('db-settings')
+def db_settings_command():
+    """Show the SQLite settings in effect for new connections."""
+    db = connect(current_app)
+    try:
+        for pragma, key in PRAGMAS:
+            value = db.execute(f'PRAGMA {pragma}').fetchone()[0]
+            click.echo(f'{pragma} = {value}  ({key}={current_app.config.get(key)!r})')
+    finally:
+        db.close()
+# 사용 예: $ flask db-settings
+
+# 게시글/사용자를 다른 환경으로 옮기기 위한 내보내기/가져오기 명령어
+# 수천만 행을 다루므로 전체를 메모리에 올리지 않고, 한 행씩 스트리밍으로 읽고 씀
+# 형식은 JSONL(한 줄에 JSON 객체 하나)과 CSV를 지원
+#
+# 각 테이블에 대해 (내보낼 SELECT 쿼리, 필드 목록)을 정의
+# 게시글의 작성자는 id 대신 username으로 내보내고, 가져올 때 다시 id로 바꿈 (환경마다 id가 다를 수 있으므로)
+TRANSFERS = {
+    'posts': (
+        'SELECT username AS author, created, title, body'
+        ' FROM post p JOIN user u ON p.author_id = u.id ORDER BY p.id',
+        ('author', 'created', 'title', 'body'),
+    ),
+    'users': (
+        'SELECT username, password FROM user ORDER BY id',
+        ('username', 'password'),
+    ),
+}
+
+
+class Progress:
+    # 처리한 행 수와 초당 처리 행 수를 일정 간격으로 표준 에러에 출력
+    def __init__(self, every):
+        self.every = every
+        self.count = 0
+        self.start = time.monotonic()
+
+    def rate(self):
+        return self.count / max(time.monotonic() - self.start, 1e-9)
+
+    def step(self, n=1):
+        before = self.count
+        self.count += n
+        if self.every and before // self.every != self.count // self.every:
+            click.echo(f'{self.count:>12,} rows  ({self.rate():,.0f} rows/sec)', err=True)
+
+
+def write_rows(rows, fields, out, fmt, progress):
+    if fmt == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(fields)
+    for row in rows:
+        values = [
+            v.isoformat(' ') if isinstance(v, datetime) else v for v in row
+        ] # created는 timestamp 변환기에 의해 datetime이므로 DB에 저장된 문자열 형식으로 되돌림
+        if fmt == 'csv':
+            writer.writerow(values)
+        else:
+            out.write(json.dumps(dict(zip(fields, values)), ensure_ascii=False))
+            out.write('\n')
+        progress.step()
+
+
+def read_rows(f, fmt):
+    # 파일을 한 줄(한 레코드)씩 읽어서 딕셔너리로 반환하는 제너레이터
+    if fmt == 'csv':
+        csv.field_size_limit(sys.maxsize) # 본문이 큰 게시글도 읽을 수 있도록 필드 크기 제한을 해제
+        yield from csv.DictReader(f)
+    else:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def chunks(iterable, size):
+    # iterable을 size개씩 묶은 리스트로 나눔 (마지막 묶음은 size보다 작을 수 있음)
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def export_command(name):
+    query, fields = TRANSFERS[name]
+
+    @click.command(f'export-{name}')
+    @click.argument('output', type=click.File('w', encoding='utf8'), default='-')
+    @click.option('--format', 'fmt', type=click.Choice(['jsonl', 'csv']), default='jsonl')
+    @click.option('--progress', 'every', default=100000, help='Report progress every N rows.')
+    def command(output, fmt, every):
+        progress = Progress(every)
+        write_rows(get_db().execute(query), fields, output, fmt, progress)
+        # execute()가 반환한 커서를 그대로 순회하면 fetchall()과 달리 한 행씩 가져오므로 메모리 사용량이 일정
+        click.echo(f'Exported {progress.count:,} {name} ({progress.rate():,.0f} rows/sec).', err=True)
+
+    command.__doc__ = f'Stream all {name} to OUTPUT (default: stdout).'
+    return command
+
+
+# 게시글/사용자를 하나의 INSERT 문으로 넣기 위한 값 튜플로 바꾸는 함수들
+# 변환할 수 없는 레코드는 None을 반환하여 건너뜀
+def post_values(db, authors):
+    def values(record):
+        author = record['author']
+        if author not in authors:
+            row = db.execute('SELECT id FROM user WHERE username = ?', (author,)).fetchone()
+            authors[author] = row[0] if row else None
+            # 작성자 username -> id는 한 번만 조회하고 딕셔너리에 저장하여 재사용
+        if authors[author] is None:
+            return None # 존재하지 않는 작성자의 글은 건너뜀
+        return (
+            authors[author], record.get('created') or None, record['title'],
+            *store_body(record['body']),
+        )
+    return values
+
+
+def user_values(db, authors):
+    return lambda record: (record['username'], record['password'])
+
+
+IMPORTS = {
+    'posts': (
+        'INSERT INTO post (author_id, created, title, body, excerpt)'
+        ' VALUES (?, coalesce(?, CURRENT_TIMESTAMP), ?, ?, ?)',
+        post_values, 'post',
+    ),
+    'users': (
+        'INSERT OR IGNORE INTO user (username, password) VALUES (?, ?)',
+        # 이미 같은 username이 있으면 건너뜀
+        user_values, 'user',
+    ),
+}
+
+
+def defer_indexes(db, table, commit=True):
+    # 대량으로 넣는 동안 인덱스와 트리거를 잠시 삭제하고, 나중에 다시 만들 수 있도록 그 SQL을 반환
+    # 행마다 인덱스/트리거를 갱신하는 것보다, 다 넣은 뒤 한 번에 만드는 것이 훨씬 빠름
+    # sql이 NULL인 항목은 UNIQUE 제약 등으로 자동 생성된 인덱스이므로 건드리지 않음
+    objects = db.execute(
+        "SELECT type, name, sql FROM sqlite_master"
+        " WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+        (table,)
+    ).fetchall()
+    for obj in objects:
+        db.execute(f'DROP {obj["type"]} "{obj["name"]}"')
+    if commit:
+        db.commit()
+    return [obj['sql'] for obj in objects]
+
+
+def rebuild_derived(db):
+    # 트리거를 끈 상태로 넣은 행은 검색 인덱스와 사용자별 통계에 반영되지 않았으므로 한 번에 다시 만듦
+    if db.execute("SELECT 1 FROM sqlite_master WHERE name = 'post_fts'").fetchone():
+        db.execute("INSERT INTO post_fts (post_fts) VALUES ('rebuild')")
+    if db.execute("SELECT 1 FROM sqlite_master WHERE name = 'user_stats'").fetchone():
+        rebuild_user_stats(db)
+    if db.execute("SELECT 1 FROM sqlite_master WHERE name = 'change_counter'").fetchone():
+        db.execute("UPDATE change_counter SET value = value + 1 WHERE name = 'post'")
+        # 다른 프로세스가 캐시한 게시글 목록 페이지도 무효화
+
+
+def import_command(name):
+    insert, make_values, table = IMPORTS[name]
+
+    @click.command(f'import-{name}')
+    @click.argument('input', type=click.File('r', encoding='utf8'), default='-')
+    @click.option('--format', 'fmt', type=click.Choice(['jsonl', 'csv']), default='jsonl')
+    @click.option('--chunk-size', default=10000, help='Rows per executemany() call.')
+    @click.option('--commit-every', default=500000, help='Rows per transaction.')
+    @click.option('--defer-indexes/--no-defer-indexes', 'defer', default=True,
+                  help='Drop indexes and triggers during the load and rebuild them afterwards.')
+    @click.option('--progress', 'every', default=100000, help='Report progress every N rows.')
+    @click.option('--skip', default=0,
+                  help='Skip the first N input rows (resume after a failed import).')
+    def command(input, fmt, chunk_size, commit_every, defer, every, skip):
+        db = get_db()
+        values = make_values(db, {})
+        progress = Progress(every)
+        skipped = 0
+        uncommitted = 0
+        committed = skip # 커밋까지 끝난 입력 행 수 (건너뛴 행 포함). 실패하면 --skip으로 이어서 가져올 위치
+        deferred = defer_indexes(db, table) if defer else []
+
+        try:
+            for chunk in chunks(itertools.islice(read_rows(input, fmt), skip, None), chunk_size):
+                rows = [v for v in map(values, chunk) if v is not None]
+                skipped += len(chunk) - len(rows)
+                db.executemany(insert, rows)
+                # executemany()는 하나의 준비된 문장으로 여러 행을 넣으므로 execute()를 반복하는 것보다 빠름
+                uncommitted += len(chunk)
+                if uncommitted >= commit_every:
+                    db.commit() # 큰 트랜잭션 단위로 커밋하여 커밋(fsync) 횟수를 줄임
+                    committed += uncommitted
+                    uncommitted = 0
+                progress.step(len(chunk))
+            db.commit()
+            committed += uncommitted
+        except BaseException:
+            db.rollback()
+            # 마지막 커밋 이후에 넣은 행은 되돌림 (아래에서 인덱스를 다시 만든 뒤 커밋할 때 함께 커밋되지 않도록)
+            # 커밋된 행까지는 남아 있으므로, 같은 입력으로 --skip을 주면 중복 없이 이어서 가져올 수 있음
+            click.echo(
+                f'Import failed; {committed:,} input rows are committed.'
+                f' Resume with --skip {committed}.', err=True
+            )
+            raise
+        finally:
+            if deferred:
+                click.echo('Rebuilding indexes and triggers...', err=True)
+                for sql in deferred:
+                    db.execute(sql)
+                rebuild_derived(db)
+                db.commit()
+
+        click.echo(
+            f'Imported {progress.count - skipped:,} {name}, skipped {skipped:,}'
+            f' ({progress.rate():,.0f} rows/sec).', err=True
+        )
+
+    command.__doc__ = f'Load {name} from INPUT (default: stdin) in large batches.'
+    return command
+
+
+export_posts_command = export_command('posts')
+import_posts_command = import_command('posts')
+export_users_command = export_command('users')
+import_users_command = import_command('users')
+# 사용 예: $ flask export-posts posts.jsonl
+#         $ flask import-users users.jsonl && flask import-posts --format csv posts.csv
+
+# 성능 측정을 위해 그럴듯한 가짜 데이터를 빠르게 대량 생성
+# 사용자 이름은 user1, user2, ... 이고, 모든 사용자의 비밀번호는 SEED_PASSWORD
+# 비밀번호 해싱은 일부러 느리므로, 해시는 한 번만 만들어서 모든 사용자에게 같은 값을 사용
+SEED_PASSWORD = 'password'
+SEED_WORDS = (
+    'flask sqlite python request response template blueprint session cookie'
+    ' cache index query cursor thread worker process memory disk page write'
+    ' read commit transaction server client latency throughput profile view'
+    ' route static style user post title body search login register update'
+).split()
+
+
+def seed_db(users, posts, seed=None, chunk_size=10000, progress=None):
+    rng = random.Random(seed) # seed를 주면 매번 같은 데이터가 생성되어, 측정 결과를 비교하기 쉬움
+    db = get_db()
+    password = generate_password_hash(
+        SEED_PASSWORD, current_app.config['PASSWORD_HASH_METHOD']
+    )
+    start = db.execute('SELECT coalesce(max(id), 0) FROM user').fetchone()[0]
+    # 이미 있는 사용자와 이름이 겹치지 않도록 현재 가장 큰 id 다음 번호부터 생성
+    db.executemany(
+        'INSERT OR IGNORE INTO user (username, password) VALUES (?, ?)',
+        ((f'user{i}', password) for i in range(start + 1, start + users + 1))
+    )
+    author_ids = [row[0] for row in db.execute('SELECT id FROM user')]
+    if posts and not author_ids:
+        raise click.ClickException('No users to author the posts.')
+
+    # 작성 시각은 1년 전부터 지금까지 고르게, 오래된 글부터 순서대로 생성
+    now = datetime.now().replace(microsecond=0)
+    step = 365 * 24 * 3600 / max(posts, 1)
+
+    def post(i):
+        words = rng.choices(SEED_WORDS, k=rng.randint(20, 200))
+        return (
+            rng.choice(author_ids),
+            (now - timedelta(seconds=int((posts - i) * step))).isoformat(' '),
+            ' '.join(rng.choices(SEED_WORDS, k=rng.randint(2, 8))).capitalize(),
+            *store_body(' '.join(words)),
+        )
+
+    deferred = defer_indexes(db, 'post')
+    try:
+        for chunk in chunks(map(post, range(posts)), chunk_size):
+            db.executemany(
+                'INSERT INTO post (author_id, created, title, body, excerpt) VALUES (?, ?, ?, ?, ?)',
+                chunk
+            )
+            if progress is not None:
+                progress.step(len(chunk))
+    finally:
+        for sql in deferred:
+            db.execute(sql)
+        rebuild_derived(db)
+        db.commit()
+
+
+@click.command('seed-db')
+@click.option('--users', default=100, help='Number of users to create.')
+@click.option('--posts', default=10000, help='Number of posts to create.')
+@click.option('--seed', type=int, default=None, help='Random seed for repeatable data.')
+def seed_db_command(users, posts, seed):
+    """Fill the database with generated users and posts."""
+    progress = Progress(100000)
+    seed_db(users, posts, seed, progress=progress)
+    click.echo(
+        f'Seeded {users:,} users and {posts:,} posts ({progress.rate():,.0f} posts/sec).'
+        f' Every user\'s password is "{SEED_PASSWORD}".'
+    )
+# 사용 예: $ flask init-db && flask seed-db --users 1000 --posts 1000000
+
 # sqlite3.register_converter()를 호출하는 것은 데이터베이스에 있는 timestamp 값들을 어떻게 해석할지 파이썬에게 알려주는 것
 # SQLite와 Python 간의 데이터 타입 변환을 자동화
 # SQLite에서 timestamp 타입으로 저장된 값(예: '2025-07-07 10:00:00')을 
@@ -105,6 +867,39 @@ sqlite3.register_converter(
 # 설정이 작동하려면, sqlite3.connect() 호출 시
 # detect_types=sqlite3.PARSE_DECLTYPES 옵션이 있어야 함
 
+
+# 큰 게시글 본문의 압축 저장
+# post.body의 타입은 COMPRESSED_TEXT (이름에 TEXT가 있으므로 SQLite에서는 일반 TEXT 열과 같은 TEXT affinity)
+# POST_COMPRESS_MIN_SIZE 이상인 본문은 zlib으로 압축하여 앞에 표시(COMPRESSED_MARKER)를 붙인 BLOB으로 저장하고,
+# 나머지는 지금까지처럼 TEXT로 저장
+# 0xFF 바이트는 올바른 UTF-8 문자열에는 나타나지 않으므로 TEXT로 저장된 본문과 헷갈리지 않음
+#
+# 저장: store_body()가 큰 본문을 CompressedText로 감싸면, 아래 어댑터가 INSERT/UPDATE할 때 압축
+# 읽기: timestamp와 같은 방식으로 COMPRESSED_TEXT 열의 변환기를 등록하여, body를 SELECT할 때만 풂
+#       목록 쿼리는 body 대신 excerpt를 읽을 수 있으므로(LIST_EXCERPTS) 그때는 압축을 풀지 않음
+BODY_TYPE = 'COMPRESSED_TEXT'
+COMPRESSED_MARKER = b'\xffz'
+
+
+class CompressedText(str):
+    pass
+    # 압축해서 저장할 문자열 (str을 상속하므로 그 외에는 일반 문자열과 똑같이 사용)
+
+
+def body_text(value):
+    # 저장된 본문(str, 또는 bytes)을 문자열로 되돌림
+    if isinstance(value, bytes):
+        if value.startswith(COMPRESSED_MARKER):
+            value = zlib.decompress(value[len(COMPRESSED_MARKER):])
+        return value.decode()
+    return value
+
+
+sqlite3.register_adapter(
+    CompressedText, lambda v: COMPRESSED_MARKER + zlib.compress(v.encode())
+)
+sqlite3.register_converter(BODY_TYPE, body_text)
+
 # Flask에서는 close_db와 init_db_command 같은 함수들이 애플리케이션 인스턴스에 등록되어야만 제대로 동작
 # 하지만 현재 create_app()이라는 팩토리 함수를 사용 중
 # 토리 함수는 애플리케이션 인스턴스를 생성하는 함수이기 때문에, 
@@ -115,6 +910,23 @@ def init_app(app):
     # 리소스를 정리하는 시점에 Flask가 close_db 함수를 자동으로 호출하도록 등록
     app.teardown_appcontext(close_db)
     app.cli.add_command(init_db_command)
+    app.cli.add_command(db_settings_command)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(rebuild_user_stats_command)
+    app.cli.add_command(migrate_post_version_command)
+    app.cli.add_command(migrate_post_storage_command)
+    app.cli.add_command(export_posts_command)
+    app.cli.add_command(import_posts_command)
+    app.cli.add_command(export_users_command)
+    app.cli.add_command(import_users_command)
+    app.cli.add_command(seed_db_command)
+    app.register_error_handler(PoolTimeout, lambda e: ('Service Unavailable', 503))
+    # 풀의 연결을 기다리다 시간이 초과되면 요청을 500 대신 503으로 응답
+
+    from flaskr import stats
+    stats.register(app, 'db_pool', lambda: get_pool(app).stats())
+    stats.register(app, 'db_read_pool', lambda: get_pool(app, readonly=True).stats())
+    # /stats 에서 풀의 통계(hits, waits, created 등)를 확인할 수 있도록 등록
     # app.cli.add_command(init_db_command)는 Flask의 커맨드라인 명령어 (flask)에 
     # 새로운 명령어 (init-db 등)를 추가하는 역할
     # 이렇게 하면 터미널에서 직접 flask init-db 같은 명령을 실행 가능
@@ -0,0 +1,150 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from flask import current_app
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash,
+)
+
+from flaskr import stats
+
+
+# 해시 작업 대기열이 가득 찼을 때 발생
+# 요청을 오래 기다리게 하는 대신 바로 503 Service Unavailable로 응답하기 위해 사용
+class HashQueueFull(Exception):
+    pass
+
+
+# 비밀번호 해싱(scrypt, pbkdf2)은 일부러 느리게 만든 CPU 작업이므로,
+# 요청 스레드에서 실행하면 GIL을 잡고 있는 동안 같은 프로세스의 다른 요청들이 모두 느려짐
+# PasswordHasher는 해싱을 별도의 프로세스 풀에서 실행하고, 대기 중인 작업 수를 제한
+class PasswordHasher:
+    def __init__(self, method, workers, queue_size):
+        self.method = method # generate_password_hash()에 넘길 해시 방식과 비용 (예: 'scrypt:32768:8:1')
+        self.stored_method = stored_method(method) # 저장된 해시에 실제로 기록되는 방식과 비용
+        self.workers = workers # 해싱 프로세스 수 (0이면 요청 스레드에서 바로 실행)
+        self.capacity = max(workers, 1) + queue_size
+        # 동시에 받을 수 있는 작업 수 = 실행 중인 작업 + 대기열에서 기다리는 작업
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'submitted': 0, # 처리한 해시 작업 수
+            'rejected': 0, # 대기열이 가득 차서 거절한 작업 수
+            'in_flight': 0, # 현재 실행 중이거나 대기 중인 작업 수 (대기열 깊이)
+            'total_seconds': 0.0, # 대기 시간을 포함한 전체 처리 시간의 합
+        }
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._stats, capacity=self.capacity, workers=self.workers)
+        done = result['submitted'] - result['in_flight']
+        result['avg_seconds'] = result['total_seconds'] / done if done > 0 else 0.0
+        return result
+
+    def _get_executor(self):
+        # 프로세스 풀은 처음 사용할 때 만들고, fork된 워커 프로세스에서는 새로 만듦
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(self.workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    @contextmanager
+    def _slot(self):
+        if not self._slots.acquire(blocking=False):
+            # 대기열이 가득 찼으면 기다리지 않고 바로 거절
+            self._count('rejected')
+            raise HashQueueFull()
+
+        self._count('submitted')
+        self._count('in_flight')
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._count('total_seconds', time.monotonic() - start)
+            self._count('in_flight', -1)
+            self._slots.release()
+
+    def _run(self, func, *args):
+        with self._slot():
+            if not self.workers:
+                return func(*args)
+            return self._get_executor().submit(func, *args).result()
+            # result()는 다른 프로세스에서 해싱이 끝날 때까지 기다림
+            # 기다리는 동안에는 GIL을 놓기 때문에 같은 프로세스의 다른 요청은 계속 처리됨
+
+    async def _run_async(self, func, *args):
+        # async 뷰(ASYNC_VIEWS)에서 사용. 해싱이 끝날 때까지 이벤트 루프를 막지 않고 기다림
+        with self._slot():
+            if not self.workers:
+                return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+                # 프로세스 풀이 없으면 기본 스레드 풀에서 실행
+            return await asyncio.wrap_future(self._get_executor().submit(func, *args))
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def check(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    async def hash_async(self, password):
+        return await self._run_async(generate_password_hash, password, self.method)
+
+    async def check_async(self, pwhash, password):
+        return await self._run_async(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        # 저장된 해시는 '방식$salt$해시값' 형식
+        # 앞부분(방식과 비용)이 현재 설정과 다르면, 로그인에 성공했을 때 새 설정으로 다시 해싱
+        return pwhash.split('$', 1)[0] != self.stored_method
+
+
+# werkzeug는 생략된 비용을 기본값으로 채워서 저장함 (예: 'scrypt' -> 'scrypt:32768:8:1',
+# 'pbkdf2' -> 'pbkdf2:sha256:1000000'). 설정값을 그대로 비교하면 로그인할 때마다 다시 해싱하게 되므로,
+# werkzeug와 같은 규칙으로 기본값을 채워서 실제로 저장되는 형식을 만듦
+# 빈 문자열을 해싱해서 알아낼 수도 있지만, 그러면 요청 스레드에서 scrypt 한 번만큼(수십 ms) GIL을 잡게 됨
+def stored_method(method):
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        if not args:
+            args = ['32768', '8', '1']
+        elif len(args) != 3:
+            raise ValueError("'scrypt' takes 3 arguments.")
+        return ':'.join([name, *(str(int(arg)) for arg in args)])
+    if name == 'pbkdf2':
+        if len(args) > 2:
+            raise ValueError("'pbkdf2' takes 2 arguments.")
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f'{name}:{hash_name}:{iterations}'
+    raise ValueError(f'Invalid hash method {method!r}.')
+
+
+def get_hasher():
+    return current_app.extensions['flaskr.hashing']
+
+
+def init_app(app):
+    app.extensions['flaskr.hashing'] = hasher = PasswordHasher(
+        app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        queue_size=app.config['PASSWORD_HASH_QUEUE'],
+    )
+    stats.register(app, 'password_hashing', hasher.stats)
+    app.register_error_handler(HashQueueFull, queue_full)
+
+
+def queue_full(e):
+    return 'Service Unavailable', 503, {'Retry-After': '1'}
+    # Retry-After: 클라이언트에게 1초 뒤에 다시 시도하라고 알려줌
@@ -0,0 +1,214 @@
+import cProfile
+import hmac
+import os
+import pstats
+import random
+import sqlite3
+import threading
+import time
+
+import click
+from flask import current_app, g, request
+
+
+# 요청 하나 동안 실행된 SQL 문장들의 기록
+# 각 항목은 [SQL, 걸린 시간(초), 반환한 행 수]
+class QueryStats:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    @property
+    def seconds(self):
+        return sum(s[1] for s in self.statements)
+
+    @property
+    def rows(self):
+        return sum(s[2] for s in self.statements)
+
+
+# 실행 시간과 반환 행 수를 기록하는 커서
+# 시간은 execute()뿐 아니라 fetch로 행을 읽는 데 걸린 시간까지 같은 문장에 더함
+# (SQLite는 행을 fetch할 때 실제로 쿼리를 진행하기 때문)
+class InstrumentedCursor(sqlite3.Cursor):
+    _record = None
+
+    def _timed(self, func, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            if self._record is not None:
+                self._record[1] += time.perf_counter() - start
+
+    def _begin(self, sql):
+        stats = self.connection.query_stats
+        if stats is None:
+            self._record = None # 요청 밖(CLI 등)에서는 기록하지 않음
+        else:
+            self._record = [sql, 0.0, 0]
+            stats.statements.append(self._record)
+
+    def _rows(self, n):
+        if self._record is not None:
+            self._record[2] += n
+
+    def execute(self, sql, parameters=()):
+        self._begin(sql)
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._begin(sql)
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        self._rows(row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, self.arraysize if size is None else size)
+        self._rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._rows(len(rows))
+        return rows
+
+    def __next__(self):
+        row = self._timed(super().__next__)
+        self._rows(1)
+        return row
+
+
+# get_db()가 반환하는 연결
+# Connection.execute()/executemany()는 기본 커서를 직접 만들기 때문에,
+# 기록하는 커서(InstrumentedCursor)를 사용하도록 다시 정의
+# query_stats가 None이면 기록하지 않음
+class InstrumentedConnection(sqlite3.Connection):
+    query_stats = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# 응답에 Server-Timing 헤더를 붙이고, 느린 쿼리를 로그에 남김
+# Server-Timing 헤더는 브라우저 개발자 도구의 Network > Timing 탭에 그대로 표시됨
+def record_timing(response):
+    stats = g.get('query_stats')
+    if stats is None:
+        return response
+
+    if current_app.config['SERVER_TIMING'] or current_app.debug:
+        # 쿼리 수와 처리 시간은 모든 클라이언트에게 보이므로, 설정했거나 디버그 모드일 때만 헤더로 보냄
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={stats.seconds * 1000:.2f};desc="{stats.count} queries, {stats.rows} rows"'
+        )
+        started = g.get('request_started')
+        if started is not None:
+            response.headers.add(
+                'Server-Timing', f'app;dur={(time.perf_counter() - started) * 1000:.2f}'
+            )
+
+    threshold = current_app.config['SLOW_QUERY_MS']
+    if threshold is not None:
+        for sql, seconds, rows in stats.statements:
+            if seconds * 1000 >= threshold:
+                current_app.logger.warning(
+                    'Slow query (%.1f ms, %d rows) in %s: %s',
+                    seconds * 1000, rows, request.endpoint, ' '.join(sql.split())
+                )
+    return response
+
+
+def start_timing():
+    g.request_started = time.perf_counter()
+
+
+# cProfile을 이용한 엔드포인트별 프로파일링
+# PROFILE_DIR이 설정된 경우에만 동작하며, ?_profile=<PROFILE_TOKEN> 으로 요청하거나
+# PROFILE_SAMPLE_RATE 비율만큼 무작위로 고른 요청을 프로파일링
+# 결과는 PROFILE_DIR/<엔드포인트>.prof 파일에 누적되고, flask profile-report 명령으로 확인
+_profile_lock = threading.Lock()
+
+
+def profile_requested():
+    # 아무나 ?_profile=1 로 프로파일링을 켜면 서버에 부하를 주고 .prof 파일을 키울 수 있으므로
+    # PROFILE_TOKEN과 같은 값을 보낸 요청만 허용 (토큰이 없으면 디버그 모드에서만 ?_profile=1 허용)
+    value = request.args.get('_profile')
+    if value is None:
+        return False
+    token = current_app.config['PROFILE_TOKEN']
+    if token:
+        return hmac.compare_digest(value.encode(), token.encode())
+    return current_app.debug and value == '1'
+
+
+def start_profile():
+    config = current_app.config
+    if not config['PROFILE_DIR'] or request.endpoint is None:
+        return
+    if not profile_requested() and random.random() >= config['PROFILE_SAMPLE_RATE']:
+        return
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        return # 다른 스레드에서 이미 프로파일러가 실행 중이면 건너뜀
+    g.profile = profile
+
+
+def stop_profile(e=None):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return
+    profile.disable()
+
+    directory = current_app.config['PROFILE_DIR']
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{request.endpoint}.prof')
+    with _profile_lock:
+        stats = pstats.Stats(profile)
+        if os.path.exists(path):
+            stats.add(path) # 이전 요청들의 결과에 더함
+        stats.dump_stats(path)
+
+
+@click.command('profile-report')
+@click.argument('endpoint', required=False)
+@click.option('--limit', default=25, help='Number of functions to show.')
+@click.option('--sort', default='cumulative', help='pstats sort key.')
+def profile_report_command(endpoint, limit, sort):
+    """Print collected cProfile stats for ENDPOINT (or list endpoints)."""
+    directory = current_app.config['PROFILE_DIR']
+    if not directory or not os.path.isdir(directory):
+        raise click.ClickException('No profiles collected; set PROFILE_DIR.')
+    if endpoint is None:
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.prof'):
+                click.echo(name[:-len('.prof')])
+        return
+    path = os.path.join(directory, f'{endpoint}.prof')
+    if not os.path.exists(path):
+        raise click.ClickException(f'No profile for {endpoint}.')
+    pstats.Stats(path).sort_stats(sort).print_stats(limit)
+# 사용 예: $ flask profile-report blog.index
+
+
+def init_app(app):
+    app.before_request(start_timing)
+    app.before_request(start_profile)
+    app.after_request(record_timing)
+    app.teardown_request(stop_profile)
+    app.cli.add_command(profile_report_command)
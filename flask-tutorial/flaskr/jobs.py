@@ -0,0 +1,351 @@
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import click
+from flask import current_app, g
+
+from flaskr import stats
+from flaskr.db import get_db, run_script
+
+logger = logging.getLogger(__name__)
+
+# 글쓰기 요청이 끝난 뒤에 해도 되는 일(캐시 채우기, 검색 인덱스 정리 등)을 백그라운드에서 실행하는 작업 대기열
+#
+#   @task('blog.warm_post', durable=False) # 작업 함수 등록 (인자는 JSON으로 저장할 수 있는 값이어야 함)
+#   def warm_post(id): ...
+#
+#   defer('blog.warm_post', post_id) # 뷰에서 호출: 응답을 다 보낸 뒤에 대기열에 넣음 (durable이면 응답 전에 기록)
+#
+# 프로세스마다 JOBS_THREADS개의 스레드가 크기가 정해진 대기열(JOBS_QUEUE_SIZE)에서 작업을 꺼내 실행
+# 작업 함수는 앱 컨텍스트 안에서 실행되므로 get_db(), current_app 등을 그대로 사용 가능
+# 실패하면 JOBS_RETRY_BACKOFF * 2^(시도 횟수 - 1)초 뒤에 다시 실행하고, JOBS_MAX_ATTEMPTS번 실패하면 포기
+#
+# JOBS_DURABLE=True이면 작업을 먼저 job 테이블(jobs.sql)에 기록한 뒤 실행하고, 성공하면 행을 지움
+# 프로세스가 죽거나 대기열이 가득 차서 실행하지 못한 작업은 테이블에 남아 있다가 flask worker가 실행
+# JOBS_DURABLE=False이면 메모리에만 있으므로, 대기열이 가득 차면 버리고 프로세스가 종료되면 사라짐
+# durable=False로 등록한 작업(이 프로세스의 캐시를 채우는 작업 등)은 JOBS_DURABLE과 관계없이 항상 메모리에서 실행
+
+TASKS = {}
+IN_PROCESS_TASKS = set() # durable=False로 등록한 작업 이름
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def task(name, durable=True):
+    # 작업 함수를 이름으로 등록하는 데코레이터
+    # durable 작업은 함수가 아니라 이름을 테이블에 저장하므로, flask worker도 같은 이름으로 함수를 찾음
+    # durable=False: 요청을 받은 프로세스 안에서만 의미가 있는 작업. 테이블에 기록하지 않으므로 다른 프로세스가 실행하지 않음
+    def register(func):
+        TASKS[name] = func
+        if durable:
+            IN_PROCESS_TASKS.discard(name)
+        else:
+            IN_PROCESS_TASKS.add(name)
+        return func
+    return register
+
+
+class JobQueue:
+    def __init__(self, app, threads, maxsize, durable=False,
+                 max_attempts=3, backoff=1.0, lease=300.0):
+        self.app = app
+        self.threads = threads
+        self.maxsize = maxsize
+        self.durable = durable
+        self.max_attempts = max_attempts
+        self.backoff = backoff # 첫 재시도까지의 시간(초), 이후 두 배씩 늘어남
+        self.lease = lease # durable 작업을 실행하는 동안 다른 워커가 가져가지 못하게 하는 시간(초)
+        self._queue = queue.Queue(maxsize)
+        self._workers = []
+        self._pid = None
+        self._ready = False # job 테이블을 만들었는지 (init-db 이전에 만든 DB에도 처음 사용할 때 추가)
+        self._lock = threading.Lock()
+        self._stats = {
+            'submitted': 0, 'completed': 0, 'retried': 0, 'failed': 0, 'dropped': 0,
+            'in_flight': 0, 'wait_seconds': 0.0, 'run_seconds': 0.0,
+        }
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._stats, queued=self._queue.qsize(), queue_size=self.maxsize)
+        done = result['completed'] + result['failed']
+        if done:
+            # wait: 대기열에 넣은 뒤 실행을 시작하기까지, run: 실행에 걸린 시간의 평균(밀리초)
+            result['avg_wait_ms'] = result['wait_seconds'] / done * 1000
+            result['avg_run_ms'] = result['run_seconds'] / done * 1000
+        if self.durable:
+            # job 테이블에 남아 있는 작업 수 (flask worker가 처리할 작업 포함)
+            try:
+                with self.app.app_context():
+                    result['table'] = dict(get_db().execute(
+                        'SELECT state, COUNT(*) FROM job GROUP BY state'
+                    ).fetchall())
+            except sqlite3.OperationalError:
+                result['table'] = None # 아직 job 테이블이 없는 DB
+        return result
+
+    def _ensure_started(self):
+        # 작업 스레드는 처음 사용할 때 시작하고, fork된 워커 프로세스에서는 새로 시작
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(self.maxsize)
+                self._pid = os.getpid()
+                self._workers = [
+                    threading.Thread(target=self._run, name=f'flaskr-job-{i}', daemon=True)
+                    for i in range(self.threads)
+                ]
+                for worker in self._workers:
+                    worker.start()
+
+    def submit(self, name, *args):
+        # 작업을 기록하고(record) 바로 대기열에 넣음(enqueue)
+        self.enqueue(name, args, self.record(name, args))
+
+    def record(self, name, args):
+        # JOBS_DURABLE이면 작업을 job 테이블에 기록하고 id를 반환 (아니면 None)
+        if name not in TASKS:
+            raise KeyError(f'Unknown job {name!r}.')
+        if not self.durable or name in IN_PROCESS_TASKS:
+            return None
+        with self.app.app_context():
+            db = get_db(readonly=False)
+            if not self._ready:
+                run_script(db, 'jobs.sql') # init-db 이전에 만든 DB에도 테이블을 추가
+                self._ready = True
+            return insert_job(db, name, args)
+
+    def enqueue(self, name, args, job_id=None):
+        # 작업을 대기열에 넣음
+        # 대기열이 가득 차면 기록된 작업은 테이블에 남겨두고(flask worker가 실행), 아니면 JobQueueFull
+        self._count('submitted')
+        if not self.threads:
+            if job_id is None:
+                self._execute(name, args, time.monotonic(), 1)
+            return # 스레드가 없으면 durable 작업은 flask worker가 실행
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((name, args, job_id, time.monotonic(), 1))
+        except queue.Full:
+            if job_id is None:
+                self._count('dropped')
+                raise JobQueueFull(name) from None
+
+    def _run(self):
+        while True:
+            name, args, job_id, queued_at, attempt = self._queue.get()
+            if job_id is None:
+                self._execute(name, args, queued_at, attempt)
+            else:
+                with self.app.app_context():
+                    job = claim_job(get_db(readonly=False), self.lease, job_id)
+                if job is not None: # 그 사이 flask worker가 가져갔으면 실행하지 않음
+                    self._execute_durable(job, queued_at)
+
+    def _execute(self, name, args, queued_at, attempt):
+        error = self._call(name, args, queued_at)
+        if error is None:
+            return
+        if attempt < self.max_attempts:
+            self._count('retried')
+            self._later(self.retry_delay(attempt), (name, args, None, time.monotonic(), attempt + 1))
+        else:
+            self._count('failed')
+            logger.error('Job %s%r failed after %d attempts: %s', name, args, attempt, error)
+
+    def _execute_durable(self, job, queued_at):
+        error = self._call(job['name'], json.loads(job['args']), queued_at)
+        with self.app.app_context():
+            state = finish_job(get_db(readonly=False), job, error, self.max_attempts,
+                               self.retry_delay(job['attempts']))
+        if state == 'queued':
+            self._count('retried')
+            self._later(self.retry_delay(job['attempts']),
+                        (job['name'], (), job['id'], time.monotonic(), 0))
+        elif state == 'failed':
+            self._count('failed')
+
+    def _call(self, name, args, queued_at):
+        # 작업 함수를 앱 컨텍스트 안에서 실행하고, 실패하면 예외를 반환
+        start = time.monotonic()
+        self._count('in_flight')
+        try:
+            with self.app.app_context():
+                TASKS[name](*args)
+                # 앱 컨텍스트가 끝나면 teardown(close_db)이 실행되어 DB 연결을 풀에 반납
+        except Exception as e:
+            logger.warning('Job %s%r failed: %s', name, args, e)
+            return e
+        else:
+            self._count('completed')
+        finally:
+            self._count('in_flight', -1)
+            self._count('wait_seconds', start - queued_at)
+            self._count('run_seconds', time.monotonic() - start)
+        return None
+
+    def _later(self, delay, item):
+        # 재시도는 작업 스레드가 기다리지 않도록 타이머로 delay초 뒤에 대기열에 다시 넣음
+        def put():
+            if not self.threads:
+                name, args, _, queued_at, attempt = item
+                return self._execute(name, args, queued_at, attempt) # 작업 스레드가 없으면 타이머 스레드에서 실행
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                if item[2] is None:
+                    self._count('dropped')
+        timer = threading.Timer(delay, put)
+        timer.daemon = True
+        timer.start()
+
+    def retry_delay(self, attempt):
+        return self.backoff * 2 ** (attempt - 1)
+
+
+# job 테이블을 다루는 함수들 (JobQueue와 flask worker가 함께 사용)
+def insert_job(db, name, args):
+    now = time.time()
+    cur = db.execute(
+        'INSERT INTO job (name, args, run_at, created) VALUES (?, ?, ?, ?)',
+        (name, json.dumps(args), now, now)
+    )
+    db.commit()
+    return cur.lastrowid
+
+
+def claim_job(db, lease, job_id=None):
+    # 실행할 작업 하나를 'running'으로 바꾸고 가져옴 (없으면 None)
+    # job_id가 없으면 실행 시각이 된 작업과, 임대 시간이 지난 'running' 작업(죽은 워커의 작업) 중 가장 오래된 것
+    # UPDATE ... RETURNING 한 문장으로 처리하므로, 여러 프로세스가 동시에 같은 작업을 가져가지 않음
+    now = time.time()
+    if job_id is not None:
+        where, params = "id = ? AND state = 'queued'", (job_id,)
+    else:
+        where = (
+            "id = (SELECT id FROM job"
+            " WHERE (state = 'queued' AND run_at <= ?) OR (state = 'running' AND locked_until < ?)"
+            " ORDER BY run_at LIMIT 1)"
+        )
+        params = (now, now)
+    job = db.execute(
+        "UPDATE job SET state = 'running', attempts = attempts + 1, locked_until = ?"
+        f' WHERE {where} RETURNING id, name, args, attempts',
+        (now + lease, *params)
+    ).fetchone()
+    db.commit()
+    return job
+
+
+def finish_job(db, job, error, max_attempts, delay):
+    # 성공하면 행을 지우고, 실패하면 재시도할 시각을 기록하거나 'failed'로 남김. 바뀐 상태를 반환
+    if error is None:
+        db.execute('DELETE FROM job WHERE id = ?', (job['id'],))
+        state = None
+    else:
+        state = 'queued' if job['attempts'] < max_attempts else 'failed'
+        db.execute(
+            'UPDATE job SET state = ?, run_at = ?, locked_until = NULL, last_error = ? WHERE id = ?',
+            (state, time.time() + delay, f'{type(error).__name__}: {error}', job['id'])
+        )
+    db.commit()
+    return state
+
+
+def get_jobs():
+    return current_app.extensions['flaskr.jobs']
+
+
+# 응답을 모두 보낸 뒤에 작업을 대기열에 넣음
+# 요청 중에는 g에 모아두기만 하고, after_request에서 response.call_on_close()로 등록하므로
+# 대기열에 넣는 비용은 응답 시간에 더해지지 않음
+# durable 작업은 after_request에서(응답을 보내기 전에) job 테이블에 기록하므로,
+# 응답을 받은 클라이언트의 작업은 그 뒤에 프로세스가 죽어도 테이블에 남아 있음
+def defer(name, *args):
+    if 'deferred_jobs' not in g:
+        g.deferred_jobs = []
+    g.deferred_jobs.append((name, args))
+
+
+def submit_deferred(response):
+    deferred = g.pop('deferred_jobs', None)
+    if deferred:
+        jobs = get_jobs()
+        recorded = []
+        for name, args in deferred:
+            try:
+                recorded.append((name, args, jobs.record(name, args)))
+            except Exception:
+                # 기록하지 못한 작업 때문에 응답이 실패하지 않도록 하고, 이 프로세스의 메모리에서만 실행
+                logger.exception('Could not record job %s%r; running it without a job row.', name, args)
+                recorded.append((name, args, None))
+
+        def submit():
+            # 응답을 닫을 때(본문을 모두 보낸 뒤) WSGI 서버가 호출하며, 이때는 요청 컨텍스트가 없음
+            # 여기서 난 예외는 WSGI 서버의 response.close()로 전달되므로 작업마다 잡아서 로그만 남김
+            for name, args, job_id in recorded:
+                try:
+                    jobs.enqueue(name, args, job_id)
+                except JobQueueFull:
+                    logger.warning('Job queue is full; dropped %s%r.', name, args)
+                except Exception:
+                    logger.exception('Could not submit job %s%r.', name, args)
+
+        response.call_on_close(submit)
+    return response
+
+
+@click.command('worker')
+@click.option('--poll', default=1.0, show_default=True,
+              help='Seconds to wait when no job is due.')
+@click.option('--once', is_flag=True, help='Exit when no job is due instead of waiting.')
+def worker_command(poll, once):
+    """Run durable jobs from the job table until interrupted."""
+    app = current_app._get_current_object()
+    config = app.config
+    db = get_db()
+    run_script(db, 'jobs.sql')
+    jobs = get_jobs()
+    done = 0
+    try:
+        while True:
+            job = claim_job(db, config['JOBS_LEASE'])
+            if job is None:
+                if once:
+                    break
+                time.sleep(poll)
+                continue
+            error = jobs._call(job['name'], json.loads(job['args']), time.monotonic())
+            finish_job(db, job, error, config['JOBS_MAX_ATTEMPTS'],
+                       jobs.retry_delay(job['attempts']))
+            done += 1
+    except KeyboardInterrupt:
+        pass
+    click.echo(f'Ran {done} jobs.')
+# 사용 예: $ flask worker (JOBS_DURABLE=True일 때, 웹 워커와 별도의 프로세스로 실행)
+#         $ flask worker --once (cron 등에서 쌓인 작업만 실행하고 종료)
+
+
+def init_app(app):
+    app.extensions['flaskr.jobs'] = jobs = JobQueue(
+        app,
+        threads=app.config['JOBS_THREADS'],
+        maxsize=app.config['JOBS_QUEUE_SIZE'],
+        durable=app.config['JOBS_DURABLE'],
+        max_attempts=app.config['JOBS_MAX_ATTEMPTS'],
+        backoff=app.config['JOBS_RETRY_BACKOFF'],
+        lease=app.config['JOBS_LEASE'],
+    )
+    app.after_request(submit_deferred)
+    app.cli.add_command(worker_command)
+    stats.register(app, 'jobs', jobs.stats)
@@ -0,0 +1,26 @@
+CREATE TABLE IF NOT EXISTS job (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name TEXT NOT NULL,
+  args TEXT NOT NULL,
+  state TEXT NOT NULL DEFAULT 'queued',
+  attempts INTEGER NOT NULL DEFAULT 0,
+  run_at REAL NOT NULL,
+  locked_until REAL,
+  last_error TEXT,
+  created REAL NOT NULL
+);
+/*
+백그라운드 작업 대기열 (JOBS_DURABLE=True일 때 jobs.py가 사용)
+name: 작업 이름 (jobs.task로 등록한 함수), args: JSON으로 저장한 인자 목록
+state: 'queued'(실행 대기), 'running'(실행 중), 'failed'(재시도 횟수를 모두 써서 포기)
+attempts: 지금까지 실행한 횟수
+run_at: 이 시각(유닉스 시간) 이후에 실행. 실패하면 재시도 간격만큼 뒤로 미룸
+locked_until: 실행 중인 작업의 임대 만료 시각. 워커가 죽어서 이 시각이 지나면 다른 워커가 다시 가져감
+성공한 작업은 행을 지우므로 테이블에는 아직 끝나지 않았거나 실패한 작업만 남음
+init-db 시 실행되며, flask worker가 시작할 때도 실행하므로 기존 DB에도 만들어짐
+*/
+
+CREATE INDEX IF NOT EXISTS job_due ON job (state, run_at);
+/*
+다음에 실행할 작업(state = 'queued' AND run_at <= 현재 시각)을 run_at 순서대로 바로 찾음
+*/
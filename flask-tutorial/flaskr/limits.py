@@ -0,0 +1,310 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, request
+
+from flaskr import stats
+from flaskr.db import get_db, run_script
+
+# 비용이 큰 엔드포인트(비밀번호 해싱을 하는 auth.login, auth.register 등)를 보호하는 요청 수락(admission) 제어
+# 뷰 함수가 실행되기 전(before_request)에 두 가지를 확인하고, 넘치면 기다리게 하지 않고 바로 거절
+#
+# 1. 요청 수 제한 (RATE_LIMITS): 엔드포인트별로 클라이언트 IP, 사용자 이름마다 토큰 버킷을 둠
+#    버킷에는 최대 N개의 토큰이 있고 요청 하나에 1개씩 사용하며, 초당 N/S개씩 다시 채워짐
+#    즉 한 번에 N개까지는 바로 허용하고(burst), 그 뒤로는 평균 S초에 N개까지만 허용
+#    토큰이 없으면 429 Too Many Requests와 함께, 토큰이 하나 채워질 때까지의 시간을 Retry-After로 알려줌
+#    사용자 이름의 버킷(FAILURE_KEYS)은 요청마다가 아니라 뷰가 record_failure()를 호출할 때(로그인 실패)만 사용
+#    요청 전에는 토큰이 남아 있는지만 확인하므로, 누군가 남의 사용자 이름으로 요청을 보내기만 해서는 그 계정을 막을 수 없음
+#
+# 2. 동시 실행 제한 (CONCURRENCY_LIMITS): 엔드포인트를 부류(ROUTE_CLASSES, 예: 'password')로 묶고,
+#    부류마다 동시에 실행 중인 요청 수를 제한. 넘치면 503 Service Unavailable + Retry-After
+#    해싱 요청이 몰려도 요청 스레드를 모두 차지하지 못하므로, blog.index 같은 다른 요청은 계속 처리됨
+#
+# ADMISSION_METHODS에 있는 메서드(기본은 POST)의 요청에만 적용하므로, 로그인 폼을 보여주는 GET은 제한하지 않음
+# 버킷 상태는 기본적으로 프로세스 메모리에 있으므로 워커 프로세스마다 따로 셈
+# RATE_LIMIT_BACKEND='sqlite'이면 DB의 rate_limit 테이블(limits.sql)에 두어 모든 워커가 함께 셈
+# 동시 실행 제한은 항상 프로세스마다 적용 (요청 스레드를 보호하는 것이 목적이므로)
+
+
+class RateLimited(Exception):
+    # 토큰 버킷이 비었을 때 발생. retry_after는 토큰이 하나 채워질 때까지의 시간(초)
+    def __init__(self, retry_after):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class Overloaded(Exception):
+    # 엔드포인트 부류의 동시 실행 수가 가득 찼을 때 발생
+    pass
+
+
+# 요청에서 버킷을 나눌 값을 꺼내는 함수 (RATE_LIMITS의 키 종류)
+# 값이 없으면(None, '') 그 종류의 제한은 적용하지 않음
+# 역방향 프록시(nginx 등) 뒤에서 실행할 때는 werkzeug의 ProxyFix를 적용해야 remote_addr가 실제 클라이언트 IP가 됨
+KEY_FUNCS = {
+    'ip': lambda: request.remote_addr,
+    'username': lambda: request.form.get('username'),
+    # 로그인/가입 폼에서 보낸 사용자 이름. 한 계정에 대해 여러 IP에서 비밀번호를 추측하는 것을 막음
+}
+
+# 요청마다가 아니라 실패했을 때만 토큰을 사용하는 키 종류 (record_failure)
+FAILURE_KEYS = {'username'}
+
+
+def take_token(state, now, capacity, rate):
+    # 토큰 버킷 하나의 계산. state는 (남은 토큰 수, 마지막 계산 시각) 또는 None(가득 찬 버킷)
+    # 지난 시간만큼 토큰을 채운 뒤(capacity를 넘지 않음) 하나를 사용
+    # (새 토큰 수, 기다려야 할 시간)을 반환하며, 기다릴 시간이 0이면 허용
+    tokens = refill(state, now, capacity, rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+def refill(state, now, capacity, rate):
+    if state is None:
+        return capacity
+    return min(capacity, state[0] + (now - state[1]) * rate)
+
+
+def token_wait(state, now, capacity, rate):
+    # 토큰을 사용하지 않고, 지금 하나를 사용하려면 기다려야 할 시간만 계산 (peek)
+    return max(0.0, (1 - refill(state, now, capacity, rate)) / rate)
+
+
+# 프로세스 메모리에 버킷을 두는 저장소 (RATE_LIMIT_BACKEND='memory')
+# IP가 아주 많아도 메모리가 계속 늘지 않도록 최근에 사용한 max_keys개의 버킷만 보관 (LRU)
+# 버려진 버킷은 다음 요청에서 가득 찬 버킷으로 다시 시작
+class MemoryBuckets:
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._data = OrderedDict() # key -> (남은 토큰 수, 마지막 계산 시각)
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        now = time.monotonic()
+        with self._lock:
+            tokens, wait = take_token(self._data.get(key), now, capacity, rate)
+            self._data[key] = (tokens, now)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+        return wait
+
+    def peek(self, key, capacity, rate):
+        with self._lock:
+            return token_wait(self._data.get(key), time.monotonic(), capacity, rate)
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'keys': len(self._data), 'max_keys': self.max_keys}
+
+
+# SQLite의 rate_limit 테이블에 버킷을 두는 저장소 (RATE_LIMIT_BACKEND='sqlite')
+# 읽고 계산하고 쓰는 동안 BEGIN IMMEDIATE로 쓰기 잠금을 잡으므로, 여러 프로세스가 같은 버킷을 동시에 바꿔도 토큰을 잃지 않음
+# 요청마다 작은 쓰기 트랜잭션이 하나 늘어나므로, 제한을 적용하는 엔드포인트(기본은 POST 요청)에만 사용
+class SQLiteBuckets:
+    PURGE_EVERY = 1000 # 이 횟수마다 한 번씩 가득 찬(만료된) 버킷 행을 지움
+
+    def __init__(self):
+        self._ready = False
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    def _db(self):
+        db = get_db(readonly=False)
+        if not self._ready:
+            run_script(db, 'limits.sql') # init-db 이전에 만든 DB에도 테이블을 추가
+            self._ready = True
+        return db
+
+    def peek(self, key, capacity, rate):
+        # 읽기만 하므로 쓰기 잠금을 잡지 않음
+        row = self._db().execute(
+            'SELECT tokens, updated FROM rate_limit WHERE key = ?', (key,)
+        ).fetchone()
+        return token_wait(row, time.time(), capacity, rate)
+
+    def take(self, key, capacity, rate):
+        db = self._db()
+        with self._lock:
+            self._calls += 1
+            purge = self._calls % self.PURGE_EVERY == 0
+
+        now = time.time() # 프로세스끼리 비교해야 하므로 monotonic이 아닌 실제 시각을 사용
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute(
+                'SELECT tokens, updated FROM rate_limit WHERE key = ?', (key,)
+            ).fetchone()
+            tokens, wait = take_token(row, now, capacity, rate)
+            db.execute(
+                'INSERT OR REPLACE INTO rate_limit (key, tokens, updated, expires)'
+                ' VALUES (?, ?, ?, ?)',
+                (key, tokens, now, now + (capacity - tokens) / rate)
+            )
+            if purge:
+                db.execute('DELETE FROM rate_limit WHERE expires < ?', (now,))
+        except BaseException:
+            db.rollback()
+            raise
+        db.commit()
+        return wait
+
+    def stats(self):
+        return {'backend': 'sqlite', 'updates': self._calls}
+
+
+class Admission:
+    def __init__(self, rate_limits, buckets, route_classes, concurrency, methods, retry_after):
+        self.rules = {
+            endpoint: [(kind, count, count / seconds) for kind, (count, seconds) in rules.items()]
+            for endpoint, rules in rate_limits.items()
+        }
+        # endpoint -> [(키 종류, 버킷 크기, 초당 채워지는 토큰 수), ...]
+        for rules in self.rules.values():
+            for kind, _, _ in rules:
+                if kind not in KEY_FUNCS:
+                    raise ValueError(f'Unknown rate limit key {kind!r}.')
+        self.buckets = buckets
+        self.route_classes = {
+            endpoint: name for endpoint, name in route_classes.items() if name in concurrency
+        }
+        self.concurrency = dict(concurrency)
+        self.methods = set(methods)
+        self.retry_after = retry_after
+        self._slots = {
+            name: threading.BoundedSemaphore(limit) for name, limit in concurrency.items()
+        }
+        self._lock = threading.Lock()
+        self._stats = {
+            'checked': 0, # 확인한 요청 수 (ADMISSION_METHODS에 해당하는 요청)
+            'rate_limited': {}, # 엔드포인트별 429 응답 수
+            'failures': {}, # 엔드포인트별 record_failure() 횟수 (로그인 실패 등)
+            'shed': {}, # 부류별 503 응답 수
+            'in_flight': dict.fromkeys(concurrency, 0), # 부류별 현재 실행 중인 요청 수
+        }
+
+    def _count(self, group, key, n=1):
+        with self._lock:
+            counts = self._stats[group]
+            counts[key] = counts.get(key, 0) + n
+
+    def stats(self):
+        with self._lock:
+            result = {
+                key: dict(value) if isinstance(value, dict) else value
+                for key, value in self._stats.items()
+            }
+        result['concurrency'] = self.concurrency
+        result['buckets'] = self.buckets.stats()
+        return result
+
+    def check_rate(self, endpoint):
+        # 엔드포인트의 모든 규칙(IP, 사용자 이름)을 확인하고, 하나라도 비었으면 가장 긴 대기 시간으로 거절
+        # FAILURE_KEYS의 버킷은 여기서 사용하지 않고, 실패했을 때 사용할 버킷 목록으로 반환
+        with self._lock:
+            self._stats['checked'] += 1
+        wait = 0.0
+        on_failure = []
+        for kind, capacity, rate in self.rules.get(endpoint, ()):
+            value = KEY_FUNCS[kind]()
+            if not value:
+                continue
+            key = f'{endpoint}:{kind}:{value}'
+            if kind in FAILURE_KEYS:
+                wait = max(wait, self.buckets.peek(key, capacity, rate))
+                on_failure.append((key, capacity, rate))
+            else:
+                wait = max(wait, self.buckets.take(key, capacity, rate))
+        if wait:
+            self._count('rate_limited', endpoint)
+            raise RateLimited(wait)
+        return on_failure
+
+    def charge(self, buckets):
+        # check_rate가 반환한 FAILURE_KEYS 버킷에서 토큰을 하나씩 사용
+        for key, capacity, rate in buckets:
+            self.buckets.take(key, capacity, rate)
+        if buckets:
+            self._count('failures', request.endpoint)
+
+    def enter(self, endpoint):
+        # 엔드포인트 부류의 자리를 하나 차지하고 부류 이름을 반환 (제한이 없는 엔드포인트는 None)
+        name = self.route_classes.get(endpoint)
+        if name is None:
+            return None
+        if not self._slots[name].acquire(blocking=False):
+            # 자리가 날 때까지 기다리지 않고 바로 거절 (기다리는 요청도 스레드를 차지하므로)
+            self._count('shed', name)
+            raise Overloaded()
+        self._count('in_flight', name)
+        return name
+
+    def leave(self, name):
+        self._count('in_flight', name, -1)
+        self._slots[name].release()
+
+
+def get_admission():
+    return current_app.extensions['flaskr.limits']
+
+
+def admit_request():
+    admission = get_admission()
+    if request.method not in admission.methods:
+        return
+    g.failure_buckets = admission.check_rate(request.endpoint)
+    g.admission_class = admission.enter(request.endpoint)
+    # 요청이 끝나면 release_request가 자리를 돌려줌
+
+
+def record_failure():
+    # 뷰에서 호출: 이 요청이 실패한 시도(틀린 비밀번호 등)였음을 기록하고 사용자 이름의 버킷에서 토큰을 사용
+    # 버킷이 비면 다음 요청부터 admit_request가 429로 거절
+    buckets = g.pop('failure_buckets', None)
+    if buckets:
+        get_admission().charge(buckets)
+
+
+def release_request(e=None):
+    name = g.pop('admission_class', None)
+    if name is not None:
+        get_admission().leave(name)
+
+
+def rate_limited(e):
+    return 'Too Many Requests', 429, {'Retry-After': str(max(1, math.ceil(e.retry_after)))}
+    # Retry-After는 정수(초)여야 하므로 올림
+
+
+def overloaded(e):
+    return 'Service Unavailable', 503, {'Retry-After': str(get_admission().retry_after)}
+
+
+def init_app(app):
+    config = app.config
+    if config['RATE_LIMIT_BACKEND'] == 'sqlite':
+        buckets = SQLiteBuckets()
+    elif config['RATE_LIMIT_BACKEND'] == 'memory':
+        buckets = MemoryBuckets(config['RATE_LIMIT_MAX_KEYS'])
+    else:
+        raise ValueError(f'Unknown RATE_LIMIT_BACKEND {config["RATE_LIMIT_BACKEND"]!r}.')
+
+    app.extensions['flaskr.limits'] = admission = Admission(
+        config['RATE_LIMITS'],
+        buckets,
+        route_classes=config['ROUTE_CLASSES'],
+        concurrency=config['CONCURRENCY_LIMITS'],
+        methods=config['ADMISSION_METHODS'],
+        retry_after=config['ADMISSION_RETRY_AFTER'],
+    )
+    app.before_request(admit_request)
+    # 다른 모듈의 before_request(로그인 사용자 조회 등)보다 먼저 등록하여, 거절할 요청은 DB를 읽기 전에 거절
+    app.teardown_request(release_request)
+    # teardown_request는 뷰에서 예외가 나도 항상 실행되므로 차지한 자리를 반드시 돌려줌
+    app.register_error_handler(RateLimited, rate_limited)
+    app.register_error_handler(Overloaded, overloaded)
+    stats.register(app, 'admission', admission.stats)
@@ -0,0 +1,20 @@
+CREATE TABLE IF NOT EXISTS rate_limit (
+  key TEXT PRIMARY KEY,
+  tokens REAL NOT NULL,
+  updated REAL NOT NULL,
+  expires REAL NOT NULL
+) WITHOUT ROWID;
+/*
+요청 수 제한(limits.py)의 토큰 버킷 상태 (RATE_LIMIT_BACKEND='sqlite'일 때 사용)
+여러 워커 프로세스(flask serve, gunicorn 등)가 같은 DB 파일을 보므로, 프로세스가 몇 개든 제한이 함께 적용됨
+key: 'auth.login:ip:127.0.0.1' 처럼 엔드포인트, 키 종류, 값을 이어 붙인 문자열
+tokens: 남은 토큰 수 (요청 하나에 1개씩 사용), updated: tokens를 마지막으로 계산한 시각(유닉스 시간)
+expires: 버킷이 다시 가득 차는 시각. 이 시각이 지난 행은 행이 없는 것과 같으므로 지워도 됨
+WITHOUT ROWID: 기본 키(key)로만 찾는 작은 테이블이므로 별도의 rowid 없이 key 순서로 저장
+init-db 시 실행되며, 기존 DB에서는 처음 사용할 때 limits.py가 실행함
+*/
+
+CREATE INDEX IF NOT EXISTS rate_limit_expires ON rate_limit (expires);
+/*
+가득 찬(만료된) 버킷을 주기적으로 지울 때 DELETE ... WHERE expires < ? 를 인덱스로 처리
+*/
@@ -0,0 +1,28 @@
+CREATE TABLE IF NOT EXISTS change_counter (
+  name TEXT PRIMARY KEY,
+  value INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+INSERT OR IGNORE INTO change_counter (name) VALUES ('post');
+/*
+게시글이 추가/수정/삭제될 때마다 1씩 증가하는 카운터 (아래 트리거)
+blog.index의 페이지 캐시(cache.py의 PageCache)는 이 값을 키에 넣으므로,
+다른 워커 프로세스(flask serve, uvicorn --workers)나 CLI 명령에서 바뀐 게시글도 다음 요청부터 반영됨
+요청마다 기본 키로 한 행만 읽으므로, 페이지를 렌더링하는 비용에 비하면 무시할 만함
+init-db가 이 테이블을 지우지 않는 이유: 값이 0으로 돌아가면 이전 값으로 캐시된 페이지가 다시 맞는 것처럼 보일 수 있음
+*/
+
+CREATE TRIGGER IF NOT EXISTS post_change_insert AFTER INSERT ON post BEGIN
+  UPDATE change_counter SET value = value + 1 WHERE name = 'post';
+END;
+
+CREATE TRIGGER IF NOT EXISTS post_change_update AFTER UPDATE OF title, body, excerpt ON post BEGIN
+  UPDATE change_counter SET value = value + 1 WHERE name = 'post';
+END;
+
+CREATE TRIGGER IF NOT EXISTS post_change_delete AFTER DELETE ON post BEGIN
+  UPDATE change_counter SET value = value + 1 WHERE name = 'post';
+END;
+/*
+트리거는 게시글을 바꾼 트랜잭션 안에서 실행되므로, 커밋된 게시글과 카운터가 항상 함께 바뀜
+트리거를 끄고 대량으로 넣은 경우(flask import-posts 등)는 rebuild_derived()가 카운터를 올림
+*/
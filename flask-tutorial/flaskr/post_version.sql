@@ -0,0 +1,10 @@
+CREATE TRIGGER IF NOT EXISTS post_version AFTER UPDATE OF title, body ON post BEGIN
+  UPDATE post SET version = old.version + 1 WHERE id = new.id;
+END;
+/*
+게시글이 수정되면 version을 올림
+각 워커 프로세스는 캐시한 게시글(blog.get_post)의 version을 DB의 값과 비교하여,
+다른 프로세스에서 수정된 게시글을 캐시에서 꺼내 쓰지 않음
+version만 바뀌는 UPDATE는 "OF title, body" 조건에 해당하지 않으므로 트리거가 다시 실행되지 않음
+init-db 시 실행되며, version 열이 없던 기존 DB에는 flask migrate-post-version이 열과 함께 추가
+*/
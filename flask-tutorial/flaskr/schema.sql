@@ -1,5 +1,8 @@
 DROP TABLE IF EXISTS user;
 DROP TABLE IF EXISTS post;
+DROP TABLE IF EXISTS post_fts;
+DROP VIEW IF EXISTS post_fts_content;
+DROP TABLE IF EXISTS user_stats;
 /*
 이미 해당 테이블이 존재하면 먼저 제거
 초기화 시 중복 생성 오류를 방지하기 위한 안전한 초기화 패턴
@@ -21,7 +24,9 @@ CREATE TABLE post (
   author_id INTEGER NOT NULL,
   created TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
   title TEXT NOT NULL,
-  body TEXT NOT NULL,
+  body COMPRESSED_TEXT NOT NULL,
+  excerpt TEXT NOT NULL DEFAULT '',
+  version INTEGER NOT NULL DEFAULT 0,
   FOREIGN KEY (author_id) REFERENCES user (id)
 );
 /*
@@ -29,8 +34,18 @@ id: 게시글 고유 ID
 author_id: 글쓴이의 user ID
 created: 작성 시간, 기본값은 현재 시간 (CURRENT_TIMESTAMP)
 title: 게시글 제목
-body: 게시글 본문
+body: 게시글 본문. 큰 본문은 zlib으로 압축된 BLOB으로 저장됨 (db.py의 COMPRESSED_TEXT 변환기가 읽을 때 풂)
+excerpt: 본문의 앞부분 (목록 페이지가 본문 전체 대신 읽을 수 있도록 저장할 때 미리 만들어 둠)
+version: 제목이나 본문이 수정될 때마다 1씩 증가 (post_version.sql의 트리거)
 FOREIGN KEY: author_id는 user 테이블의 id를 참조
 게시글(post)은 사용자(user)와 관계를 맺고 있으며, 외래 키(Foreign Key)를 통해 연결
 이를 통해 어떤 사용자가 어떤 글을 썼는지를 추적 가능
-*/
\ No newline at end of file
+*/
+
+CREATE INDEX post_created_id ON post (created, id);
+/*
+blog.index의 키셋 페이지네이션용 인덱스
+ORDER BY created DESC, id DESC LIMIT ? 를 정렬 없이 인덱스를 역방향으로 읽어 처리
+WHERE (created, id) < (?, ?) 조건도 인덱스에서 바로 시작 위치를 찾으므로
+몇 번째 페이지이든, 테이블이 얼마나 크든 한 페이지를 읽는 비용이 일정
+*/
@@ -0,0 +1,52 @@
+DROP VIEW IF EXISTS post_fts_content;
+DROP TRIGGER IF EXISTS post_fts_insert;
+DROP TRIGGER IF EXISTS post_fts_delete;
+DROP TRIGGER IF EXISTS post_fts_update;
+/*
+본문을 압축하는 설정과 압축하지 않는 설정에서 뷰와 트리거의 정의가 다르므로(search_compressed.sql),
+어느 쪽이 만들어져 있든 지우고 다시 만듦 (데이터는 없으므로 여러 번 실행해도 안전함)
+*/
+
+CREATE VIEW post_fts_content AS
+  SELECT id, title, body FROM post;
+/*
+검색 인덱스가 읽는 게시글 내용
+POST_COMPRESS_MIN_SIZE=None(압축하지 않음)이면 post.body는 항상 문자열이므로 그대로 보여줌
+압축을 켠 경우에는 이 파일 대신 search_compressed.sql을 사용 (db.py의 search_script)
+뷰와 트리거가 앱이 등록하는 SQL 함수를 쓰지 않으므로, sqlite3 셸 등 다른 연결에서도 post를 바꿀 수 있음
+*/
+
+CREATE VIRTUAL TABLE IF NOT EXISTS post_fts USING fts5(
+  title,
+  body,
+  content='post_fts_content',
+  content_rowid='id'
+);
+/*
+게시글 전문 검색(full-text search)을 위한 FTS5 가상 테이블
+LIKE '%단어%'는 인덱스를 쓸 수 없어 post 테이블 전체를 읽지만, FTS5는 단어별 역색인으로 바로 찾음
+content='post_fts_content': 본문을 중복 저장하지 않고 post 테이블(위의 뷰)을 외부 콘텐츠로 참조 (색인만 저장)
+'rebuild'와 highlight()/snippet()도 이 뷰에서 본문을 읽음
+content_rowid='id': FTS의 rowid가 post.id와 같음
+init-db 시 schema.sql 다음에 실행되며, flask rebuild-search-index로 기존 DB에도 추가 가능
+*/
+
+CREATE TRIGGER post_fts_insert AFTER INSERT ON post BEGIN
+  INSERT INTO post_fts (rowid, title, body) VALUES (new.id, new.title, new.body);
+END;
+
+CREATE TRIGGER post_fts_delete AFTER DELETE ON post BEGIN
+  INSERT INTO post_fts (post_fts, rowid, title, body)
+  VALUES ('delete', old.id, old.title, old.body);
+END;
+
+CREATE TRIGGER post_fts_update AFTER UPDATE OF title, body ON post BEGIN
+  INSERT INTO post_fts (post_fts, rowid, title, body)
+  VALUES ('delete', old.id, old.title, old.body);
+  INSERT INTO post_fts (rowid, title, body) VALUES (new.id, new.title, new.body);
+END;
+/*
+blog.create/update/delete가 post 테이블을 바꾸면 트리거가 같은 트랜잭션 안에서 검색 인덱스도 갱신
+외부 콘텐츠 테이블에서는 'delete' 명령에 이전 값(old)을 넘겨야 기존 색인 항목을 지울 수 있음
+UPDATE OF title, body: 제목이나 본문이 바뀔 때만 다시 색인
+*/
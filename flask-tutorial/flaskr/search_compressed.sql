@@ -0,0 +1,38 @@
+DROP VIEW IF EXISTS post_fts_content;
+DROP TRIGGER IF EXISTS post_fts_insert;
+DROP TRIGGER IF EXISTS post_fts_delete;
+DROP TRIGGER IF EXISTS post_fts_update;
+/*
+search.sql의 압축 본문 버전 (POST_COMPRESS_MIN_SIZE가 설정되어 있을 때 search.sql 대신 실행)
+post_fts 테이블은 search.sql과 같고, 뷰와 트리거만 body_text()로 압축을 푼 본문을 넘김
+body_text()는 db.py의 connect()가 연결마다 등록하는 함수이므로, 이 트리거가 있는 DB의 post는
+앱의 연결(flask 명령 포함)로만 바꿀 수 있음 (다른 연결에서는 no such function: body_text)
+*/
+
+CREATE VIEW post_fts_content AS
+  SELECT id, title, body_text(body) AS body FROM post;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS post_fts USING fts5(
+  title,
+  body,
+  content='post_fts_content',
+  content_rowid='id'
+);
+
+CREATE TRIGGER post_fts_insert AFTER INSERT ON post BEGIN
+  INSERT INTO post_fts (rowid, title, body) VALUES (new.id, new.title, body_text(new.body));
+END;
+
+CREATE TRIGGER post_fts_delete AFTER DELETE ON post BEGIN
+  INSERT INTO post_fts (post_fts, rowid, title, body)
+  VALUES ('delete', old.id, old.title, body_text(old.body));
+END;
+
+CREATE TRIGGER post_fts_update AFTER UPDATE OF title, body ON post BEGIN
+  INSERT INTO post_fts (post_fts, rowid, title, body)
+  VALUES ('delete', old.id, old.title, body_text(old.body));
+  INSERT INTO post_fts (rowid, title, body) VALUES (new.id, new.title, body_text(new.body));
+END;
+/*
+본문은 색인할 때와 같은 값이 되도록 body_text()로 압축을 푼 값을 넘김
+*/
@@ -0,0 +1,242 @@
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from flask.cli import ScriptInfo
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+
+# flask run(개발 서버)은 프로세스 하나만 사용하므로 CPU 코어를 하나밖에 쓰지 못함
+# flask serve는 미리 fork한 여러 워커 프로세스가 같은 리스닝 소켓에서 연결을 받아들이고(prefork),
+# 각 워커는 정해진 수의 스레드로 요청을 처리
+#
+#   master ─┬─ worker 1 (스레드 N개) ─┐
+#           ├─ worker 2 (스레드 N개) ─┼─ 하나의 리스닝 소켓을 공유
+#           └─ worker 3 (스레드 N개) ─┘
+#
+# master는 요청을 처리하지 않고 워커를 감시
+# 워커가 죽으면 다시 띄우고, SIGHUP을 받으면 새 워커를 띄운 뒤 기존 워커를 정상 종료(graceful restart),
+# SIGTERM/SIGINT를 받으면 모든 워커를 정상 종료
+
+
+# 요청마다 새 스레드를 만드는 대신, 정해진 크기의 스레드 풀에서 연결을 처리하는 WSGI 서버
+# 놀고 있는 스레드가 있을 때만 accept()하므로, 스레드가 모두 바쁜 워커는 새 연결을 가져가지 않고
+# 같은 소켓을 보고 있는 다른 워커 프로세스가 받음 (스레드 풀의 대기열에 연결이 쌓이지 않음)
+class ThreadPoolWSGIServer(BaseWSGIServer):
+    multithread = True
+    # multithread=True이면 werkzeug가 HTTP/1.1(keep-alive)을 사용
+
+    executor = None
+    accept_poll = 0.5 # 빈 스레드를 기다리는 동안 shutdown() 요청을 확인하는 간격(초)
+
+    def __init__(self, *args, threads, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.socket.setblocking(False)
+        # 여러 워커가 같은 소켓을 기다리다 한 워커가 먼저 연결을 가져가면 나머지의 accept()는
+        # BlockingIOError로 바로 실패하고 다시 기다림 (블로킹 소켓이면 다음 연결이 올 때까지 멈춤)
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix='flaskr-worker')
+        self._idle = threading.Semaphore(threads) # 놀고 있는 스레드 수
+
+    def get_request(self):
+        if not self._idle.acquire(timeout=self.accept_poll):
+            raise BlockingIOError() # OSError는 serve_forever()가 무시하고 다음 반복에서 다시 시도
+        try:
+            return super().get_request()
+        except BaseException:
+            self._idle.release()
+            raise
+
+    def shutdown_request(self, request):
+        # 받은 연결은 처리가 끝났을 때(또는 처리 전에 실패했을 때) 반드시 한 번 여기로 오므로, 여기서 스레드를 돌려놓음
+        try:
+            super().shutdown_request(request)
+        finally:
+            self._idle.release()
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        # BaseWSGIServer.__init__()도 fd로 받은 소켓을 쓰기 전에 server_close()를 호출하므로,
+        # 그때는 아직 스레드 풀이 없음
+        if self.executor is not None:
+            self.executor.shutdown(wait=True) # 처리 중인 요청이 끝날 때까지 기다림
+        super().server_close()
+
+
+def make_handler(keepalive, access_log):
+    class RequestHandler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        timeout = keepalive
+        # keep-alive 연결이 이 시간(초) 동안 다음 요청을 보내지 않으면 닫아서 스레드를 돌려받음
+
+        def log_request(self, *args, **kwargs):
+            if access_log:
+                super().log_request(*args, **kwargs)
+
+    return RequestHandler
+
+
+def run_worker(sock, options):
+    # fork된 자식 프로세스에서 실행
+    # 앱을 자식 프로세스 안에서 새로 만들기 때문에, SQLite 연결 풀, 해시 프로세스 풀, 쓰기 스레드 등은
+    # 모두 워커마다 따로 생성됨 (fork 이전에 열린 연결을 여러 프로세스가 공유하면 DB가 손상될 수 있음)
+    from flaskr.db import close_db, get_db
+
+    app = options['load_app']()
+    with app.app_context():
+        get_db() # 첫 연결을 미리 열어 PRAGMA를 적용하고 스키마를 읽어둠
+        get_db(readonly=True)
+        close_db()
+
+    server = ThreadPoolWSGIServer(
+        options['host'], options['port'], app,
+        handler=make_handler(options['keepalive'], options['access_log']),
+        fd=sock.fileno(),
+        threads=options['threads'],
+    )
+
+    def stop(signum, frame):
+        # serve_forever()를 실행 중인 스레드에서는 shutdown()을 호출할 수 없으므로 다른 스레드에서 호출
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Ctrl+C와 SIGHUP은 master가 처리
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def spawn(sock, options):
+    pid = os.fork()
+    if pid == 0:
+        status = 0
+        try:
+            run_worker(sock, options)
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            status = 1
+        finally:
+            os._exit(status)
+    return pid
+
+
+def stop_workers(pids, timeout):
+    # SIGTERM을 보낸 뒤 timeout 동안 정상 종료를 기다리고, 그래도 남아 있으면 SIGKILL
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    deadline = time.monotonic() + timeout
+    remaining = set(pids)
+    while remaining and time.monotonic() < deadline:
+        for pid in list(remaining):
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done = pid
+            if done:
+                remaining.discard(pid)
+        time.sleep(0.05)
+    for pid in remaining:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+
+
+@click.command('serve')
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', default=8000, show_default=True)
+@click.option('--workers', default=os.cpu_count() or 1, show_default=True,
+              help='Number of worker processes.')
+@click.option('--threads', default=8, show_default=True, help='Threads per worker.')
+@click.option('--backlog', default=2048, show_default=True,
+              help='Pending connection queue length of the listening socket.')
+@click.option('--keepalive', default=5.0, show_default=True,
+              help='Seconds an idle keep-alive connection is kept open.')
+@click.option('--graceful-timeout', default=30.0, show_default=True,
+              help='Seconds workers get to finish in-flight requests when stopping.')
+@click.option('--access-log/--no-access-log', default=False, show_default=True)
+def serve_command(host, port, workers, threads, backlog, keepalive, graceful_timeout,
+                  access_log):
+    """Serve the app with prefork worker processes (SIGHUP restarts them)."""
+    if not hasattr(os, 'fork'):
+        raise click.ClickException('flask serve needs os.fork(); use flask run instead.')
+
+    info = click.get_current_context().ensure_object(ScriptInfo)
+
+    def load_app():
+        # flask --app 으로 지정한 앱(팩토리와 그 인자 포함)을 워커 안에서 새로 만듦
+        # master의 ScriptInfo는 이미 만든 앱을 기억하고 있으므로, 같은 설정으로 새 ScriptInfo를 만들어 불러옴
+        return ScriptInfo(
+            app_import_path=info.app_import_path, create_app=info.create_app,
+            set_debug_flag=False,
+        ).load_app()
+
+    options = dict(host=host, port=port, threads=threads,
+                   keepalive=keepalive, access_log=access_log, load_app=load_app)
+
+    # 리스닝 소켓은 master에서 한 번만 만들고, fork된 워커들이 그대로 물려받아 함께 accept()
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    # backlog: 워커가 accept()하기 전까지 커널이 대기시켜 둘 연결 수
+
+    signals = []
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(sig, lambda signum, frame: signals.append(signum))
+
+    pids = {spawn(sock, options) for _ in range(workers)}
+    click.echo(f'Serving on http://{host}:{sock.getsockname()[1]}'
+               f' with {workers} workers x {threads} threads (master pid {os.getpid()})')
+
+    try:
+        while True:
+            while signals:
+                signum = signals.pop(0)
+                if signum == signal.SIGHUP:
+                    # graceful restart: 새 워커를 먼저 띄운 뒤 기존 워커를 정상 종료
+                    # 새 워커는 앱을 다시 만들므로 config.py 변경도 반영됨
+                    click.echo('Restarting workers...', err=True)
+                    old, pids = pids, {spawn(sock, options) for _ in range(workers)}
+                    stop_workers(old, graceful_timeout)
+                else:
+                    click.echo('Shutting down...', err=True)
+                    return
+
+            # 예기치 않게 종료된 워커는 다시 띄움
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid = 0
+            if pid in pids:
+                pids.discard(pid)
+                click.echo(f'Worker {pid} exited ({status}); starting a new one.', err=True)
+                time.sleep(1) # 워커가 시작하자마자 죽는 경우 fork를 끝없이 반복하지 않도록 잠시 기다림
+                pids.add(spawn(sock, options))
+            time.sleep(0.1)
+    finally:
+        stop_workers(pids, graceful_timeout)
+        sock.close()
+# 사용 예: $ flask --app flaskr serve --workers 4 --threads 16 --port 8000
+
+
+def init_app(app):
+    app.cli.add_command(serve_command)
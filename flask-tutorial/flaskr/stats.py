@@ -0,0 +1,43 @@
+import hmac
+
+from flask import Blueprint, abort, current_app, jsonify, request
+
+bp = Blueprint('stats', __name__, url_prefix='/stats')
+# 'stats'라는 이름의 블루프린트를 생성
+# 연결 풀, 캐시 등 각 모듈이 등록한 통계를 한 곳에서 JSON으로 보여줌
+# url_prefix='/stats'이므로 실제 경로는 /stats
+
+
+# 각 모듈은 register(app, 이름, 함수)로 통계를 반환하는 함수를 등록
+# 함수는 /stats 요청이 들어올 때마다 호출되어 그 시점의 값을 반환
+# 예: stats.register(app, 'db_pool', lambda: get_pool(app).stats())
+def register(app, name, func):
+    app.extensions.setdefault('flaskr.stats', {})[name] = func
+
+
+# 통계에는 연결 풀, 캐시, 작업 대기열, 요청 수 제한 등 내부 상태가 들어 있으므로 아무에게나 보여주지 않음
+# STATS_TOKEN이 설정되어 있으면 X-Stats-Token 헤더가 일치하는 요청만 허용
+# 설정되어 있지 않으면 같은 서버(127.0.0.1, ::1)에서 직접 보낸 요청만 허용
+# 역방향 프록시(nginx 등)를 거친 요청은 remote_addr가 프록시의 주소(보통 127.0.0.1)가 되므로,
+# X-Forwarded-For 헤더가 있는 요청은 외부에서 온 것으로 보고 거절 (프록시 뒤에서 보려면 STATS_TOKEN을 설정)
+# 거절할 때는 403 대신 404로 응답하여 /stats가 있다는 것도 알리지 않음
+LOCAL_ADDRS = {'127.0.0.1', '::1'}
+
+
+@bp.before_request
+def check_access():
+    token = current_app.config['STATS_TOKEN']
+    if token:
+        given = request.headers.get('X-Stats-Token', '')
+        if not hmac.compare_digest(given.encode(), token.encode()):
+            # compare_digest: 일치하는 앞부분의 길이에 따라 걸리는 시간이 달라지지 않는 비교
+            abort(404)
+    elif request.remote_addr not in LOCAL_ADDRS or 'X-Forwarded-For' in request.headers:
+        abort(404)
+
+
+@bp.route('')
+def index():
+    providers = current_app.extensions.get('flaskr.stats', {})
+    return jsonify({name: func() for name, func in providers.items()})
+    # jsonify()는 딕셔너리를 JSON 응답(Content-Type: application/json)으로 변환
@@ -0,0 +1,49 @@
+CREATE INDEX IF NOT EXISTS post_author_created ON post (author_id, created);
+/*
+사용자별 게시글 목록(/user/<username>)의 키셋 페이지네이션용 인덱스
+SQLite 인덱스에는 rowid(post.id)가 함께 저장되므로 (author_id, created, id) 순서로 정렬되어 있음
+WHERE author_id = ? AND (created, id) < (?, ?) ORDER BY created DESC, id DESC LIMIT ? 를
+테이블을 읽지 않고 인덱스만으로 시작 위치를 찾고 정렬 없이 처리 (커버링 인덱스)
+아래 트리거의 max(created) 계산도 이 인덱스의 마지막 항목 하나만 읽음
+*/
+
+CREATE TABLE IF NOT EXISTS user_stats (
+  user_id INTEGER PRIMARY KEY,
+  post_count INTEGER NOT NULL DEFAULT 0,
+  last_post TIMESTAMP,
+  FOREIGN KEY (user_id) REFERENCES user (id)
+);
+/*
+사용자별 게시글 수와 마지막 작성 시각 (비정규화된 통계)
+프로필 헤더와 "Top authors" 목록이 post 테이블 전체를 COUNT(*) 하지 않고 한 행(또는 몇 행)만 읽도록 함
+게시글이 없는 사용자는 행이 없을 수 있으므로 읽을 때 LEFT JOIN과 coalesce(post_count, 0)를 사용
+init-db 시 실행되며, flask rebuild-user-stats로 기존 DB에도 추가하고 값을 다시 계산 가능
+*/
+
+CREATE INDEX IF NOT EXISTS user_stats_top ON user_stats (post_count, user_id);
+/*
+게시글 수가 많은 순서의 "Top authors" 목록용 인덱스
+ORDER BY post_count DESC, user_id DESC LIMIT ? 를 인덱스를 역방향으로 읽어 처리
+*/
+
+CREATE TRIGGER IF NOT EXISTS post_stats_insert AFTER INSERT ON post BEGIN
+  INSERT INTO user_stats (user_id, post_count, last_post)
+  VALUES (new.author_id, 1, new.created)
+  ON CONFLICT (user_id) DO UPDATE SET
+    post_count = post_count + 1,
+    last_post = max(coalesce(last_post, excluded.last_post), excluded.last_post);
+END;
+
+CREATE TRIGGER IF NOT EXISTS post_stats_delete AFTER DELETE ON post BEGIN
+  UPDATE user_stats SET
+    post_count = post_count - 1,
+    last_post = (SELECT max(created) FROM post WHERE author_id = old.author_id)
+  WHERE user_id = old.author_id;
+END;
+/*
+게시글을 추가/삭제하면 트리거가 같은 트랜잭션 안에서 작성자의 통계도 갱신
+ON CONFLICT ... DO UPDATE: 통계 행이 없으면 새로 만들고, 있으면 값을 더함 (UPSERT)
+last_post는 문자열('2025-07-07 10:00:00')로 저장되며, 이 형식은 문자열 비교가 곧 시간 비교
+삭제한 글이 마지막 글이었을 수 있으므로 post_author_created 인덱스로 남은 글 중 가장 최근 시각을 다시 읽음
+게시글의 작성자(author_id)는 바뀌지 않으므로 UPDATE 트리거는 필요 없음
+*/
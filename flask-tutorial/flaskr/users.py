@@ -0,0 +1,51 @@
+from flask import Blueprint, current_app, render_template, request
+from werkzeug.exceptions import abort
+
+from flaskr.blog import PostPage, get_posts_page
+from flaskr.db import get_db
+
+bp = Blueprint('users', __name__, url_prefix='/user')
+# 사용자별 게시글 목록(/user/<username>)과 작성자 통계를 보여주는 블루프린트
+# 게시글 수와 마지막 작성 시각은 post 테이블을 COUNT(*) 하지 않고,
+# 트리거가 갱신하는 user_stats 테이블(user_stats.sql)에서 한 행만 읽음
+
+
+# 사용자 한 명의 (id, username, post_count, last_post)
+# 게시글이 한 번도 없었던 사용자는 user_stats 행이 없으므로 LEFT JOIN으로 읽고 0으로 채움
+def get_author(username):
+    return get_db().execute(
+        'SELECT u.id, username, coalesce(s.post_count, 0) AS post_count, s.last_post'
+        ' FROM user u LEFT JOIN user_stats s ON s.user_id = u.id'
+        ' WHERE username = ?',
+        (username,)
+    ).fetchone()
+
+
+# 게시글 수가 많은 사용자 limit명 (user_stats_top 인덱스를 역방향으로 limit 행만 읽음)
+def get_top_authors(limit=None):
+    if limit is None:
+        limit = current_app.config['TOP_AUTHORS']
+    return get_db().execute(
+        'SELECT username, post_count, last_post'
+        ' FROM user_stats s JOIN user u ON u.id = s.user_id'
+        ' WHERE post_count > 0'
+        ' ORDER BY post_count DESC, user_id DESC LIMIT ?',
+        (limit,)
+    ).fetchall()
+
+
+# /user/<username>?before=<커서> : blog.index와 같은 키셋 페이지네이션으로 그 사용자의 글만 보여줌
+@bp.route('/<username>')
+def profile(username):
+    author = get_author(username)
+    if author is None:
+        abort(404, f"User {username} doesn't exist.")
+
+    posts, older, newer = get_posts_page(
+        before=request.args.get('before'), after=request.args.get('after'),
+        author_id=author['id'],
+    )
+    return render_template(
+        'users/profile.html', author=author, posts=PostPage(posts, older, newer),
+        top_authors=get_top_authors(),
+    )
@@ -0,0 +1,186 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from flask import current_app
+
+from flaskr import stats
+from flaskr.db import connect, get_db
+
+logger = logging.getLogger(__name__)
+
+
+# 정해진 시간(GROUP_COMMIT_TIMEOUT) 안에 쓰기 스레드가 결과를 주지 않았을 때 발생 (503으로 응답)
+# 작업은 이미 대기열에 들어가 있으므로, 이 예외가 발생한 뒤에 커밋될 수도 있음
+class WriteTimeout(Exception):
+    pass
+
+
+# 쓰기 결과. INSERT라면 lastrowid가 새 행의 id, UPDATE/DELETE라면 rowcount가 바뀐 행의 수
+WriteResult = namedtuple('WriteResult', 'lastrowid rowcount')
+
+
+# 그룹 커밋(group commit) 방식의 쓰기 전용 스레드
+# 요청마다 db.commit()을 하면 커밋마다 디스크 fsync가 일어나서, 초당 쓰기 수가 디스크의 fsync 속도로 제한됨
+# 이 클래스는 하나의 백그라운드 스레드가 쓰기 연결을 혼자 사용하면서,
+# 여러 요청 스레드가 보낸 쓰기 작업을 짧은 시간(window) 동안 또는 batch_size개까지 모아
+# 하나의 트랜잭션으로 커밋 (fsync 한 번)한 뒤, 각 요청의 Future에 결과를 전달
+class GroupCommitWriter:
+    def __init__(self, connect, window=0.002, batch_size=64, timeout=30.0):
+        self.connect = connect # 쓰기 연결을 만드는 함수
+        self.window = window # 첫 작업이 들어온 뒤 다른 작업을 더 기다리는 시간(초)
+        self.batch_size = batch_size # 한 번에 커밋할 최대 작업 수
+        self.timeout = timeout # 요청 스레드가 결과를 기다리는 최대 시간(초)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stats = {'operations': 0, 'failed': 0, 'commits': 0, 'restarts': 0}
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._stats, queued=self._queue.qsize())
+        if result['commits']:
+            result['avg_batch'] = result['operations'] / result['commits']
+        return result
+
+    def submit(self, sql, params=()):
+        # 쓰기 작업을 대기열에 넣고 Future를 반환
+        # future.result()는 작업이 포함된 트랜잭션이 커밋된 뒤 WriteResult를 반환하거나, 실패한 경우 그 예외를 발생시킴
+        self._ensure_started()
+        future = Future()
+        self._queue.put((sql, params, future))
+        return future
+
+    def _ensure_started(self):
+        # 쓰기 스레드는 처음 사용할 때 시작
+        # fork된 워커 프로세스에는 부모의 스레드가 복사되지 않으므로 프로세스마다 새로 시작
+        # 예상하지 못한 오류로 스레드가 끝나 있으면 다시 시작 (대기열에 남은 작업은 새 스레드가 처리)
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = None
+            if self._thread is None or not self._thread.is_alive():
+                if self._thread is not None:
+                    self._stats['restarts'] += 1
+                self._thread = threading.Thread(
+                    target=self._run, name='flaskr-group-commit', daemon=True
+                )
+                self._thread.start()
+
+    def result(self, future):
+        # 요청 스레드에서 Future의 결과를 기다림. 쓰기 스레드에 문제가 있어도 요청이 영원히 멈추지 않도록 시간 제한을 둠
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise WriteTimeout('Timed out waiting for the group commit writer.') from None
+
+    def _open(self):
+        db = self.connect()
+        db.isolation_level = None
+        # isolation_level=None: sqlite3 모듈이 자동으로 BEGIN을 넣지 않도록 하고, 트랜잭션을 직접 관리
+        return db
+
+    def _run(self):
+        db = None
+        while True:
+            batch = [self._queue.get()] # 첫 작업이 올 때까지 기다림
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                if db is None:
+                    db = self._open()
+                self._commit(db, batch)
+            except Exception as e:
+                # 연결을 열지 못했거나 트랜잭션 자체가 실패한 경우
+                # 이 배치의 모든 작업에 예외를 전달하고, 다음 배치는 새 연결로 처리 (스레드는 계속 실행)
+                logger.exception('Group commit batch failed')
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                with self._lock:
+                    self._stats['failed'] += len(batch)
+                if db is not None:
+                    try:
+                        db.close()
+                    except Exception:
+                        pass
+                    db = None
+
+    def _commit(self, db, batch):
+        done = []
+        failed = 0
+        try:
+            db.execute('BEGIN IMMEDIATE')
+            for sql, params, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue # 기다리던 쪽이 취소한 작업은 실행하지 않음
+                # 작업마다 SAVEPOINT를 두어, 한 작업이 실패하면 그 작업만 되돌리고
+                # 실패한 요청에만 예외를 전달 (나머지 작업은 같은 트랜잭션으로 커밋)
+                # sqlite3 오류뿐 아니라 매개변수를 바꾸다 나는 오류(2**63 이상의 정수의 OverflowError,
+                # 잘못된 문자열의 UnicodeEncodeError 등)도 그 작업만의 실패로 처리
+                db.execute('SAVEPOINT op')
+                try:
+                    cur = db.execute(sql, params)
+                except Exception as e:
+                    db.execute('ROLLBACK TO op')
+                    db.execute('RELEASE op')
+                    future.set_exception(e)
+                    failed += 1
+                else:
+                    db.execute('RELEASE op')
+                    done.append((future, WriteResult(cur.lastrowid, cur.rowcount)))
+            db.execute('COMMIT')
+        except BaseException:
+            # BEGIN이나 COMMIT 자체가 실패하면 되돌린 뒤 _run에서 모든 작업에 예외를 전달
+            if db.in_transaction:
+                db.execute('ROLLBACK')
+            raise
+        for future, result in done:
+            future.set_result(result)
+
+        with self._lock:
+            self._stats['operations'] += len(batch)
+            self._stats['failed'] += failed
+            self._stats['commits'] += 1
+
+
+# 뷰 함수에서 INSERT/UPDATE/DELETE를 실행할 때 사용하는 함수
+# GROUP_COMMIT이 켜져 있으면 그룹 커밋 스레드에 맡기고 커밋될 때까지 기다리며,
+# 꺼져 있으면 지금까지처럼 요청의 연결에서 실행하고 바로 커밋
+# 실패하면 sqlite3 예외(IntegrityError 등)가 그대로 발생하므로 호출하는 쪽의 오류 처리는 같음
+def execute_write(sql, params=()):
+    writer = current_app.extensions.get('flaskr.writer')
+    if writer is not None:
+        return writer.result(writer.submit(sql, params))
+
+    db = get_db(readonly=False)
+    cur = db.execute(sql, params)
+    db.commit()
+    return WriteResult(cur.lastrowid, cur.rowcount)
+
+
+def init_app(app):
+    if not app.config['GROUP_COMMIT']:
+        return
+    app.extensions['flaskr.writer'] = writer = GroupCommitWriter(
+        lambda: connect(app),
+        window=app.config['GROUP_COMMIT_WINDOW'],
+        batch_size=app.config['GROUP_COMMIT_BATCH'],
+        timeout=app.config['GROUP_COMMIT_TIMEOUT'],
+    )
+    stats.register(app, 'group_commit', writer.stats)
+    app.register_error_handler(WriteTimeout, lambda e: ('Service Unavailable', 503))
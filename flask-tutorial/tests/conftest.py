@@ -0,0 +1,73 @@
+import os
+import tempfile
+
+import pytest
+
+from flaskr import create_app
+from flaskr.db import get_db, init_db
+
+with open(os.path.join(os.path.dirname(__file__), 'data.sql'), 'rb') as f:
+    _data_sql = f.read().decode('utf8')
+    # 테스트 사용자 'test'(비밀번호 test), 'other'(비밀번호 other)와 게시글 하나
+
+
+@pytest.fixture
+def make_app():
+    # 임시 DB 파일로 앱을 만드는 팩토리. 테스트마다 필요한 설정을 넘겨서 사용
+    # 해싱은 요청 스레드에서 data.sql의 해시와 같은 가벼운 방식으로 하므로, 로그인 시 다시 해싱하지 않음
+    paths = []
+
+    def factory(**config):
+        fd, path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        paths.append(path)
+        app = create_app({
+            'TESTING': True,
+            'DATABASE': path,
+            'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+            'PASSWORD_HASH_WORKERS': 0,
+            **config,
+        })
+        with app.app_context():
+            init_db()
+            get_db().executescript(_data_sql)
+        return app
+
+    yield factory
+    for path in paths:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def runner(app):
+    return app.test_cli_runner()
+
+
+class AuthActions:
+    def __init__(self, client):
+        self._client = client
+
+    def login(self, username='test', password='test'):
+        return self._client.post(
+            '/auth/login', data={'username': username, 'password': password}
+        )
+
+    def logout(self):
+        return self._client.get('/auth/logout')
+
+
+@pytest.fixture
+def auth(client):
+    return AuthActions(client)
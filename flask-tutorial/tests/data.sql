@@ -0,0 +1,8 @@
+INSERT INTO user (username, password)
+VALUES
+  ('test', 'pbkdf2:sha256:1000$aECJz665iHXh8GCd$409fe652fce5baaf78115557f763229777f8d6925d021a28fb02334c528ef61f'),
+  ('other', 'pbkdf2:sha256:1000$VDhYePkagYCi0IAz$02f71ede7c853b5bb8952a9042defd18b578bfc3b5111b649f9aaaf3b5a98696');
+
+INSERT INTO post (title, body, author_id, created)
+VALUES
+  ('test title', 'test' || x'0a' || 'body', 1, '2018-01-01 00:00:00');
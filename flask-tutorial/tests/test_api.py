@@ -0,0 +1,179 @@
+import sqlite3
+
+import pytest
+from werkzeug.exceptions import abort
+
+import flaskr.api
+from flaskr.db import get_db
+
+
+def titles(app):
+    with app.app_context():
+        return {
+            row['id']: row['title']
+            for row in get_db().execute('SELECT id, title FROM post ORDER BY id')
+        }
+
+
+def batch(client, *operations):
+    return client.post('/api/posts/batch', json={'operations': list(operations)})
+
+
+def test_error_json(client, auth):
+    response = client.get('/api/posts/2')
+    assert response.status_code == 404
+    assert response.get_json() == {'error': "Post id 2 doesn't exist."}
+
+    assert client.post('/api/posts/batch', json={}).status_code == 401 # 로그인 필요
+    auth.login()
+    response = client.post('/api/posts/batch', json={'operations': 'nope'})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Expected a JSON object with an "operations" list.'}
+
+
+def test_batch(app, client, auth):
+    auth.login()
+    with app.app_context():
+        db = get_db()
+        db.execute(
+            "INSERT INTO post (title, body, author_id) VALUES ('theirs', '', 2)"
+        )
+        db.commit()
+
+    response = batch(
+        client,
+        {'op': 'create', 'title': 'new', 'body': 'body'},
+        {'op': 'update', 'id': 1, 'title': 'changed'},
+        {'op': 'update', 'id': 2, 'title': 'not mine'},
+        {'op': 'delete', 'id': 99},
+        {'op': 'create', 'title': ''},
+        {'op': 'rename'},
+    )
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert set(results[2]) == {'status', 'error'}
+    assert results[2]['status'] == 403
+    assert results[:2] + results[3:] == [
+        {'status': 201, 'id': 3},
+        {'status': 200, 'id': 1},
+        {'status': 404, 'error': "Post id 99 doesn't exist."},
+        {'status': 400, 'error': 'Title is required.'},
+        {'status': 400, 'error': 'Unknown op; expected create, update or delete.'},
+    ]
+    # 실패한 작업만 되돌리고 나머지는 함께 커밋
+    assert titles(app) == {1: 'changed', 2: 'theirs', 3: 'new'}
+
+
+@pytest.mark.parametrize('id', (True, False, 0, -1, 2 ** 63, '1', 1.0, None))
+def test_batch_bad_id(app, client, auth, id):
+    auth.login()
+    response = batch(
+        client,
+        {'op': 'update', 'id': id, 'title': 'changed'},
+        {'op': 'delete', 'id': id},
+    )
+    assert response.get_json() == {'results': [
+        {'status': 400, 'error': 'An integer id is required.'},
+    ] * 2}
+    assert titles(app) == {1: 'test title'}
+
+
+@pytest.mark.parametrize('field', ('title', 'body'))
+def test_batch_bad_value(app, client, auth, field):
+    # SQLite에 넘기지 못하는 값(UTF-8로 바꿀 수 없는 문자열)은 그 작업만 400으로 실패
+    auth.login()
+    response = batch(
+        client,
+        {'op': 'create', 'title': 'bad', field: '\ud800'},
+        {'op': 'create', 'title': 'good'},
+    )
+    results = response.get_json()['results']
+    assert [result['status'] for result in results] == [400, 201]
+    assert titles(app) == {1: 'test title', results[1]['id']: 'good'}
+
+
+def test_batch_rolls_back_failed_item(app, client, auth, monkeypatch):
+    # 글을 이미 고친 뒤에 실패한 작업도 SAVEPOINT까지 되돌려서, 그 작업의 변경만 남지 않음
+    apply_operation = flaskr.api.apply_operation
+
+    def fail_after_write(db, op):
+        result = apply_operation(db, op)
+        if op.get('fail'):
+            abort(409, 'Failed after writing.')
+        return result
+
+    monkeypatch.setattr(flaskr.api, 'apply_operation', fail_after_write)
+    auth.login()
+    response = batch(
+        client,
+        {'op': 'update', 'id': 1, 'title': 'changed', 'fail': True},
+        {'op': 'create', 'title': 'new'},
+        {'op': 'create', 'title': 'lost', 'fail': True},
+    )
+    assert response.get_json() == {'results': [
+        {'status': 409, 'error': 'Failed after writing.'},
+        {'status': 201, 'id': 2},
+        {'status': 409, 'error': 'Failed after writing.'},
+    ]}
+    assert titles(app) == {1: 'test title', 2: 'new'}
+
+
+def test_batch_rolls_back_on_database_error(app, client, auth, monkeypatch):
+    # DB 자체의 오류(OperationalError)는 이미 성공한 작업까지 배치 전체를 되돌림
+    apply_operation = flaskr.api.apply_operation
+
+    def fail_on_delete(db, op):
+        if op.get('op') == 'delete':
+            raise sqlite3.OperationalError('disk I/O error')
+        return apply_operation(db, op)
+
+    monkeypatch.setattr(flaskr.api, 'apply_operation', fail_on_delete)
+    auth.login()
+    with pytest.raises(sqlite3.OperationalError):
+        batch(
+            client,
+            {'op': 'create', 'title': 'new'},
+            {'op': 'update', 'id': 1, 'title': 'changed'},
+            {'op': 'delete', 'id': 1},
+        )
+    assert titles(app) == {1: 'test title'}
+
+    # 다음 배치는 정상적으로 처리되고, 캐시된 글도 되돌린 내용을 보여줌
+    monkeypatch.undo()
+    assert client.get('/api/posts/1').get_json()['title'] == 'test title'
+    assert batch(client, {'op': 'create', 'title': 'next'}).status_code == 200
+    assert titles(app) == {1: 'test title', 2: 'next'}
+
+
+def test_list_posts_etag(client, auth):
+    response = client.get('/api/posts')
+    assert response.status_code == 200
+    assert [post['title'] for post in response.get_json()['posts']] == ['test title']
+    etag = response.headers['ETag']
+
+    response = client.get('/api/posts', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+    auth.login()
+    batch(client, {'op': 'update', 'id': 1, 'title': 'changed'})
+    response = client.get('/api/posts', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_read_post_etag(client, auth):
+    response = client.get('/api/posts/1')
+    assert response.get_json()['title'] == 'test title'
+    etag = response.headers['ETag']
+
+    response = client.get('/api/posts/1', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    auth.login()
+    batch(client, {'op': 'update', 'id': 1, 'title': 'changed'})
+    response = client.get('/api/posts/1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['title'] == 'changed'
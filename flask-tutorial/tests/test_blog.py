@@ -0,0 +1,201 @@
+import re
+
+import pytest
+
+from flaskr.cache import get_post_generation
+from flaskr.db import get_db, get_pool
+
+
+@pytest.fixture
+def paged_app(make_app):
+    # 게시글 26개: data.sql의 글 하나(2018년) + 1초 간격으로 작성된 25개 (post 01이 가장 오래됨)
+    app = make_app(POSTS_PER_PAGE=10)
+    with app.app_context():
+        db = get_db()
+        db.executemany(
+            'INSERT INTO post (title, body, author_id, created) VALUES (?, ?, 1, ?)',
+            [(f'post {i:02d}', 'body', f'2026-10-18 13:16:{i:02d}') for i in range(1, 26)],
+        )
+        db.commit()
+    return app
+
+
+def titles(response):
+    return re.findall(r'<div>\s*<h1>([^<]*)</h1>', response.get_data(as_text=True))
+    # 게시글 제목만 (사이트 이름과 페이지 제목의 <h1>은 제외)
+
+
+def link(response, name):
+    match = re.search(rf'href="([^"]*)">[^<]*{name}', response.get_data(as_text=True))
+    return match and match.group(1).replace('&amp;', '&')
+
+
+def test_index(client, auth):
+    response = client.get('/')
+    assert b'Log In' in response.data
+    assert b'Register' in response.data
+
+    auth.login()
+    response = client.get('/')
+    assert b'Log Out' in response.data
+    assert b'test title' in response.data
+    assert b'by <a href="/user/test">test</a> on 2018-01-01' in response.data
+    assert b'href="/1/update"' in response.data
+
+
+def test_first_page(paged_app):
+    response = paged_app.test_client().get('/')
+    assert titles(response) == [f'post {i:02d}' for i in range(25, 15, -1)]
+    assert link(response, 'Newer') is None
+    assert 'before=' in link(response, 'Older')
+
+
+def test_walk_pages(paged_app):
+    # Older 링크를 따라 끝까지 간 뒤 Newer 링크로 돌아오면 같은 페이지들이 다시 나와야 함
+    client = paged_app.test_client()
+    pages = [titles(response := client.get('/'))]
+    while (url := link(response, 'Older')) is not None:
+        response = client.get(url)
+        pages.append(titles(response))
+    assert pages[-1] == ['post 05', 'post 04', 'post 03', 'post 02', 'post 01', 'test title']
+    assert sum(pages, []) == [f'post {i:02d}' for i in range(25, 0, -1)] + ['test title']
+
+    back = []
+    while (url := link(response, 'Newer')) is not None:
+        response = client.get(url)
+        back.append(titles(response))
+    assert back == pages[-2::-1]
+
+
+def test_deep_before(paged_app):
+    response = paged_app.test_client().get('/?before=2026-10-18 13:16:03|4')
+    assert titles(response) == ['post 02', 'post 01', 'test title']
+    assert link(response, 'Older') is None
+    assert 'after=' in link(response, 'Newer')
+
+
+def test_after(paged_app):
+    response = paged_app.test_client().get('/?after=2026-10-18 13:16:20|21')
+    assert titles(response) == [f'post {i:02d}' for i in range(25, 20, -1)]
+    assert link(response, 'Newer') is None
+
+
+def test_t_separator_cursor(paged_app):
+    # 'T'로 구분된 커서도 ' '로 구분된 커서와 같은 위치를 가리켜야 함
+    # 그대로 문자열로 비교하면 'T' > ' ' 이므로 그날의 모든 글이 "더 오래된 글"이 됨
+    client = paged_app.test_client()
+    for name in ('before', 'after'):
+        space = client.get(f'/?{name}=2026-10-18 13:16:10|11')
+        t = client.get(f'/?{name}=2026-10-18T13:16:10|11')
+        assert titles(t) == titles(space)
+    assert titles(space)[-1] == 'post 11'
+
+
+@pytest.mark.parametrize('cursor', (
+    'nope',
+    '2026-10-18 13:16:10',
+    '2026-10-18 13:16:10|x',
+    '2026-99-18 13:16:10|1',
+    '2026-10-18 13:16:10+09:00|11',
+    '2026-10-18 13:16:10|-1',
+    f'2026-10-18 13:16:10|{2 ** 63}',
+))
+def test_bad_cursor(client, cursor):
+    assert client.get('/', query_string={'before': cursor}).status_code == 400
+    assert client.get('/', query_string={'after': cursor}).status_code == 400
+
+
+@pytest.mark.parametrize('fetch_rows', (0, 1, 2))
+def test_stream_index_pages(make_app, fetch_rows):
+    # 스트리밍 모드에서도 같은 페이지와 커서가 나와야 함 (게시글을 몇 개씩 나눠 읽든 같음)
+    app = make_app(POSTS_PER_PAGE=2, STREAM_INDEX=True, STREAM_FETCH_ROWS=fetch_rows)
+    with app.app_context():
+        db = get_db()
+        db.executemany(
+            'INSERT INTO post (title, body, author_id, created) VALUES (?, ?, 1, ?)',
+            [(f'post {i}', 'body', f'2026-10-18 13:16:0{i}') for i in range(1, 4)],
+        )
+        db.commit()
+    client = app.test_client()
+    response = client.get('/')
+    assert titles(response) == ['post 3', 'post 2']
+    response = client.get(link(response, 'Older'))
+    assert titles(response) == ['post 1', 'test title']
+    assert link(response, 'Older') is None
+    response = client.get(link(response, 'Newer'))
+    assert titles(response) == ['post 3', 'post 2']
+
+
+def test_stream_index_releases_connection(paged_app):
+    # 응답을 보내는 동안에는 읽기 연결을 붙잡고 있지 않아야 함
+    paged_app.config.update(STREAM_INDEX=True, STREAM_FETCH_ROWS=3, STREAM_CHUNK_SIZE=1)
+    pool = get_pool(paged_app, readonly=True)
+    response = paged_app.test_client().get('/', buffered=False)
+    body = []
+    for chunk in response.response:
+        assert pool.stats()['in_use'] == 0
+        body.append(chunk)
+    response.close()
+    assert b''.join(body).count(b'<article') == 10
+    stats = pool.stats()
+    assert stats['hits'] + stats['created'] == 4 # 3 + 3 + 3 + (1 + 다음 페이지 확인용 1)
+    assert stats['in_use'] == 0
+
+
+def warm(client):
+    # 목록 페이지와 게시글을 캐시에 넣어 둠
+    assert b'test title' in client.get('/').data
+    assert b'test title' in client.get('/1/update').data
+
+
+def test_update_busts_caches(app, client, auth):
+    auth.login()
+    warm(client)
+    client.post('/1/update', data={'title': 'updated', 'body': ''})
+
+    response = client.get('/')
+    assert b'updated' in response.data
+    assert b'test title' not in response.data
+    assert b'updated' in client.get('/1/update').data
+
+
+def test_delete_busts_caches(app, client, auth):
+    auth.login()
+    warm(client)
+    client.post('/1/delete')
+
+    assert b'test title' not in client.get('/').data
+    assert client.get('/1/update').status_code == 404
+
+
+@pytest.mark.parametrize('sql', (
+    "UPDATE post SET title = 'elsewhere' WHERE id = 1",
+    'DELETE FROM post WHERE id = 1',
+))
+def test_caches_reject_stale_entries(app, client, auth, sql):
+    # 다른 워커 프로세스에서 바꾼 글은 invalidate_*()가 호출되지 않음
+    # 목록 페이지는 DB의 변경 카운터(generation)로, 게시글은 version으로 오래된 항목을 걸러내야 함
+    auth.login()
+    warm(client)
+    with app.app_context():
+        db = get_db()
+        version = db.execute('SELECT version FROM post WHERE id = 1').fetchone()[0]
+        generation = get_post_generation(db)
+        db.execute(sql)
+        db.commit()
+        assert get_post_generation(db) == generation + 1
+        row = db.execute('SELECT version FROM post WHERE id = 1').fetchone()
+        assert row is None or row[0] == version + 1
+    index_version = app.extensions['flaskr.index_cache'].version
+
+    response = client.get('/')
+    assert b'test title' not in response.data
+    assert (b'elsewhere' in response.data) == sql.startswith('UPDATE')
+    response = client.get('/1/update')
+    if sql.startswith('UPDATE'):
+        assert b'elsewhere' in response.data
+    else:
+        assert response.status_code == 404
+    assert app.extensions['flaskr.post_cache'].stats()['stale'] == 1
+    assert app.extensions['flaskr.index_cache'].version == index_version
+    # 이 프로세스의 version은 그대로이고, 변경 카운터만으로 새 페이지를 렌더링했음
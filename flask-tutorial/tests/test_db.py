@@ -0,0 +1,46 @@
+import sqlite3
+
+import pytest
+from flask import g
+
+from flaskr.db import get_db, get_pool
+
+
+@pytest.mark.parametrize('method', ('GET', 'HEAD'))
+def test_read_request_uses_read_pool(app, method):
+    # GET/HEAD 요청은 mode=ro로 열린 읽기 전용 풀의 연결을 사용
+    with app.test_request_context(method=method):
+        db = get_db()
+        assert db is g.read_db
+        assert db.pool is get_pool(readonly=True)
+        assert db.execute('PRAGMA query_only').fetchone()[0] == 1
+        with pytest.raises(sqlite3.OperationalError):
+            db.execute("INSERT INTO user (username, password) VALUES ('a', '-')")
+
+
+@pytest.mark.parametrize('method', ('POST', 'DELETE'))
+def test_write_request_uses_write_pool(app, method):
+    with app.test_request_context(method=method):
+        db = get_db()
+        assert db is g.db
+        assert db.pool is get_pool()
+        assert db.execute('PRAGMA query_only').fetchone()[0] == 0
+        db.execute("INSERT INTO user (username, password) VALUES ('a', '-')")
+        db.commit()
+
+
+def test_read_pool_disabled(make_app):
+    # DATABASE_READ_POOL_SIZE가 0이면 GET 요청도 쓰기 연결을 사용
+    app = make_app(DATABASE_READ_POOL_SIZE=0)
+    with app.test_request_context(method='GET'):
+        assert get_db() is g.db
+        assert 'flaskr.db.read_pool' not in app.extensions
+
+
+def test_views_use_pool_by_method(app, client, auth):
+    # 실제 뷰에서도 요청 방식에 따라 연결의 종류가 정해지는지 확인
+    seen = []
+    app.before_request(lambda: seen.append(get_db().pool))
+    auth.login()
+    client.get('/')
+    assert seen == [get_pool(app), get_pool(app, readonly=True)]
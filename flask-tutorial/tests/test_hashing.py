@@ -0,0 +1,24 @@
+import pytest
+from werkzeug.security import generate_password_hash
+
+from flaskr.hashing import PasswordHasher, stored_method
+
+
+@pytest.mark.parametrize('method', (
+    'scrypt', 'scrypt:16384:8:1', 'pbkdf2', 'pbkdf2:sha512', 'pbkdf2:sha256:1000',
+))
+def test_stored_method(method):
+    # 해싱하지 않고 만든 형식이 werkzeug가 실제로 저장하는 형식과 같아야 함
+    assert stored_method(method) == generate_password_hash('', method).split('$', 1)[0]
+
+
+@pytest.mark.parametrize('method', ('md5', 'scrypt:1:2', 'pbkdf2:sha256:1:2'))
+def test_stored_method_invalid(method):
+    with pytest.raises(ValueError):
+        stored_method(method)
+
+
+def test_needs_rehash():
+    hasher = PasswordHasher('pbkdf2:sha256:1000', workers=0, queue_size=0)
+    assert not hasher.needs_rehash(generate_password_hash('a', 'pbkdf2:sha256:1000'))
+    assert hasher.needs_rehash(generate_password_hash('a', 'pbkdf2:sha256:2000'))
@@ -0,0 +1,87 @@
+import pytest
+
+from flaskr import create_app
+from flaskr.db import get_db
+
+
+def login(client, password='test', ip='127.0.0.1'):
+    return client.post(
+        '/auth/login', data={'username': 'test', 'password': password},
+        environ_base={'REMOTE_ADDR': ip},
+    )
+
+
+def test_ip_limit(make_app):
+    app = make_app(RATE_LIMITS={'auth.login': {'ip': (2, 60)}})
+    client = app.test_client()
+    assert login(client, 'wrong').status_code == 200
+    assert login(client).status_code == 302
+
+    response = login(client)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '30' # 토큰 하나가 채워지는 데 60 / 2초
+    assert login(client, ip='10.0.0.2').status_code == 302 # IP마다 따로 셈
+    assert client.get('/auth/login').status_code == 200 # GET은 제한하지 않음
+    assert app.extensions['flaskr.limits'].stats()['rate_limited'] == {'auth.login': 1}
+
+
+def test_username_limit_counts_failures(make_app):
+    # 사용자 이름의 버킷은 로그인에 실패했을 때만 사용하므로, 성공한 로그인은 몇 번이든 허용
+    app = make_app(RATE_LIMITS={'auth.login': {'username': (2, 60)}})
+    client = app.test_client()
+    for _ in range(5):
+        assert login(client).status_code == 302
+
+    assert login(client, 'wrong').status_code == 200
+    assert login(client, 'wrong', ip='10.0.0.2').status_code == 200
+    response = login(client, ip='10.0.0.3') # 다른 IP에서 맞는 비밀번호로도 거절
+    assert response.status_code == 429
+    assert 'Retry-After' in response.headers
+    assert app.extensions['flaskr.limits'].stats()['failures'] == {'auth.login': 2}
+
+
+def test_concurrency_limit(make_app):
+    app = make_app(CONCURRENCY_LIMITS={'password': 2})
+    admission = app.extensions['flaskr.limits']
+    client = app.test_client()
+    held = [admission.enter('auth.login') for _ in range(2)] # 해싱 중인 요청 두 개
+
+    response = login(client)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert client.get('/').status_code == 200 # 다른 부류의 요청은 계속 처리
+    assert admission.stats()['shed'] == {'password': 1}
+
+    for name in held:
+        admission.leave(name)
+    assert login(client).status_code == 302
+    assert admission.stats()['in_flight'] == {'password': 0} # 끝난 요청은 자리를 돌려줌
+
+
+def test_sqlite_backend(make_app):
+    # 버킷을 DB에 두면 같은 DB를 쓰는 다른 워커 프로세스(여기서는 다른 앱)와 함께 셈
+    config = {
+        'RATE_LIMIT_BACKEND': 'sqlite',
+        'RATE_LIMITS': {'auth.login': {'ip': (2, 60), 'username': (5, 60)}},
+    }
+    app = make_app(**config)
+    assert login(app.test_client(), 'wrong').status_code == 200
+
+    other = create_app({
+        'TESTING': True, 'DATABASE': app.config['DATABASE'],
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000', 'PASSWORD_HASH_WORKERS': 0, **config,
+    })
+    assert login(other.test_client()).status_code == 302
+    response = login(app.test_client())
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '30'
+
+    with app.app_context():
+        rows = dict(get_db().execute('SELECT key, tokens FROM rate_limit').fetchall())
+    assert set(rows) == {'auth.login:ip:127.0.0.1', 'auth.login:username:test'}
+    assert rows['auth.login:username:test'] == pytest.approx(4, abs=0.01) # 실패한 한 번만 셈
+
+
+def test_unknown_backend(make_app):
+    with pytest.raises(ValueError):
+        make_app(RATE_LIMIT_BACKEND='redis')
@@ -0,0 +1,46 @@
+import pytest
+
+from flaskr.writer import execute_write
+
+
+@pytest.mark.parametrize('bad', [2**63, '\ud800'])
+def test_group_commit_survives_bad_parameter(make_app, bad):
+    # 매개변수 변환 오류(OverflowError, UnicodeEncodeError)가 쓰기 스레드를 멈추게 하면
+    # 그 뒤의 모든 쓰기가 영원히 기다리게 됨
+    app = make_app(GROUP_COMMIT=True, GROUP_COMMIT_TIMEOUT=5.0)
+    with app.app_context():
+        execute_write("INSERT INTO user (username, password) VALUES ('a', '-')")
+        with pytest.raises((OverflowError, UnicodeEncodeError)):
+            execute_write('UPDATE user SET password = ? WHERE id = 1', (bad,))
+        result = execute_write("INSERT INTO user (username, password) VALUES ('b', '-')")
+        assert result.rowcount == 1
+
+    writer = app.extensions['flaskr.writer']
+    assert writer._thread.is_alive()
+    assert writer.stats()['failed'] == 1
+
+
+def test_group_commit_fails_whole_batch_and_recovers(make_app):
+    # 연결을 열지 못하는 등 배치 전체가 실패해도 모든 Future에 예외가 전달되고, 다음 배치는 다시 처리됨
+    app = make_app(GROUP_COMMIT=True, GROUP_COMMIT_TIMEOUT=5.0)
+    writer = app.extensions['flaskr.writer']
+    connect = writer.connect
+    writer.connect = lambda: 1 / 0
+    with app.app_context():
+        with pytest.raises(ZeroDivisionError):
+            execute_write("INSERT INTO user (username, password) VALUES ('a', '-')")
+        writer.connect = connect
+        assert execute_write("INSERT INTO user (username, password) VALUES ('a', '-')").rowcount == 1
+
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_group_commit_restarts_dead_thread(make_app):
+    app = make_app(GROUP_COMMIT=True, GROUP_COMMIT_TIMEOUT=5.0)
+    writer = app.extensions['flaskr.writer']
+    with app.app_context():
+        execute_write("INSERT INTO user (username, password) VALUES ('a', '-')")
+        writer._queue.put(None) # 잘못된 항목으로 스레드를 끝냄
+        writer._thread.join(5)
+        assert not writer._thread.is_alive()
+        assert execute_write("INSERT INTO user (username, password) VALUES ('b', '-')").rowcount == 1
+    assert writer.stats()['restarts'] == 1
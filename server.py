@@ -1,44 +1,401 @@
 from flask import Flask
 from flask import request
 from flask import redirect
+import json
+import mmap
+import os
 import random
+import re
+import threading
+import time
 
 app = Flask(__name__)
 
-topics = [
+# 글의 변경 기록(create/update/delete)을 파일 끝에 계속 덧붙이는 로그 (append-only log)
+# 메모리에 있는 topics는 그대로 읽기에 사용하고, 바뀐 내용만 로그에 한 줄씩 남겨서
+# 서버를 다시 시작해도 로그를 다시 실행(replay)하여 글 목록을 복구
+#
+# TOPICS_DIR/
+#   topics.snapshot   어느 시점의 글 목록 전체 (첫 줄은 {"gen": 세대, "nextId": ...})
+#   topics.<gen>.log  그 이후의 변경 기록, 한 줄에 JSON 하나
+#
+# 로그가 snapshotEvery줄보다 길어지면 새 세대의 로그 파일로 넘어가고, 그 시점의 글 목록을 snapshot으로 저장한 뒤
+# 이전 세대의 로그를 지움 (compaction). 복구할 때는 snapshot을 읽고 그 세대부터의 로그만 다시 실행
+class TopicLog:
+    LOG_NAME = re.compile(r'^topics\.(\d+)\.log$')
+
+    def __init__(self, directory, snapshotEvery=10000):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.snapshotEvery = snapshotEvery
+        self.snapshotPath = os.path.join(directory, 'topics.snapshot')
+        self._lock = threading.Lock() # 로그 파일에 쓰기
+        self._cond = threading.Condition() # fsync 차례 기다리기
+        self._file = None
+        self._gen = 0
+        self._records = 0 # 현재 세대의 로그에 쓴 줄 수
+        self._written = 0 # 지금까지 쓴 기록 수
+        self._synced = 0 # 그중 fsync까지 끝난 기록 수
+        self._syncing = False
+        self._failed = None # flush나 fsync가 실패했을 때의 예외
+        self._snapshotting = False
+        self.stats = {'records': 0, 'fsyncs': 0, 'snapshots': 0}
+        self.recovery = None
+
+    def _path(self, gen):
+        return os.path.join(self.directory, f'topics.{gen}.log')
+
+    def recover(self, default=()):
+        # 저장된 글 목록과 다음 id를 복구하고, 이후의 기록을 쓸 로그 파일을 엶
+        start = time.perf_counter()
+        topics = {}
+        nextId = 1
+        gen = 0
+        if os.path.exists(self.snapshotPath):
+            # snapshot은 mmap으로 열어 파일 전체를 한 번에 메모리로 복사하지 않고 한 줄씩 읽음
+            with open(self.snapshotPath, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                header = json.loads(mm.readline())
+                gen = header['gen']
+                nextId = header['nextId']
+                for line in iter(mm.readline, b''):
+                    topic = json.loads(line)
+                    topics[topic['id']] = topic
+        gens = sorted(
+            int(m.group(1)) for m in map(self.LOG_NAME.match, os.listdir(self.directory))
+            if m and int(m.group(1)) >= gen
+        )
+        if not gens and not topics:
+            # 처음 시작하는 경우에는 기본 글 목록으로 시작
+            for topic in default:
+                topics[topic['id']] = dict(topic)
+                nextId = max(nextId, topic['id'] + 1)
+
+        replayed = 0
+        logBytes = 0
+        for g in gens:
+            count, size, maxId = self._replay(self._path(g), topics)
+            replayed += count
+            logBytes += size
+            nextId = max(nextId, maxId + 1)
+            # 삭제된 글의 id도 다시 사용하지 않도록, 로그에 나온 가장 큰 id 다음부터 사용
+
+        self._gen = gens[-1] if gens else gen
+        self._records = replayed
+        self._file = open(self._path(self._gen), 'ab')
+        if not os.path.exists(self.snapshotPath):
+            self._writeSnapshot(self._gen, nextId, topics.values())
+        self.recovery = {
+            'seconds': time.perf_counter() - start,
+            'topics': len(topics),
+            'replayed': replayed,
+            'logBytes': logBytes,
+        }
+        return topics, nextId
+
+    def _replay(self, path, topics):
+        count = 0
+        good = 0 # 온전하게 읽은 마지막 줄의 끝 위치
+        maxId = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break # 쓰는 도중에 서버가 죽어서 잘린 마지막 줄
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                id = record['id']
+                if record['op'] == 'delete':
+                    topics.pop(id, None)
+                else:
+                    topics[id] = {'id': id, 'title': record['title'], 'body': record['body']}
+                    maxId = max(maxId, id)
+                good += len(line)
+                count += 1
+            size = f.seek(0, os.SEEK_END)
+        if good < size:
+            # 잘린 부분을 잘라내야 이후의 기록이 그 뒤에 이어서 붙지 않음
+            with open(path, 'r+b') as f:
+                f.truncate(good)
+        return count, good, maxId
+
+    def append(self, record):
+        # 기록을 파일에 쓰고 번호를 반환 (아직 fsync 전)
+        # TopicStore의 Lock 안에서 호출하므로 로그의 순서는 메모리에서 바뀐 순서와 같음
+        line = json.dumps(record, ensure_ascii=False).encode() + b'\n'
+        with self._lock:
+            self._file.write(line)
+            self._written += 1
+            self._records += 1
+            self.stats['records'] += 1
+            return self._written
+
+    def sync(self, seq):
+        # seq번 기록이 디스크에 저장될(fsync) 때까지 기다림
+        # 요청마다 fsync를 하는 대신, 먼저 온 요청 하나가 그때까지 쓰인 기록 전체를 한 번에 fsync하고
+        # 그동안 들어온 다른 요청들은 그 결과를 기다렸다가 함께 끝남 (batched fsync)
+        with self._cond:
+            while self._syncing and self._synced < seq:
+                self._cond.wait()
+            if self._synced >= seq:
+                return
+            self._checkFailed()
+            self._syncing = True
+        try:
+            with self._lock:
+                self._file.flush()
+                target = self._written
+                fd = self._file.fileno()
+            os.fsync(fd) # Lock 밖에서 fsync하므로 그동안 다른 요청은 계속 로그에 쓸 수 있음
+            self.stats['fsyncs'] += 1
+        except BaseException as e:
+            self._endSync(None, e)
+            raise
+        self._endSync(target, None)
+
+    def _endSync(self, target, error):
+        # fsync 차례를 돌려주고 기다리던 요청들을 깨움
+        # 성공했을 때만 _synced를 올리고, 실패했으면 기다리던 요청들도 _checkFailed에서 같은 실패를 받음
+        with self._cond:
+            if error is None:
+                self._synced = max(self._synced, target)
+            elif self._failed is None:
+                self._failed = error
+            self._syncing = False
+            self._cond.notify_all()
+
+    def _checkFailed(self):
+        # fsync가 한 번 실패하면 커널이 저장하지 못한 페이지를 버렸을 수 있어서, 다시 fsync해도 성공한 것으로 믿을 수 없음
+        # 그래서 이후의 모든 sync가 실패하도록 하고, 서버를 다시 시작하여 로그에서 복구해야 함
+        if self._failed is not None:
+            raise OSError('topic log is not durable after a failed write') from self._failed
+
+    def needsSnapshot(self):
+        return self._records >= self.snapshotEvery
+
+    def beginSnapshot(self):
+        with self._cond:
+            if self._snapshotting:
+                return False
+            self._snapshotting = True
+            return True
+
+    def rotate(self):
+        # 현재 로그 파일을 fsync하고 닫은 뒤 다음 세대의 로그 파일을 엶
+        # 진행 중인 fsync가 닫힌 파일을 쓰지 않도록 fsync 차례를 직접 잡음
+        with self._cond:
+            while self._syncing:
+                self._cond.wait()
+            self._checkFailed()
+            self._syncing = True
+        try:
+            with self._lock:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._gen += 1
+                self._records = 0
+                self._file = open(self._path(self._gen), 'ab')
+                target = self._written
+        except BaseException as e:
+            self._endSync(None, e)
+            raise
+        self._endSync(target, None)
+        return self._gen
+
+    def writeSnapshot(self, gen, nextId, topics):
+        try:
+            self._writeSnapshot(gen, nextId, topics)
+            for name in os.listdir(self.directory):
+                m = self.LOG_NAME.match(name)
+                if m and int(m.group(1)) < gen:
+                    os.remove(os.path.join(self.directory, name))
+        finally:
+            with self._cond:
+                self._snapshotting = False
+
+    def _writeSnapshot(self, gen, nextId, topics):
+        # 임시 파일에 모두 쓰고 fsync한 뒤 이름을 바꿔서, 쓰는 도중에 죽어도 이전 snapshot이 남아 있도록 함
+        tmp = self.snapshotPath + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(json.dumps({'gen': gen, 'nextId': nextId}).encode() + b'\n')
+            f.writelines(json.dumps(t, ensure_ascii=False).encode() + b'\n' for t in topics)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshotPath)
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd) # 이름이 바뀐 것(디렉터리 항목)도 디스크에 저장
+        finally:
+            os.close(fd)
+        self.stats['snapshots'] += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+# 글 목록을 저장하는 클래스
+# 리스트를 처음부터 훑어서 id를 찾는 대신, id -> topic 딕셔너리로 바로 찾음 (O(1))
+# 딕셔너리는 넣은 순서를 기억하므로 목록은 지금처럼 만든 순서대로 표시됨
+# 여러 스레드가 동시에 요청을 처리해도 안전하도록, 바꾸는 작업(create/update/delete)은 Lock 안에서 실행
+# log가 있으면 바뀐 내용을 TopicLog에 기록하고, 디스크에 저장된 뒤에 반환
+class TopicStore:
+    def __init__(self, topics=(), log=None, nextId=1):
+        self._lock = threading.Lock()
+        self._topics = {}
+        self._nextId = nextId
+        for topic in topics:
+            self._topics[topic['id']] = dict(topic)
+            self._nextId = max(self._nextId, topic['id'] + 1)
+        self._snapshot = None
+        self.log = log
+
+    @classmethod
+    def open(cls, directory, default=()):
+        # directory에 저장된 글 목록을 복구한 TopicStore를 만듦
+        log = TopicLog(directory)
+        topics, nextId = log.recover(default)
+        return cls(topics.values(), log=log, nextId=nextId)
+
+    def __len__(self):
+        return len(self._topics)
+
+    def get(self, id):
+        # 딕셔너리에서 값 하나를 읽는 것은 Lock 없이도 안전함
+        # topic은 한 번 넣은 뒤에는 바꾸지 않고, update는 새 topic으로 교체하므로(copy-on-write)
+        # 읽는 쪽은 항상 title과 body가 짝이 맞는 topic을 받음
+        return self._topics.get(id)
+
+    def snapshot(self):
+        # 목록 전체를 tuple로 반환
+        # 글이 바뀌지 않는 동안에는 같은 tuple을 그대로 돌려주므로 Lock도 복사도 필요 없음
+        # 글이 바뀌면 _snapshot이 None이 되고, 다음에 읽는 요청이 한 번만 새로 만듦
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = tuple(self._topics.values())
+                snapshot = self._snapshot
+        return snapshot
+
+    def create(self, title, body):
+        with self._lock:
+            id = self._nextId # id는 Lock 안에서 정하므로 두 요청이 같은 id를 받지 않음
+            self._nextId += 1
+            self._topics[id] = {'id': id, 'title': title, 'body': body}
+            self._snapshot = None
+            seq = self._record({'op': 'create', 'id': id, 'title': title, 'body': body})
+        self._commit(seq)
+        return id
+
+    def update(self, id, title, body):
+        with self._lock:
+            if id not in self._topics:
+                return False
+            self._topics[id] = {'id': id, 'title': title, 'body': body}
+            self._snapshot = None
+            seq = self._record({'op': 'update', 'id': id, 'title': title, 'body': body})
+        self._commit(seq)
+        return True
+
+    def delete(self, id):
+        with self._lock:
+            if self._topics.pop(id, None) is None:
+                return False
+            self._snapshot = None
+            seq = self._record({'op': 'delete', 'id': id})
+        self._commit(seq)
+        return True
+
+    def _record(self, record):
+        if self.log is None:
+            return None
+        return self.log.append(record)
+
+    def _commit(self, seq):
+        # fsync는 Lock 밖에서 기다리므로, 그동안 다른 요청도 로그에 쓰고 같은 fsync에 묶일 수 있음
+        if seq is None:
+            return
+        self.log.sync(seq)
+        if self.log.needsSnapshot() and self.log.beginSnapshot():
+            threading.Thread(target=self.compact, daemon=True).start()
+
+    def compact(self):
+        # 지금의 글 목록을 snapshot으로 저장하고 이전 로그를 지움
+        # 로그 파일을 바꾸는 순간만 Lock을 잡고, snapshot 파일은 Lock 밖에서 씀
+        with self._lock:
+            topics = tuple(self._topics.values())
+            nextId = self._nextId
+            gen = self.log.rotate()
+        self.log.writeSnapshot(gen, nextId, topics)
+
+defaultTopics = [
     {'id': 1, 'title': 'html', 'body': 'html is...'},
     {'id': 2, 'title': 'css', 'body': 'css is...'},
     {'id': 3, 'title': 'javascript', 'body': 'javascript is...'}
 ]
-nextId = 4
 
-def template(contents, content, id=None):
-    contextUI = ''
-    if(id != None):
-        contextUI = f'''
-            <li><a href="/update/{id}/">update</a></li>
-            <li><form action="/delete/{id}" method="POST"><input type="submit" value="delete"></form></li>
-        '''
-    return f'''<!doctype html>
+# TOPICS_DIR 환경 변수를 설정하면 글 목록을 그 디렉터리에 저장하고, 다시 시작할 때 복구
+# 예: $ TOPICS_DIR=data python server.py
+topicsDir = os.environ.get('TOPICS_DIR')
+if topicsDir:
+    topics = TopicStore.open(topicsDir, defaultTopics)
+    recovery = topics.log.recovery
+    print(f"recovered {recovery['topics']} topics ({recovery['replayed']} log records,"
+          f" {recovery['logBytes']} bytes) in {recovery['seconds'] * 1000:.1f} ms")
+else:
+    topics = TopicStore(defaultTopics)
+
+# 페이지에서 바뀌지 않는 부분(뼈대)은 프로그램이 시작할 때 한 번만 나눠 두고,
+# 요청마다 f-string으로 페이지 전체를 다시 만드는 대신 바뀌는 부분만 끼워 넣어 join
+PAGE_SKELETON = '''<!doctype html>
     <html>
         <body>
             <h1><a href="/">WEB</a></h1>
             <ol>
-                {contents}
+                {slot}
             </ol>
-            {content}
+            {slot}
             <ul>
                 <li><a href="/create/">create</a></li>
-                {contextUI}
+                {slot}
             </ul>
         </body>
     </html>
     '''
+PAGE_PARTS = tuple(PAGE_SKELETON.split('{slot}'))
+
+CONTEXT_UI = '''
+            <li><a href="/update/{id}/">update</a></li>
+            <li><form action="/delete/{id}" method="POST"><input type="submit" value="delete"></form></li>
+        '''
+
+def template(contents, content, id=None):
+    contextUI = ''
+    if(id != None):
+        contextUI = CONTEXT_UI.format(id=id)
+    head, middle, tail, end = PAGE_PARTS
+    return ''.join((head, contents, middle, content, tail, contextUI, end))
+
+# 만들어 둔 <li> 목록과, 그 목록을 만들 때 사용한 스냅샷
+# TopicStore는 글이 바뀌지 않는 동안 같은 스냅샷(tuple)을 돌려주므로,
+# 스냅샷이 같으면 목록을 다시 만들지 않고 그대로 사용
+# create/update/delete가 일어나면 스냅샷이 바뀌고, 다음 요청에서 한 번만 다시 만듦
+navCache = (None, '')
 
 def getContents():
-    liTags =''
-    for topic in topics:
-        liTags = liTags + f'<li><a href="/read/{topic["id"]}/">{topic["title"]}</a></li>'
+    global navCache
+    snapshot = topics.snapshot()
+    cachedSnapshot, liTags = navCache
+    if cachedSnapshot is not snapshot:
+        # liTags = liTags + ... 를 반복하면 매번 문자열 전체를 복사하므로, 모아서 한 번에 join
+        liTags = ''.join([
+            f'<li><a href="/read/{topic["id"]}/">{topic["title"]}</a></li>'
+            for topic in snapshot
+        ])
+        navCache = (snapshot, liTags)
+        # tuple 하나를 통째로 바꾸므로, 다른 스레드는 이전 목록이나 새 목록 중 하나를 온전히 읽음
     return liTags
 
 @app.route('/')
@@ -49,11 +406,10 @@ def index():
 def read(id):
     title = ''
     body = ''
-    for topic in topics:
-        if id == topic['id']:
-            title = topic['title']
-            body = topic['body']
-            break
+    topic = topics.get(id)
+    if topic is not None:
+        title = topic['title']
+        body = topic['body']
 
     return template(getContents(),f'<h2>{title}</h2>{body}', id)
 
@@ -70,13 +426,10 @@ def create():
         '''
         return template(getContents(),content)
     elif request.method == 'POST':
-        global nextId
         title = request.form['title']
         body = request.form['body']
-        newTopic = {'id':nextId,'title':title, 'body':body}
-        topics.append(newTopic)
-        url = f"/read/{nextId}/"
-        nextId += 1
+        newId = topics.create(title, body)
+        url = f"/read/{newId}/"
         return redirect(url)
 
 @app.route('/update/<int:id>/', methods=['GET', 'POST'])
@@ -85,11 +438,10 @@ def update(id):
     if(request.method == 'GET'):
         title = ''
         body = ''
-        for topic in topics:
-            if id == topic['id']:
-                title = topic['title']
-                body = topic['body']
-                break
+        topic = topics.get(id)
+        if topic is not None:
+            title = topic['title']
+            body = topic['body']
         content = f'''
             <form action="/update/{id}/" method="POST">
                 <p><input type="text" name= "title" placeholder="title" value="{title}"></p>
@@ -101,20 +453,14 @@ def update(id):
     elif request.method == 'POST':
         title = request.form['title']
         body = request.form['body']
-        for topic in topics:
-            if id == topic['id']:
-                topic['title'] = title
-                topic['body'] = body
-                break
+        topics.update(id, title, body)
         url = f"/read/{id}/"
         return redirect(url)
 
 @app.route('/delete/<int:id>/', methods=['POST'])
 def delete(id):
-    for topic in topics:
-        if id == topic['id']:
-            topics.remove(topic)
-            break
+    topics.delete(id)
     return redirect('/')
 
-app.run(debug=True)
\ No newline at end of file
+if __name__ == '__main__':
+    app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,111 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server  # noqa: E402
+from server import TopicLog, TopicStore  # noqa: E402
+
+DEFAULT = [{'id': 1, 'title': 'html', 'body': 'html is...'}]
+
+
+def reopen(directory, **kwargs):
+    log = TopicLog(directory, **kwargs)
+    topics, nextId = log.recover(DEFAULT)
+    return log, topics, nextId
+
+
+def test_recover_default(tmp_path):
+    log, topics, nextId = reopen(tmp_path)
+    assert topics == {1: DEFAULT[0]}
+    assert nextId == 2
+    log.close()
+
+    # 기본 글 목록은 처음 시작할 때만 사용하고, 그 뒤에는 저장된 목록을 복구
+    store = TopicStore.open(tmp_path, DEFAULT)
+    assert store.delete(1)
+    store.log.close()
+    log, topics, nextId = reopen(tmp_path)
+    assert topics == {}
+    assert nextId == 2
+    log.close()
+
+
+def test_recover_truncates_torn_tail(tmp_path):
+    store = TopicStore.open(tmp_path, DEFAULT)
+    id = store.create('a', 'b')
+    store.update(1, 'html', 'changed')
+    store.log.close()
+
+    path = tmp_path / 'topics.0.log'
+    good = path.read_bytes()
+    with open(path, 'ab') as f:
+        f.write(b'{"op": "create", "id": 9, "ti') # 쓰는 도중에 죽어서 잘린 마지막 줄
+
+    log, topics, nextId = reopen(tmp_path)
+    assert topics == {
+        1: {'id': 1, 'title': 'html', 'body': 'changed'},
+        id: {'id': id, 'title': 'a', 'body': 'b'},
+    }
+    assert nextId == id + 1
+    assert log.recovery['replayed'] == 2
+    assert path.read_bytes() == good # 잘린 줄은 지워짐
+
+    # 이후의 기록은 온전한 줄 뒤에 이어서 붙음
+    store = TopicStore(topics.values(), log=log, nextId=nextId)
+    store.create('c', 'd')
+    log.close()
+    log, topics, nextId = reopen(tmp_path)
+    assert topics[id + 1] == {'id': id + 1, 'title': 'c', 'body': 'd'}
+    log.close()
+
+
+def test_rotate_and_snapshot(tmp_path):
+    log, topics, nextId = reopen(tmp_path, snapshotEvery=3)
+    store = TopicStore(topics.values(), log=log, nextId=nextId)
+    store._commit = lambda seq: log.sync(seq) # compact를 백그라운드 스레드 대신 직접 실행
+    for i in range(3):
+        store.create(f'title {i}', 'body')
+    store.delete(2)
+    assert log.needsSnapshot()
+    assert log.beginSnapshot()
+    assert not log.beginSnapshot() # 이미 진행 중
+    store.compact()
+    assert sorted(os.listdir(tmp_path)) == ['topics.1.log', 'topics.snapshot']
+    assert not log.needsSnapshot()
+    assert log.beginSnapshot()
+    log.writeSnapshot(1, store._nextId, store.snapshot()) # 다시 시작할 수 있는지 확인
+
+    store.update(3, 'after', 'snapshot')
+    log.close()
+
+    log, topics, nextId = reopen(tmp_path)
+    assert topics == {
+        1: DEFAULT[0],
+        3: {'id': 3, 'title': 'after', 'body': 'snapshot'},
+        4: {'id': 4, 'title': 'title 2', 'body': 'body'},
+    }
+    assert nextId == 5
+    assert log.recovery['replayed'] == 1 # snapshot 이후의 기록만 다시 실행
+    log.close()
+
+
+def test_fsync_failure_is_sticky(tmp_path, monkeypatch):
+    store = TopicStore.open(tmp_path, DEFAULT)
+
+    def fail(fd):
+        raise OSError('EIO')
+
+    monkeypatch.setattr(server.os, 'fsync', fail)
+    with pytest.raises(OSError, match='EIO'):
+        store.create('a', 'b')
+
+    # fsync가 다시 성공하더라도 이후의 쓰기와 로그 교체는 모두 실패
+    monkeypatch.undo()
+    with pytest.raises(OSError, match='not durable'):
+        store.create('c', 'd')
+    with pytest.raises(OSError, match='not durable'):
+        store.log.rotate()
+    store.log.close()